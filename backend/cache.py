@@ -0,0 +1,114 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory footprint of a cached value in bytes.
+    
+    Lists are assumed to be homogeneous, so only their first element is
+    measured; this keeps sizing a 480-row schedule as cheap as a single row.
+    Objects exposing nbytes, such as arrays and AmortizationSchedule, report
+    their buffers through it.
+    
+    Args:
+        value: A structure of dicts, lists, tuples, scalars and array-backed
+            objects
+        
+    Returns:
+        Approximate size in bytes
+    """
+    size = sys.getsizeof(value)
+    if hasattr(value, "nbytes"):
+        size += value.nbytes
+    elif isinstance(value, dict):
+        size += sum(estimate_size(item) for item in value.values())
+    elif isinstance(value, tuple):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, list) and value:
+        size += len(value) * estimate_size(value[0])
+    return size
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and estimated memory."""
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, marking it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any, tag: Hashable = None) -> None:
+        """
+        Store a value, evicting least-recently-used entries to stay in bounds.
+        
+        Values larger than the whole memory budget are not cached. The tag
+        groups entries so they can be dropped together with invalidate_tag.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, tag)
+            self._tags.setdefault(tag, set()).add(key)
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+    
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry stored under the given tag."""
+        with self._lock:
+            keys = self._tags.get(tag, set()).copy()
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+    
+    def stats(self) -> dict:
+        """Get the current size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+    
+    def _remove(self, key: Hashable) -> None:
+        _, size, tag = self._entries.pop(key)
+        self._bytes -= size
+        tagged_keys = self._tags.get(tag)
+        if tagged_keys is not None:
+            tagged_keys.discard(key)
+            if not tagged_keys:
+                del self._tags[tag]
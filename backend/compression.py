@@ -0,0 +1,171 @@
+import zlib
+from typing import List, Optional, Tuple
+
+from .config import settings
+from .metrics import track_stage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+
+def supported_encodings() -> List[str]:
+    """Content codings the server can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding to use for a request's Accept-Encoding header.
+
+    Codings are ranked by their q-value; ties go to the server's preference
+    (brotli over gzip). A q-value of 0 rules a coding out, and "*" stands
+    for every coding not listed explicitly.
+
+    Args:
+        accept_encoding: The raw Accept-Encoding header value
+
+    Returns:
+        "br", "gzip" or None when the response should not be compressed
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, parameters = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                weight = float(parameters[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    candidates = [
+        (weights.get(coding, weights.get("*", 0.0)), -preference, coding)
+        for preference, coding in enumerate(supported_encodings())
+    ]
+    weight, _, coding = max(candidates)
+    return coding if weight > 0 else None
+
+
+class _Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.GZIP_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk; intermediate chunks are flushed so streamed rows reach the client promptly."""
+        with track_stage("response.compression"):
+            if self._brotli is not None:
+                output = self._brotli.process(data)
+                return output + (self._brotli.finish() if final else self._brotli.flush())
+            output = self._zlib.compress(data)
+            return output + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    The coding is negotiated from Accept-Encoding. Single-message bodies
+    smaller than settings.COMPRESSION_MIN_BYTES are sent as is; streamed
+    bodies are always compressed, chunk by chunk. Strong ETags are weakened
+    on compressed responses since the bytes no longer match the identity
+    representation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = start_message.get("headers", [])
+                already_encoded = any(name.lower() == b"content-encoding" for name, _ in headers)
+                too_small = not more_body and len(body) < settings.COMPRESSION_MIN_BYTES
+                if already_encoded or too_small or start_message["status"] in (204, 304):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                body = compressor.compress(body, final=not more_body)
+                start_message["headers"] = _compressed_headers(headers, encoding, None if more_body else len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body
+            })
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _compressed_headers(
+    headers: List[Tuple[bytes, bytes]], encoding: str, content_length: Optional[int]
+) -> List[Tuple[bytes, bytes]]:
+    """Rewrite response headers for a compressed body; content_length is None for streamed bodies."""
+    rewritten = []
+    vary = None
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == b"content-length":
+            continue
+        if lowered == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        if lowered == b"vary":
+            vary = value
+            continue
+        rewritten.append((name, value))
+
+    rewritten.append((b"content-encoding", encoding.encode("latin-1")))
+    rewritten.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    if content_length is not None:
+        rewritten.append((b"content-length", str(content_length).encode("latin-1")))
+    return rewritten
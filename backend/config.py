@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 
 class Settings:
@@ -17,8 +17,61 @@ class Settings:
     API_DESCRIPTION: str = "A FastAPI application for managing loans and calculating payments"
     API_VERSION: str = "1.0.0"
     
-    # Database Configuration (for future use)
-    DATABASE_URL: str = "sqlite:///./loans.db"  # Placeholder for future database integration
+    # Database Configuration
+    DATABASE_BACKEND: str = "memory"  # "memory" or "sqlite"
+    DATABASE_URL: str = "sqlite:///./loans.db"  # Used by the "sqlite" backend
+    
+    # Catalog Import/Export Configuration
+    LOAN_BATCH_MAX_OPERATIONS: int = 10000
+    LOAN_IMPORT_MAX_ROWS: int = 100000
+    EXPORT_CHUNK_ROWS: int = 1000  # Loans written per streamed export chunk
+    
+    # Batch Calculation Configuration
+    BATCH_MAX_ITEMS: int = 10000
+    BATCH_CHUNK_SIZE: int = 1024  # Loans computed per vectorized pass
+    
+    # Product Comparison Configuration
+    STANDARD_TERM_YEARS: int = 40  # Annuity factors are cached per product for terms of 1..N years
+    
+    # Solver Configuration
+    SOLVER_MAX_TERM_YEARS: int = 40  # Longer terms are rejected by /calculate-loan/solve/min-term
+    
+    # Sensitivity Grid Configuration
+    GRID_MAX_CELLS: int = 100000
+    
+    # Calculation Cache Configuration
+    CALCULATION_CACHE_MAX_ENTRIES: int = 1024
+    CALCULATION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # Shared Calculation Cache Configuration
+    SHARED_CACHE_ENABLED: bool = False  # Share results between uvicorn workers on one host
+    SHARED_CACHE_PATH: str = "/dev/shm/interest-calculator-cache"
+    SHARED_CACHE_MAX_ENTRIES: int = 4096
+    SHARED_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    
+    # Streaming Configuration
+    STREAM_CHUNK_MONTHS: int = 120  # Schedule months computed per streamed chunk
+    
+    # Portfolio Projection Configuration
+    PORTFOLIO_MAX_LOANS: int = 5_000_000
+    PORTFOLIO_CHUNK_SIZE: int = 1024  # Loans aggregated per vectorized pass
+    PORTFOLIO_PROCESS_POOL_THRESHOLD: int = 50_000  # Loans beyond this are projected in worker processes
+    
+    # Response Compression Configuration
+    COMPRESSION_MIN_BYTES: int = 1024  # Smaller bodies are sent uncompressed
+    GZIP_COMPRESSION_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4  # Favors speed; 11 compresses best but is far slower
+    
+    # Worker Configuration
+    PROCESS_POOL_WORKERS: Optional[int] = None  # Defaults to the number of CPUs
+    PROCESS_POOL_MAX_PENDING: int = 32  # Offloaded requests beyond this get a 503
+    PROCESS_POOL_RETRY_AFTER_SECONDS: int = 1
+    OFFLOAD_MIN_COST: int = 240  # Estimated in rendered schedule rows; cheaper calculations run on the event loop
+    OFFLOAD_MONTH_COST: float = 0.1  # Per month walked by the cents and segmented engines, whatever the page
+    OFFLOAD_EVENT_COST: float = 1.0  # Per lump sum or rate change handled by the segmented engine
+    
+    # Live Calculation Configuration
+    LIVE_MAX_QUEUED_PAGES: int = 32  # Older page requests are dropped once a connection queues more
     
     # Application Configuration
     DEBUG: bool = True
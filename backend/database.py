@@ -1,66 +1,386 @@
-from typing import List, Optional
-from .models import Loan
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .metrics import timed_stage
+from .models import Loan, LoanOperation
+from .config import settings
+from .search import TrigramIndex
+from .utils import calculate_compound_interest_batch
 
 
-class LoanDatabase:
+# Called with the loan before and after a change; either side is None on create/delete
+LoanChangeListener = Callable[[Optional[dict], Optional[dict]], None]
+
+
+DEFAULT_LOANS: List[dict] = [
+    {"id": 1, "productName": "Libranza", "minimumAmount": 5000000, "maximumAmount": 50000000, "anual_interest_rate": 0.165},
+    {"id": 2, "productName": "Hipotecario Vivienda", "minimumAmount": 20000000, "maximumAmount": 500000000, "anual_interest_rate": 0.12},
+    {"id": 3, "productName": "Crédito de Consumo", "minimumAmount": 1000000, "maximumAmount": 25000000, "anual_interest_rate": 0.21},
+    {"id": 4, "productName": "Crédito Vehicular", "minimumAmount": 15000000, "maximumAmount": 150000000, "anual_interest_rate": 0.15},
+    {"id": 5, "productName": "Crédito Educativo", "minimumAmount": 2000000, "maximumAmount": 60000000, "anual_interest_rate": 0.09},
+    {"id": 6, "productName": "Crédito de Libre Inversión", "minimumAmount": 1000000, "maximumAmount": 40000000, "anual_interest_rate": 0.24},
+    {"id": 7, "productName": "Microcrédito para Negocio", "minimumAmount": 500000, "maximumAmount": 25000000, "anual_interest_rate": 0.30}
+]
+
+
+class LoanOperationError(Exception):
+    """Raised when an operation in a batch cannot be applied; the whole batch is discarded."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+class BaseLoanDatabase(ABC):
+    """Interface shared by the loan catalog storage backends."""
+
     def __init__(self):
-        self._loans: List[dict] = [
-            {"id": 1, "productName": "Libranza", "minimumAmount": 5000000, "maximumAmount": 50000000, "anual_interest_rate": 0.165},
-            {"id": 2, "productName": "Hipotecario Vivienda", "minimumAmount": 20000000, "maximumAmount": 500000000, "anual_interest_rate": 0.12},
-            {"id": 3, "productName": "Crédito de Consumo", "minimumAmount": 1000000, "maximumAmount": 25000000, "anual_interest_rate": 0.21},
-            {"id": 4, "productName": "Crédito Vehicular", "minimumAmount": 15000000, "maximumAmount": 150000000, "anual_interest_rate": 0.15},
-            {"id": 5, "productName": "Crédito Educativo", "minimumAmount": 2000000, "maximumAmount": 60000000, "anual_interest_rate": 0.09},
-            {"id": 6, "productName": "Crédito de Libre Inversión", "minimumAmount": 1000000, "maximumAmount": 40000000, "anual_interest_rate": 0.24},
-            {"id": 7, "productName": "Microcrédito para Negocio", "minimumAmount": 500000, "maximumAmount": 25000000, "anual_interest_rate": 0.30}
-        ]
+        self._listeners: List[LoanChangeListener] = []
+        self._annuity_factors: Dict[int, Tuple[float, np.ndarray]] = {}
+
+    def add_listener(self, listener: LoanChangeListener) -> None:
+        """Register a callback notified after every create, update and delete."""
+        self._listeners.append(listener)
 
+    def _notify(self, previous: Optional[dict], current: Optional[dict]) -> None:
+        if previous and (current is None or current["anual_interest_rate"] != previous["anual_interest_rate"]):
+            self._annuity_factors.pop(previous["id"], None)
+        for listener in self._listeners:
+            listener(previous, current)
+
+    def get_annuity_factors(self, loan: dict) -> np.ndarray:
+        """
+        Get the monthly payment per unit of principal for each standard term.
+        
+        Entry i holds the factor for a term of i + 1 years, up to
+        settings.STANDARD_TERM_YEARS. Factors are computed once per product
+        and recomputed when its interest rate changes.
+        """
+        cached = self._annuity_factors.get(loan["id"])
+        if cached is not None and cached[0] == loan["anual_interest_rate"]:
+            return cached[1]
+        
+        terms = np.arange(1, settings.STANDARD_TERM_YEARS + 1)
+        factors = calculate_compound_interest_batch(np.ones(len(terms)), np.full(len(terms), loan["anual_interest_rate"]), terms)
+        self._annuity_factors[loan["id"]] = (loan["anual_interest_rate"], factors)
+        return factors
+
+    @abstractmethod
     def get_all_loans(self) -> List[dict]:
         """Get all loans from the database."""
-        return self._loans.copy()
 
+    @abstractmethod
     def get_loan_by_id(self, loan_id: int) -> Optional[dict]:
         """Get a loan by its ID."""
-        return next((loan for loan in self._loans if loan["id"] == loan_id), None)
 
-    def get_loans_by_name(self, name: str) -> List[dict]:
-        """Get loans that match the given name (case-insensitive partial match)."""
-        name_lower = name.lower()
-        return [loan for loan in self._loans if name_lower in loan["productName"].lower()]
+    @abstractmethod
+    def get_loans_by_name(self, name: str, limit: Optional[int] = None) -> List[dict]:
+        """Get loans that match the given name (case- and accent-insensitive partial match), best first."""
 
+    @abstractmethod
     def create_loan(self, loan: Loan) -> dict:
         """Create a new loan in the database."""
+
+    @abstractmethod
+    def update_loan(self, loan_id: int, updated_loan: Loan) -> Optional[dict]:
+        """Update an existing loan in the database."""
+
+    @abstractmethod
+    def delete_loan(self, loan_id: int) -> bool:
+        """Delete a loan from the database."""
+
+    @abstractmethod
+    def get_loan_by_name(self, loan_name: str) -> Optional[dict]:
+        """Get a loan by its exact name."""
+
+    @abstractmethod
+    def apply_operations(self, operations: List[LoanOperation]) -> List[Optional[dict]]:
+        """
+        Apply a batch of creates, updates and deletes atomically.
+        
+        Operations run in order and share one catalog version. If any of them
+        targets a missing loan, LoanOperationError is raised and nothing is
+        applied. Returns the resulting loan for each create and update, and
+        None for each delete.
+        """
+
+    @abstractmethod
+    def get_version(self) -> int:
+        """Get the catalog version, incremented by every create, update and delete."""
+
+    @abstractmethod
+    def get_loan_version(self, loan_id: int) -> Optional[int]:
+        """Get the catalog version at which a loan last changed, or None if it does not exist."""
+
+    @abstractmethod
+    def get_changes_since(self, version: int) -> dict:
+        """
+        Get what changed after the given catalog version.
+        
+        Returns a dictionary with the current "version", the "changed" loans
+        (created or updated) and the ids of "deleted" loans.
+        """
+
+
+class _CatalogState:
+    """
+    One version of the in-memory catalog.
+    
+    A published state is never modified: writers work on a copy made by
+    begin_write and publish it with a single attribute assignment. Loan
+    dicts are replaced rather than updated, so they can be shared between
+    states.
+    """
+
+    __slots__ = (
+        "loans", "ids_by_name", "search_index", "next_id",
+        "version", "loan_versions", "deleted_versions", "snapshot"
+    )
+
+    def __init__(self):
+        self.loans: Dict[int, dict] = {}
+        self.ids_by_name: Dict[str, Tuple[int, ...]] = {}
+        self.search_index = TrigramIndex()
+        self.next_id = 1
+        self.version = 0
+        self.loan_versions: Dict[int, int] = {}
+        self.deleted_versions: Dict[int, int] = {}
+        # Built lazily by the first reader; racing readers build identical lists
+        self.snapshot: Optional[List[dict]] = None
+
+    def begin_write(self) -> "_CatalogState":
+        """Copy this state into a private working state for the next catalog version."""
+        state = _CatalogState()
+        state.loans = dict(self.loans)
+        state.ids_by_name = dict(self.ids_by_name)
+        state.search_index = self.search_index.copy()
+        state.next_id = self.next_id
+        state.version = self.version + 1
+        state.loan_versions = dict(self.loan_versions)
+        state.deleted_versions = dict(self.deleted_versions)
+        return state
+
+    def insert(self, loan_dict: dict) -> None:
+        self.loans[loan_dict["id"]] = loan_dict
+        self._index_name(loan_dict)
+        self.search_index.add(loan_dict["id"], loan_dict["productName"])
+        self.next_id = max(self.next_id, loan_dict["id"] + 1)
+        self.loan_versions[loan_dict["id"]] = self.version
+        self.snapshot = None
+
+    def create(self, loan: Loan) -> dict:
         loan_dict = loan.model_dump()
-        loan_dict["id"] = len(self._loans) + 1
-        self._loans.append(loan_dict)
+        loan_dict["id"] = self.next_id
+        self.insert(loan_dict)
         return loan_dict
 
+    def update(self, loan_id: int, updated_loan: Loan) -> Tuple[dict, dict]:
+        previous = self.loans[loan_id]
+        loan_dict = {**previous, **updated_loan.model_dump(exclude_unset=True)}
+        loan_dict["id"] = loan_id  # Ensure ID from URL is respected
+        self.loans[loan_id] = loan_dict
+        
+        if loan_dict["productName"] != previous["productName"]:
+            self._unindex_name(previous)
+            self._index_name(loan_dict)
+            self.search_index.add(loan_id, loan_dict["productName"])
+        
+        self.loan_versions[loan_id] = self.version
+        self.snapshot = None
+        return previous, loan_dict
+
+    def delete(self, loan_id: int) -> dict:
+        previous = self.loans.pop(loan_id)
+        self._unindex_name(previous)
+        self.search_index.remove(loan_id)
+        del self.loan_versions[loan_id]
+        self.deleted_versions[loan_id] = self.version
+        self.snapshot = None
+        return previous
+
+    def _index_name(self, loan_dict: dict) -> None:
+        ids = self.ids_by_name.get(loan_dict["productName"], ())
+        # Keep the lowest id first, matching catalog order
+        self.ids_by_name[loan_dict["productName"]] = tuple(sorted(ids + (loan_dict["id"],)))
+
+    def _unindex_name(self, loan_dict: dict) -> None:
+        ids = tuple(loan_id for loan_id in self.ids_by_name[loan_dict["productName"]] if loan_id != loan_dict["id"])
+        if ids:
+            self.ids_by_name[loan_dict["productName"]] = ids
+        else:
+            del self.ids_by_name[loan_dict["productName"]]
+
+
+class LoanDatabase(BaseLoanDatabase):
+    """
+    In-memory loan catalog indexed by id and exact product name.
+    
+    Loans are kept in an insertion-ordered dict keyed by id, and ids come
+    from a monotonic counter so they are never reused after a delete.
+    Each loan remembers the catalog version of its last change, and deleted
+    ids are kept as tombstones so clients can sync incrementally.
+    
+    The catalog is copy-on-write: readers take the current immutable state
+    without locking, while writers are serialized by a lock, build the next
+    state on a copy and swap it in atomically. Readers therefore never see
+    a half-applied write, and a batch becomes visible all at once. Each
+    write copies the catalog's dicts, so bulk changes should go through
+    apply_operations.
+    """
+
+    def __init__(self, loans: Optional[List[dict]] = None):
+        super().__init__()
+        self._write_lock = threading.Lock()
+        state = _CatalogState()
+        for loan in DEFAULT_LOANS if loans is None else loans:
+            state.insert(dict(loan))
+        self._state = state
+
+    @timed_stage("catalog.get_all_loans")
+    def get_all_loans(self) -> List[dict]:
+        """
+        Get all loans from the database.
+        
+        The returned list is a shared snapshot rebuilt only after the catalog
+        changes, so callers must not mutate it.
+        """
+        state = self._state
+        if state.snapshot is None:
+            state.snapshot = list(state.loans.values())
+        return state.snapshot
+
+    @timed_stage("catalog.get_loan_by_id")
+    def get_loan_by_id(self, loan_id: int) -> Optional[dict]:
+        """Get a loan by its ID."""
+        return self._state.loans.get(loan_id)
+
+    @timed_stage("catalog.get_loans_by_name")
+    def get_loans_by_name(self, name: str, limit: Optional[int] = None) -> List[dict]:
+        """Get loans that match the given name (case- and accent-insensitive partial match), best first."""
+        state = self._state
+        return [state.loans[loan_id] for loan_id in state.search_index.search(name, limit)]
+
+    @timed_stage("catalog.create_loan")
+    def create_loan(self, loan: Loan) -> dict:
+        """Create a new loan in the database."""
+        with self._write_lock:
+            state = self._state.begin_write()
+            loan_dict = state.create(loan)
+            self._state = state
+        
+        self._notify(None, loan_dict)
+        return loan_dict
+
+    @timed_stage("catalog.update_loan")
     def update_loan(self, loan_id: int, updated_loan: Loan) -> Optional[dict]:
         """Update an existing loan in the database."""
-        loan_index = next((i for i, loan in enumerate(self._loans) if loan["id"] == loan_id), None)
+        with self._write_lock:
+            if loan_id not in self._state.loans:
+                return None
+            state = self._state.begin_write()
+            previous, loan_dict = state.update(loan_id, updated_loan)
+            self._state = state
         
-        if loan_index is None:
-            return None
-            
-        update_data = updated_loan.model_dump(exclude_unset=True)
-        self._loans[loan_index].update(update_data)
-        self._loans[loan_index]["id"] = loan_id  # Ensure ID from URL is respected
-        
-        return self._loans[loan_index]
+        self._notify(previous, loan_dict)
+        return loan_dict
 
+    @timed_stage("catalog.delete_loan")
     def delete_loan(self, loan_id: int) -> bool:
         """Delete a loan from the database."""
-        loan_index = next((i for i, loan in enumerate(self._loans) if loan["id"] == loan_id), None)
+        with self._write_lock:
+            if loan_id not in self._state.loans:
+                return False
+            state = self._state.begin_write()
+            previous = state.delete(loan_id)
+            self._state = state
         
-        if loan_index is None:
-            return False
-            
-        self._loans.pop(loan_index)
+        self._notify(previous, None)
         return True
 
+    @timed_stage("catalog.apply_operations")
+    def apply_operations(self, operations: List[LoanOperation]) -> List[Optional[dict]]:
+        """
+        Apply a batch of creates, updates and deletes atomically.
+        
+        Targets are checked against the ids the batch itself creates and
+        deletes before anything is written, and the whole batch is built on
+        one working state, so a failing batch leaves the catalog untouched.
+        """
+        with self._write_lock:
+            live_ids = set(self._state.loans)
+            next_id = self._state.next_id
+            for index, operation in enumerate(operations):
+                if operation.op == "create":
+                    live_ids.add(next_id)
+                    next_id += 1
+                elif operation.id not in live_ids:
+                    raise LoanOperationError(index, f"Loan with id {operation.id} not found")
+                elif operation.op == "delete":
+                    live_ids.remove(operation.id)
+            
+            state = self._state.begin_write()
+            results, changes = [], []
+            for operation in operations:
+                if operation.op == "create":
+                    loan_dict = state.create(operation.loan)
+                    changes.append((None, loan_dict))
+                elif operation.op == "update":
+                    previous, loan_dict = state.update(operation.id, operation.loan)
+                    changes.append((previous, loan_dict))
+                else:
+                    loan_dict = None
+                    changes.append((state.delete(operation.id), None))
+                results.append(loan_dict)
+            self._state = state
+        
+        for previous, current in changes:
+            self._notify(previous, current)
+        return results
+
+    @timed_stage("catalog.get_loan_by_name")
     def get_loan_by_name(self, loan_name: str) -> Optional[dict]:
         """Get a loan by its exact name."""
-        return next((loan for loan in self._loans if loan["productName"] == loan_name), None)
+        state = self._state
+        ids = state.ids_by_name.get(loan_name)
+        return state.loans[ids[0]] if ids else None
+
+    def get_version(self) -> int:
+        """Get the catalog version, incremented by every create, update and delete."""
+        return self._state.version
+
+    def get_loan_version(self, loan_id: int) -> Optional[int]:
+        """Get the catalog version at which a loan last changed, or None if it does not exist."""
+        return self._state.loan_versions.get(loan_id)
+
+    @timed_stage("catalog.get_changes_since")
+    def get_changes_since(self, version: int) -> dict:
+        """Get the loans changed and the ids deleted after the given catalog version."""
+        state = self._state
+        return {
+            "version": state.version,
+            "changed": [
+                state.loans[loan_id]
+                for loan_id, loan_version in state.loan_versions.items()
+                if loan_version > version
+            ],
+            "deleted": sorted(
+                loan_id for loan_id, deleted_version in state.deleted_versions.items()
+                if deleted_version > version
+            )
+        }
+
+
+def create_loan_database() -> BaseLoanDatabase:
+    """Create the storage backend selected by settings.DATABASE_BACKEND."""
+    if settings.DATABASE_BACKEND == "memory":
+        return LoanDatabase()
+    if settings.DATABASE_BACKEND == "sqlite":
+        from .sqlite_database import SQLiteLoanDatabase
+        return SQLiteLoanDatabase(settings.DATABASE_URL)
+    raise ValueError(f"Unknown database backend '{settings.DATABASE_BACKEND}'")
 
 
 # Global database instance
-loan_db = LoanDatabase() 
\ No newline at end of file
+loan_db = create_loan_database()
@@ -0,0 +1,166 @@
+import asyncio
+import json
+from collections import deque
+from typing import Optional, Union
+
+from fastapi import HTTPException, WebSocket
+from pydantic import TypeAdapter, ValidationError
+
+from .config import settings
+from .models import LiveCalculate, LiveMessage, LivePage
+from .schedule import encode_json
+from .services import loan_calculation_service
+
+
+_live_messages = TypeAdapter(LiveMessage)
+
+
+class LiveCalculationSession:
+    """
+    Live recalculation for one calculator page over a WebSocket.
+    
+    The page sends its whole form as a "calculate" message whenever an
+    input changes. Inputs are handled latest-wins: a calculate message
+    replaces one still queued, and cancels the wait for one being computed
+    (a computation shared with other requests keeps running for them).
+    Each calculation is answered with its summary first; schedule rows are
+    sent only when asked for with "page" messages, and pages of a
+    superseded calculation are dropped.
+    
+    Calculations go through LoanCalculationService.get_calculation_async,
+    so they use the calculation cache and identical calculations in flight
+    from other connections or HTTP requests are computed once.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self._calculation: Optional[LiveCalculate] = None  # Latest calculation not yet started
+        self._current: Optional[LiveCalculate] = None  # Calculation whose summary was sent last
+        self._pages: deque = deque(maxlen=settings.LIVE_MAX_QUEUED_PAGES)
+        self._step: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+    
+    async def run(self) -> None:
+        """Accept the connection and serve it until the client disconnects."""
+        await self.websocket.accept()
+        receiver = asyncio.ensure_future(self._receive())
+        worker = asyncio.ensure_future(self._work())
+        try:
+            done, _ = await asyncio.wait((receiver, worker), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._closed = True
+            receiver.cancel()
+            worker.cancel()
+            await asyncio.gather(receiver, worker, return_exceptions=True)
+        
+        # The worker only stops first when a calculation failed unexpectedly
+        if worker in done:
+            worker.result()
+    
+    async def _receive(self) -> None:
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            data = message.get("text") if message.get("text") is not None else message.get("bytes")
+            try:
+                request = _live_messages.validate_json(data)
+            except ValidationError as error:
+                await self._send({
+                    "type": "error",
+                    "id": _message_id(data),
+                    "status_code": 422,
+                    "detail": json.loads(error.json(include_url=False))
+                })
+                continue
+            
+            if isinstance(request, LiveCalculate):
+                self._calculation = request
+                self._pages.clear()
+                if request.limit is not None:
+                    self._pages.append(LivePage(type="page", id=request.id, limit=request.limit))
+                if self._step is not None and not self._step.done():
+                    self._step.cancel()
+            else:
+                latest = self._calculation or self._current
+                if latest is None or request.id != latest.id:
+                    continue
+                self._pages.append(request)
+            self._ready.set()
+    
+    async def _work(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._calculation is not None or self._pages:
+                if self._calculation is not None:
+                    request, self._calculation = self._calculation, None
+                    self._step = asyncio.ensure_future(self._calculate(request))
+                else:
+                    self._step = asyncio.ensure_future(self._page(self._pages.popleft()))
+                try:
+                    await self._step
+                except asyncio.CancelledError:
+                    # Superseded steps are cancelled on their own; the worker itself only on close
+                    if self._closed:
+                        raise
+    
+    async def _calculate(self, request: LiveCalculate) -> None:
+        self._current = None
+        try:
+            summary, _, num_payments = await loan_calculation_service.get_calculation_async(
+                request.input, request.format, 0, 0
+            )
+        except HTTPException as error:
+            await self._send_error(request.id, error)
+            return
+        
+        self._current = request
+        await self._send({
+            "type": "summary",
+            "id": request.id,
+            "months": num_payments,
+            "summary": loan_calculation_service.stamp_summary(summary, num_payments)
+        })
+    
+    async def _page(self, request: LivePage) -> None:
+        current = self._current
+        if current is None or request.id != current.id:
+            return
+        try:
+            _, amortization_schedule, _ = await loan_calculation_service.get_calculation_async(
+                current.input, current.format, request.offset, request.limit
+            )
+        except HTTPException as error:
+            await self._send_error(request.id, error)
+            return
+        
+        await self._send({
+            "type": "page",
+            "id": request.id,
+            "offset": request.offset,
+            "schedule": amortization_schedule
+        })
+    
+    async def _send_error(self, request_id: Union[int, str, None], error: HTTPException) -> None:
+        await self._send({"type": "error", "id": request_id, "status_code": error.status_code, "detail": error.detail})
+    
+    async def _send(self, message: dict) -> None:
+        # Shielded so a superseded step cannot abandon a frame the server has started writing
+        await asyncio.shield(self._send_text(encode_json(message).decode("utf-8")))
+    
+    async def _send_text(self, text: str) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+
+def _message_id(data: Union[str, bytes, None]) -> Union[int, str, None]:
+    """Best-effort id of a message that failed validation, so the client can match the error."""
+    try:
+        message = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    request_id = message.get("id") if isinstance(message, dict) else None
+    return request_id if isinstance(request_id, (int, str)) else None
@@ -1,17 +1,88 @@
-from typing import Union
-from fastapi import FastAPI
+from typing import Callable, Optional, Union
+from fastapi import FastAPI, File, Query, Request, Response, UploadFile, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-from .models import Item, Loan, LoanSearch, LoanCalculation
-from .services import loan_service, loan_calculation_service
+from .models import (
+    Item,
+    Loan,
+    LoanBatchMutation,
+    LoanCalculation,
+    LoanCalculationBatch,
+    LoanComparison,
+    LoanSearch,
+    MaxAmountSolve,
+    MinTermSolve,
+    OutputFormat,
+    PortfolioProjection,
+    ProfilingConfig,
+    RateSolve,
+    SensitivityGrid,
+    StreamFormat,
+)
+from .services import loan_service, loan_calculation_service, portfolio_service
 from .config import settings
+from .compression import CompressionMiddleware
+from .live import LiveCalculationSession
+from .schedule import encode_json
+from .metrics import MetricsMiddleware, profiler, render_metrics, track_stage
+from .workers import shutdown_process_pool
+
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class TimedJSONResponse(JSONResponse):
+    """
+    JSON response that records the time spent encoding the body.
+    
+    Encodes with orjson when it is installed, which is several times faster
+    than the stdlib encoder on long amortization schedules. Schedules are
+    spliced in from their own pre-encoded body.
+    """
+
+    def render(self, content) -> bytes:
+        with track_stage("response.serialization"):
+            return encode_json(content)
+
+
+def json_response(content) -> TimedJSONResponse:
+    """
+    Wrap content that is already JSON-native in a response.
+    
+    Returning a Response makes FastAPI skip jsonable_encoder, which otherwise
+    walks every row of a large schedule before it is encoded.
+    """
+    return TimedJSONResponse(content)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison (RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def conditional_response(request: Request, etag: str, build_content: Callable[[], object]) -> Response:
+    """
+    Answer 304 Not Modified when the client already holds this ETag, else render the content.
+    
+    build_content is only called on a miss, so unchanged resources are never
+    fetched or serialized.
+    """
+    headers = {"ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return TimedJSONResponse(build_content(), headers=headers)
 
 
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
     version=settings.API_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=TimedJSONResponse
 )
 
 app.add_middleware(
@@ -21,6 +92,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_event_handler("shutdown", shutdown_process_pool)
 
 
 @app.get("/")
@@ -49,13 +123,42 @@ def create_loan(loan: Loan):
 
 
 @app.get("/loans")
-def get_loans(name: Union[str, None] = None):
-    return loan_service.get_all_loans(name)
+async def get_loans(request: Request, name: Union[str, None] = None, limit: Union[int, None] = Query(None, ge=1)):
+    # The version is read before the loans, so a concurrent write can only make the ETag stale, never too new
+    etag = f'"catalog-{loan_service.get_catalog_version()}"'
+    if name:
+        # Searched first, so a search that matches nothing answers 404 rather than confirming a cached copy
+        loans = loan_service.get_all_loans(name, limit)
+        return conditional_response(request, etag, lambda: loans)
+    return conditional_response(request, etag, loan_service.get_all_loans)
+
+
+@app.post("/loans/batch")
+def apply_loan_operations(batch: LoanBatchMutation):
+    return loan_service.apply_operations(batch)
+
+
+@app.post("/loans/import")
+def import_loans(format: StreamFormat = "csv", file: UploadFile = File(...)):
+    return loan_service.import_loans(file.file, format)
+
+
+@app.get("/loans/export")
+def export_loans(format: StreamFormat = "ndjson"):
+    return StreamingResponse(loan_service.export_loans(format), media_type=STREAM_MEDIA_TYPES[format])
+
+
+@app.get("/loans/changes")
+async def get_loan_changes(since: int = Query(..., ge=0)):
+    return loan_service.get_catalog_changes(since)
 
 
 @app.get("/loans/{loan_id}")
-def get_loan(loan_id: int):
-    return loan_service.get_loan_by_id(loan_id)
+async def get_loan(request: Request, loan_id: int):
+    loan_version = loan_service.get_loan_version(loan_id)
+    if loan_version is None:
+        return loan_service.get_loan_by_id(loan_id)
+    return conditional_response(request, f'"loan-{loan_id}-{loan_version}"', lambda: loan_service.get_loan_by_id(loan_id))
 
 
 @app.put("/loans/{loan_id}")
@@ -69,10 +172,86 @@ def delete_loan(loan_id: int):
 
 
 @app.post("/loans/search")
-def search_loans(search: LoanSearch):
-    return loan_service.search_loans(search.productName)
+async def search_loans(search: LoanSearch):
+    return loan_service.search_loans(search.productName, search.limit)
 
 
 @app.post("/calculate-loan")
-def calculate_loan(calculation_input: LoanCalculation):
-    return loan_calculation_service.calculate_loan(calculation_input) 
\ No newline at end of file
+async def calculate_loan(
+    calculation_input: LoanCalculation,
+    format: OutputFormat = "display",
+    offset: int = Query(0, ge=0),
+    limit: Union[int, None] = Query(None, ge=1),
+    stream: Union[StreamFormat, None] = None
+):
+    if stream:
+        return StreamingResponse(
+            loan_calculation_service.stream_loan(calculation_input, stream, format, offset, limit),
+            media_type=STREAM_MEDIA_TYPES[stream]
+        )
+    return json_response(await loan_calculation_service.calculate_loan_async(calculation_input, format, offset, limit))
+
+
+@app.websocket("/calculate-loan/live")
+async def calculate_loan_live(websocket: WebSocket):
+    await LiveCalculationSession(websocket).run()
+
+
+@app.get("/calculate-loan/cache")
+def get_calculation_cache_stats():
+    return loan_calculation_service.get_cache_stats()
+
+
+@app.post("/calculate-loan/batch")
+async def calculate_loan_batch(batch_input: LoanCalculationBatch):
+    return json_response(await loan_calculation_service.calculate_loan_batch_async(batch_input))
+
+
+@app.post("/calculate-loan/solve/max-amount")
+def solve_max_amount(solve_input: MaxAmountSolve):
+    return loan_calculation_service.solve_max_amount(solve_input)
+
+
+@app.post("/calculate-loan/solve/min-term")
+def solve_min_term(solve_input: MinTermSolve):
+    return loan_calculation_service.solve_min_term(solve_input)
+
+
+@app.post("/calculate-loan/solve/rate")
+def solve_rate(solve_input: RateSolve):
+    return loan_calculation_service.solve_rate(solve_input)
+
+
+@app.post("/calculate-loan/compare")
+def compare_loans(comparison_input: LoanComparison, format: OutputFormat = "display"):
+    return loan_calculation_service.compare_loans(comparison_input, format)
+
+
+@app.post("/calculate-loan/grid")
+def calculate_sensitivity_grid(grid_input: SensitivityGrid):
+    return json_response(loan_calculation_service.calculate_sensitivity_grid(grid_input))
+
+
+@app.post("/portfolio/projection")
+def project_portfolio(portfolio: PortfolioProjection):
+    return json_response(portfolio_service.project_portfolio(portfolio.loans))
+
+
+@app.post("/portfolio/projection/upload")
+def project_portfolio_upload(file: UploadFile = File(...)):
+    return json_response(portfolio_service.project_portfolio(portfolio_service.parse_portfolio_csv(file.file)))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/metrics/profiling")
+def configure_profiling(config: ProfilingConfig):
+    return profiler.configure(config.enabled, config.sample_rate, config.reset)
+
+
+@app.get("/metrics/profile", response_class=PlainTextResponse)
+def get_profile(limit: int = Query(30, ge=1)):
+    return profiler.report(limit)
@@ -0,0 +1,201 @@
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Latency buckets in seconds, from sub-millisecond catalog reads to multi-second batches
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative latency histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        """Record one observation for the given label values."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One counter per bucket, then +Inf, then the running sum
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        """Render the histogram as Prometheus exposition lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(labels, list(series)) for labels, series in self._series.items()]
+        
+        for labels, series in sorted(series_items):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {int(cumulative)}')
+            cumulative += series[-2]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {int(cumulative)}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {int(cumulative)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SampledProfiler:
+    """
+    cProfile capture of a random sample of calls, toggled at runtime.
+    
+    Only one call is profiled at a time; calls arriving while a capture is
+    running are simply not sampled. Samples are merged into one report.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.samples = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._busy = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def configure(self, enabled: bool, sample_rate: float, reset: bool = False) -> dict:
+        """Turn sampling on or off and optionally discard collected samples."""
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        if reset:
+            with self._stats_lock:
+                self._stats = None
+                self.samples = 0
+        return self.status()
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "samples": self.samples}
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """Profile the enclosed block if this call is sampled."""
+        if not self.enabled or random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            yield
+            return
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            self._busy.release()
+        
+        with self._stats_lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.samples += 1
+
+    def report(self, limit: int = 30, sort_by: str = "cumulative") -> str:
+        """Render the merged samples as a pstats listing."""
+        with self._stats_lock:
+            if self._stats is None:
+                return "No profiling samples collected.\n"
+            output = io.StringIO()
+            self._stats.stream = output
+            self._stats.sort_stats(sort_by).print_stats(limit)
+            return output.getvalue()
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template.",
+    ("method", "route", "status")
+)
+stage_latency = Histogram(
+    "loan_stage_duration_seconds",
+    "Latency of instrumented stages inside request handling.",
+    ("stage",)
+)
+profiler = SampledProfiler()
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    return "\n".join(request_latency.render() + stage_latency.render()) + "\n"
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block under the given stage name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe((stage,), time.perf_counter() - start)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator recording every call of the wrapped function under a stage name."""
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage_latency.observe((stage,), time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template and status code."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template, not raw path, to keep the number of series bounded
+            route = scope.get("route")
+            request_latency.observe(
+                (scope["method"], route.path if route else "unmatched", str(status_code)),
+                time.perf_counter() - start
+            )
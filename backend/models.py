@@ -1,5 +1,18 @@
-from typing import Union
-from pydantic import BaseModel
+from typing import Annotated, Literal, Union
+from pydantic import BaseModel, Field
+
+
+# "display" renders currency strings; "raw" returns plain floats in columns
+OutputFormat = Literal["display", "raw"]
+
+# Media types /calculate-loan can stream the schedule as
+StreamFormat = Literal["ndjson", "csv"]
+
+# "float" uses the closed-form engine; "cents" computes in exact integer cents
+CalculationEngine = Literal["float", "cents"]
+
+# Per-period interest rounding used by the "cents" engine
+RoundingMode = Literal["half_even", "half_up"]
 
 
 class Item(BaseModel):
@@ -16,8 +29,29 @@ class Loan(BaseModel):
     anual_interest_rate: float
 
 
+class LoanOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Union[int, None] = None
+    loan: Union[Loan, None] = None
+
+
+class LoanBatchMutation(BaseModel):
+    operations: list[LoanOperation]
+
+
 class LoanSearch(BaseModel):
     productName: str
+    limit: Union[int, None] = Field(default=None, ge=1)
+
+
+class LumpSum(BaseModel):
+    month: int = Field(ge=1)
+    amount: float = Field(gt=0)
+
+
+class RateChange(BaseModel):
+    month: int = Field(ge=1)
+    annualInterestRate: float = Field(ge=0)
 
 
 class LoanCalculation(BaseModel):
@@ -25,6 +59,92 @@ class LoanCalculation(BaseModel):
     loanName: str
     years: int
     customInterestRate: Union[float, None] = None
+    extraMonthlyPayment: float = Field(default=0, ge=0)
+    lumpSums: list[LumpSum] = []
+    recastMode: Literal["reduce_term", "reduce_payment"] = "reduce_term"
+    rateChanges: list[RateChange] = []
+    engine: CalculationEngine = "float"
+    rounding: RoundingMode = "half_even"
+
+
+class LoanCalculationBatch(BaseModel):
+    items: list[LoanCalculation]
+    include_schedule: bool = True
+
+
+class LiveCalculate(BaseModel):
+    type: Literal["calculate"]
+    id: Union[int, str, None] = None
+    input: LoanCalculation
+    format: OutputFormat = "display"
+    limit: Union[int, None] = Field(default=None, ge=1)  # Rows of the first page to send with the summary
+
+
+class LivePage(BaseModel):
+    type: Literal["page"]
+    id: Union[int, str, None] = None
+    offset: int = Field(default=0, ge=0)
+    limit: int = Field(ge=1)
+
+
+# Messages a client sends on the live calculation WebSocket
+LiveMessage = Annotated[Union[LiveCalculate, LivePage], Field(discriminator="type")]
+
+
+class MaxAmountSolve(BaseModel):
+    loanName: str
+    monthlyPayment: float = Field(gt=0)
+    years: int
+    customInterestRate: Union[float, None] = None
+
+
+class MinTermSolve(BaseModel):
+    loanName: str
+    amount: float
+    monthlyPayment: float = Field(gt=0)
+    customInterestRate: Union[float, None] = None
+
+
+class RateSolve(BaseModel):
+    loanName: str
+    amount: float
+    monthlyPayment: float = Field(gt=0)
+    years: int
+
+
+class LoanComparison(BaseModel):
+    amount: float
+    years: int
+
+
+class PortfolioLoan(BaseModel):
+    loanName: str
+    amount: float
+    years: int
+    customInterestRate: Union[float, None] = None
+
+
+class PortfolioProjection(BaseModel):
+    loans: list[PortfolioLoan]
+
+
+class ValueRange(BaseModel):
+    start: float
+    stop: float
+    step: float = Field(gt=0)
+
+
+class TermRange(BaseModel):
+    start: int
+    stop: int
+    step: int = Field(gt=0)
+
+
+class SensitivityGrid(BaseModel):
+    loanName: str
+    amount: float
+    annualRates: Union[list[float], ValueRange]
+    years: Union[list[int], TermRange]
 
 
 class LoanSummary(BaseModel):
@@ -46,4 +166,10 @@ class AmortizationEntry(BaseModel):
 
 class CalculationResponse(BaseModel):
     summary: LoanSummary
-    amortization_schedule: list[AmortizationEntry] 
\ No newline at end of file
+    amortization_schedule: list[AmortizationEntry]
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(default=1.0, gt=0, le=1)
+    reset: bool = False
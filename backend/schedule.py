@@ -0,0 +1,266 @@
+import json
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; schedules fall back to the stdlib encoder
+    orjson = None
+
+
+def schedule_fields(output_format: str = "display", with_prepayments: bool = False) -> List[str]:
+    """
+    Field names of a schedule row, in output order.
+    
+    Raw fixed-payment schedules leave the monthly payment out because it is
+    constant and already reported in the summary.
+    
+    Args:
+        output_format: "display" or "raw"
+        with_prepayments: Whether the schedule has a prepayment column
+    
+    Returns:
+        The field names
+    """
+    fields = ["month"]
+    if output_format != "raw" or with_prepayments:
+        fields.append("monthly_payment")
+    fields += ["principal_paid", "interest_paid"]
+    if with_prepayments:
+        fields.append("prepayment")
+    fields.append("remaining_balance")
+    return fields
+
+
+def _dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json(content) -> bytes:
+    """
+    Encode a JSON response body that may contain AmortizationSchedule values.
+    
+    Uses orjson when it is installed, splicing each schedule in from its
+    pre-encoded body; otherwise falls back to the stdlib encoder with
+    compact separators.
+    
+    Args:
+        content: JSON-native values, NumPy arrays and schedules
+    
+    Returns:
+        The UTF-8 encoded body
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_encode_schedule, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content,
+        default=_encode_schedule,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _encode_schedule(value):
+    """Encoder fallback for AmortizationSchedule values."""
+    if not isinstance(value, AmortizationSchedule):
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    if orjson is not None and hasattr(orjson, "Fragment"):
+        return orjson.Fragment(value.to_json())
+    return value.to_list()
+
+
+class ScheduleRow:
+    """
+    View of one month of an AmortizationSchedule.
+    
+    Rows are created on demand and only hold a reference to the schedule
+    and an index, so iterating a schedule does not copy its values.
+    Item access returns values as the schedule's output format renders them.
+    """
+    
+    __slots__ = ("_schedule", "_index")
+    
+    def __init__(self, schedule: "AmortizationSchedule", index: int):
+        self._schedule = schedule
+        self._index = index
+    
+    @property
+    def month(self) -> int:
+        return int(self._schedule.columns["month"][self._index])
+    
+    @property
+    def monthly_payment(self) -> float:
+        return float(self._schedule.columns["monthly_payment"][self._index])
+    
+    @property
+    def principal_paid(self) -> float:
+        return float(self._schedule.columns["principal_paid"][self._index])
+    
+    @property
+    def interest_paid(self) -> float:
+        return float(self._schedule.columns["interest_paid"][self._index])
+    
+    @property
+    def prepayment(self) -> float:
+        columns = self._schedule.columns
+        return float(columns["prepayment"][self._index]) if "prepayment" in columns else 0.0
+    
+    @property
+    def remaining_balance(self) -> float:
+        return float(self._schedule.columns["remaining_balance"][self._index])
+    
+    def __getitem__(self, field: str) -> Union[int, float, str]:
+        if field not in self._schedule.fields:
+            raise KeyError(field)
+        return self._schedule._render_value(field, getattr(self, field))
+    
+    def keys(self) -> List[str]:
+        return self._schedule.fields
+    
+    def to_dict(self) -> dict:
+        """The row as a dictionary in the schedule's output format."""
+        return {field: self[field] for field in self._schedule.fields}
+    
+    def __repr__(self) -> str:
+        return f"ScheduleRow({self.to_dict()!r})"
+
+
+class AmortizationSchedule:
+    """
+    Compact, array-backed amortization schedule.
+    
+    Months are stored as parallel NumPy columns instead of one dictionary of
+    formatted strings per month, so a 480-month schedule is a handful of
+    objects rather than thousands. Rows are materialized only when asked
+    for: indexing and iteration return ScheduleRow views, slicing returns a
+    schedule over views of the same columns, and to_json renders the
+    response body straight from the columns. The encoded body is kept once
+    built, so cached schedules are serialized a single time.
+    
+    The output format ("display" or "raw") decides how values are rendered:
+    display rows hold "$1,234.56" strings, raw schedules are encoded as
+    parallel lists of numbers rounded to cents.
+    """
+    
+    __slots__ = ("columns", "output_format", "fields", "_encoded")
+    
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        output_format: str = "display",
+        encoded: Optional[bytes] = None
+    ):
+        """
+        Args:
+            columns: Columns produced by compute_amortization_columns,
+                compute_amortization_columns_cents or compute_prepayment_columns
+            output_format: "display" or "raw"
+            encoded: The body to_json would produce, when already known
+        """
+        self.columns = columns
+        self.output_format = output_format
+        self.fields = schedule_fields(output_format, "prepayment" in columns)
+        self._encoded = encoded
+    
+    def __len__(self) -> int:
+        return len(self.columns["month"])
+    
+    def __iter__(self) -> Iterator[ScheduleRow]:
+        for index in range(len(self)):
+            yield ScheduleRow(self, index)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[ScheduleRow, "AmortizationSchedule"]:
+        if isinstance(index, slice):
+            return AmortizationSchedule(
+                {name: column[index] for name, column in self.columns.items()}, self.output_format
+            )
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("schedule index out of range")
+        return ScheduleRow(self, index)
+    
+    def __repr__(self) -> str:
+        return f"AmortizationSchedule({len(self)} months, output_format={self.output_format!r})"
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns and the encoded body, if built."""
+        encoded = len(self._encoded) if self._encoded is not None else 0
+        return sum(column.nbytes for column in self.columns.values()) + encoded
+    
+    def _render_value(self, field: str, value: Union[int, float]) -> Union[int, float, str]:
+        if field == "month":
+            return value
+        if self.output_format == "raw":
+            return float(np.round(value, 2))
+        return f"${value:,.2f}"
+    
+    def _rendered_columns(self) -> List[list]:
+        """Every output column as a list of rendered values."""
+        rendered = []
+        for field in self.fields:
+            column = self.columns[field]
+            if field == "month":
+                rendered.append(column.tolist())
+            elif self.output_format == "raw":
+                rendered.append(np.round(column, 2).tolist())
+            else:
+                rendered.append([f"${value:,.2f}" for value in column.tolist()])
+        return rendered
+    
+    def _row_template(self, item_separator: str = ",", key_separator: str = ":") -> str:
+        """printf-style template rendering one row as a JSON object."""
+        value_format = "%r" if self.output_format == "raw" else '"%s"'
+        return "{" + item_separator.join(
+            f'"{field}"{key_separator}' + ("%d" if field == "month" else value_format) for field in self.fields
+        ) + "}"
+    
+    def iter_values(self) -> Iterator[Tuple]:
+        """Yield each month's rendered values as a tuple ordered like fields."""
+        return zip(*self._rendered_columns())
+    
+    def iter_rows(self) -> Iterator[dict]:
+        """Yield each month as a dictionary in the output format."""
+        fields = self.fields
+        for values in self.iter_values():
+            yield dict(zip(fields, values))
+    
+    def to_list(self) -> Union[List[dict], Dict[str, list]]:
+        """
+        The schedule as plain Python values.
+        
+        Returns:
+            A list of row dictionaries for display output, or a dictionary
+            of parallel lists for raw output
+        """
+        if self.output_format == "raw":
+            return dict(zip(self.fields, self._rendered_columns()))
+        return list(self.iter_rows())
+    
+    def to_json(self) -> bytes:
+        """
+        Encode the schedule as it appears in a JSON response.
+        
+        Display rows are rendered through a row template, without building
+        a dictionary per month. The result is kept for later calls.
+        """
+        if self._encoded is None:
+            if self.output_format == "raw":
+                self._encoded = _dumps(self.to_list())
+            else:
+                template = self._row_template()
+                self._encoded = (
+                    "[" + ",".join(template % values for values in self.iter_values()) + "]"
+                ).encode("utf-8")
+        return self._encoded
+    
+    def to_ndjson(self) -> str:
+        """Encode the schedule as newline-delimited JSON, one row per line, spaced like json.dumps."""
+        template = self._row_template(", ", ": ")
+        return "".join(template % values + "\n" for values in self.iter_values())
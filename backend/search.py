@@ -0,0 +1,133 @@
+import heapq
+import unicodedata
+from typing import Dict, List, Optional, Set
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for accent- and case-insensitive matching.
+    
+    Args:
+        text: Text to normalize
+        
+    Returns:
+        Case-folded text with diacritics removed ("Crédito" -> "credito")
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def match_tier(needle: str, text: str) -> int:
+    """
+    Classify how well a normalized text matches a normalized needle it contains.
+    
+    Args:
+        needle: Normalized query
+        text: Normalized text containing the query
+        
+    Returns:
+        0 for an exact match, 1 for a prefix match, 2 for a match at the
+        start of a later word and 3 for any other substring match
+    """
+    if text == needle:
+        return 0
+    if text.startswith(needle):
+        return 1
+    if f" {needle}" in text:
+        return 2
+    return 3
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Substring search index over short texts such as product names.
+    
+    Every normalized text is split into overlapping three-character grams;
+    a query only has to verify the documents containing all of its grams
+    instead of scanning the whole catalog.
+    """
+
+    def __init__(self):
+        self._texts: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Grams whose posting set belongs to this index alone and may be mutated in place
+        self._owned: Set[str] = set()
+
+    def copy(self) -> "TrigramIndex":
+        """
+        Return an index that can be modified without affecting this one.
+        
+        Posting sets are shared and only copied when the new index first
+        modifies them, so the cost grows with the number of distinct grams
+        rather than with the total number of postings.
+        """
+        index = TrigramIndex()
+        index._texts = dict(self._texts)
+        index._postings = dict(self._postings)
+        self._owned = set()  # Posting sets are now shared with the copy
+        return index
+
+    def _posting_for_update(self, gram: str) -> Set[int]:
+        doc_ids = self._postings.get(gram)
+        if gram not in self._owned:
+            doc_ids = set(doc_ids) if doc_ids else set()
+            self._postings[gram] = doc_ids
+            self._owned.add(gram)
+        return doc_ids
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Index a document, replacing any previous text for the same id."""
+        if doc_id in self._texts:
+            self.remove(doc_id)
+        normalized = normalize_text(text)
+        self._texts[doc_id] = normalized
+        for gram in _trigrams(normalized):
+            self._posting_for_update(gram).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document from the index if present."""
+        normalized = self._texts.pop(doc_id, None)
+        if normalized is None:
+            return
+        for gram in _trigrams(normalized):
+            doc_ids = self._posting_for_update(gram)
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del self._postings[gram]
+                self._owned.discard(gram)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """
+        Find documents containing the query, best matches first.
+        
+        Exact matches rank above prefix matches, which rank above matches
+        at the start of a later word, which rank above any other substring
+        match. Ties are broken by shorter text and then by lower id.
+        
+        Args:
+            query: Text to search for
+            limit: Maximum number of ids to return (all matches if None)
+            
+        Returns:
+            List of matching document ids
+        """
+        needle = normalize_text(query)
+        
+        if len(needle) < 3:
+            candidates = self._texts.keys()
+        else:
+            postings = sorted((self._postings.get(gram, set()) for gram in _trigrams(needle)), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+        
+        def rank(doc_id: int) -> tuple:
+            text = self._texts[doc_id]
+            return match_tier(needle, text), len(text), doc_id
+        
+        matches = [doc_id for doc_id in candidates if needle in self._texts[doc_id]]
+        if limit is None:
+            return sorted(matches, key=rank)
+        return heapq.nsmallest(limit, matches, key=rank)
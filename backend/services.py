@@ -1,19 +1,84 @@
-from typing import List, Optional
+import csv
+import io
+import json
+import math
+from collections import deque
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
 from fastapi import HTTPException
+from pydantic import ValidationError
 
-from .models import Loan, LoanCalculation
-from .database import loan_db
-from .utils import calculate_loan_summary, generate_amortization_schedule, validate_loan_amount
+from .models import (
+    Loan,
+    LoanBatchMutation,
+    LoanCalculation,
+    LoanCalculationBatch,
+    LoanComparison,
+    LoanOperation,
+    MaxAmountSolve,
+    MinTermSolve,
+    OutputFormat,
+    PortfolioLoan,
+    RateSolve,
+    SensitivityGrid,
+    StreamFormat,
+    TermRange,
+    ValueRange,
+)
+from .cache import LRUCache
+from .shared_cache import SharedCalculationCache
+from .database import LoanOperationError, loan_db
+from .config import settings
+from .metrics import profiler, timed_stage, track_stage
+from .schedule import AmortizationSchedule, schedule_fields
+from .workers import (
+    SingleFlight,
+    pending_process_pool_tasks,
+    process_pool_size,
+    run_in_process_pool,
+    submit_to_process_pool,
+)
+from .utils import (
+    PORTFOLIO_FLOW_FIELDS,
+    add_portfolio_cash_flows,
+    calculate_compound_interest,
+    calculate_compound_interest_batch,
+    calculate_loan_summaries_batch,
+    calculate_payoff_date,
+    compute_amortization_columns,
+    compute_amortization_columns_cents,
+    calculate_payment_grid,
+    compute_loan_summary,
+    compute_prepayment_columns,
+    expand_range,
+    format_loan_summary,
+    generate_amortization_schedules_batch,
+    iter_amortization_columns,
+    project_portfolio_cash_flows,
+    round_amortization_columns,
+    round_loan_summary,
+    slice_amortization_columns,
+    solve_annual_rate,
+    solve_max_principal,
+    solve_min_term_months,
+    starting_annual_rate,
+    summarize_amortization_columns,
+    validate_loan_amount,
+    validate_loan_term,
+)
+
+
+LOAN_FIELDS = ["id", "productName", "minimumAmount", "maximumAmount", "anual_interest_rate"]
 
 
 class LoanService:
     """Service class for loan-related business logic."""
     
     @staticmethod
-    def get_all_loans(name_filter: Optional[str] = None) -> List[dict]:
-        """Get all loans, optionally filtered by name."""
+    def get_all_loans(name_filter: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Get all loans, optionally filtered by name and ranked by match quality."""
         if name_filter:
-            loans = loan_db.get_loans_by_name(name_filter)
+            loans = loan_db.get_loans_by_name(name_filter, limit)
             if not loans:
                 raise HTTPException(
                     status_code=404, 
@@ -34,10 +99,9 @@ class LoanService:
         return loan
     
     @staticmethod
-    def create_loan(loan: Loan) -> List[dict]:
-        """Create a new loan."""
-        loan_dict = loan_db.create_loan(loan)
-        return loan_db.get_all_loans()
+    def create_loan(loan: Loan) -> dict:
+        """Create a new loan and return it."""
+        return loan_db.create_loan(loan)
     
     @staticmethod
     def update_loan(loan_id: int, updated_loan: Loan) -> dict:
@@ -62,9 +126,159 @@ class LoanService:
         return {"message": f"Loan with id {loan_id} deleted successfully"}
     
     @staticmethod
-    def search_loans(search_term: str) -> List[dict]:
-        """Search loans by product name."""
-        loans = loan_db.get_loans_by_name(search_term)
+    def apply_operations(batch: LoanBatchMutation) -> dict:
+        """
+        Apply a batch of creates, updates and deletes atomically.
+        
+        Either every operation is applied or none is. Returns the catalog
+        version and, per operation, the affected id and resulting loan.
+        """
+        operations = batch.operations
+        if len(operations) > settings.LOAN_BATCH_MAX_OPERATIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch contains {len(operations)} operations; the maximum is {settings.LOAN_BATCH_MAX_OPERATIONS}."
+            )
+        for index, operation in enumerate(operations):
+            if operation.op != "create" and operation.id is None:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: '{operation.op}' requires an id.")
+            if operation.op != "delete" and operation.loan is None:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: '{operation.op}' requires a loan.")
+        
+        try:
+            loans = loan_db.apply_operations(operations)
+        except LoanOperationError as error:
+            raise HTTPException(status_code=404, detail=f"Operation {error.index}: {error.message}")
+        
+        return {
+            "version": loan_db.get_version(),
+            "results": [
+                {"op": operation.op, "id": loan["id"] if loan else operation.id, "loan": loan}
+                for operation, loan in zip(operations, loans)
+            ]
+        }
+    
+    @staticmethod
+    def import_loans(import_file: BinaryIO, media: StreamFormat) -> dict:
+        """
+        Import a product sheet as one atomic batch.
+        
+        The file is parsed row by row as CSV (with a header) or NDJSON. Rows
+        with an id update that loan; rows without one create a new loan. Any
+        invalid row rejects the whole import.
+        """
+        operations, line_numbers = [], []
+        for line_number, row in LoanService._iter_import_rows(import_file, media):
+            if len(operations) >= settings.LOAN_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Import exceeds the maximum of {settings.LOAN_IMPORT_MAX_ROWS} rows."
+                )
+            loan_id = row.pop("id", None)
+            try:
+                operations.append(LoanOperation(
+                    op="create" if loan_id in (None, "") else "update",
+                    id=None if loan_id in (None, "") else loan_id,
+                    loan=Loan.model_validate(row)
+                ))
+            except ValidationError as error:
+                first_error = error.errors()[0]
+                location = ".".join(str(part) for part in first_error["loc"])
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Line {line_number}: {location}: {first_error['msg']}."
+                )
+            line_numbers.append(line_number)
+        
+        try:
+            loan_db.apply_operations(operations)
+        except LoanOperationError as error:
+            raise HTTPException(status_code=404, detail=f"Line {line_numbers[error.index]}: {error.message}")
+        
+        return {
+            "version": loan_db.get_version(),
+            "created": sum(operation.op == "create" for operation in operations),
+            "updated": sum(operation.op == "update" for operation in operations)
+        }
+    
+    @staticmethod
+    def _iter_import_rows(import_file: BinaryIO, media: StreamFormat) -> Iterator[Tuple[int, dict]]:
+        """Lazily parse an uploaded CSV or NDJSON file into (line number, row) pairs."""
+        text = io.TextIOWrapper(import_file, encoding="utf-8-sig", newline="")
+        
+        if media == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: invalid JSON ({error.msg}).")
+            if not isinstance(row, dict):
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: expected a JSON object.")
+            yield line_number, row
+    
+    @staticmethod
+    def export_loans(media: StreamFormat) -> Iterator[str]:
+        """
+        Stream the catalog as NDJSON or CSV.
+        
+        The export reads one catalog snapshot and is emitted in chunks of
+        settings.EXPORT_CHUNK_ROWS loans.
+        """
+        loans = loan_db.get_all_loans()
+        chunk_rows = settings.EXPORT_CHUNK_ROWS
+        
+        def ndjson() -> Iterator[str]:
+            for start in range(0, len(loans), chunk_rows):
+                yield "".join(json.dumps(loan) + "\n" for loan in loans[start:start + chunk_rows])
+        
+        def csv_rows() -> Iterator[str]:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=LOAN_FIELDS)
+            writer.writeheader()
+            yield buffer.getvalue()
+            for start in range(0, len(loans), chunk_rows):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(loans[start:start + chunk_rows])
+                yield buffer.getvalue()
+        
+        return ndjson() if media == "ndjson" else csv_rows()
+    
+    @staticmethod
+    def get_catalog_version() -> int:
+        """Get the catalog version, used as the ETag of catalog listings."""
+        return loan_db.get_version()
+    
+    @staticmethod
+    def get_loan_version(loan_id: int) -> Optional[int]:
+        """Get the catalog version at which a loan last changed, used as its ETag."""
+        return loan_db.get_loan_version(loan_id)
+    
+    @staticmethod
+    def get_catalog_changes(since: int) -> dict:
+        """Get the loans created or updated and the ids deleted after a catalog version."""
+        changes = loan_db.get_changes_since(since)
+        if since > changes["version"]:
+            raise HTTPException(
+                status_code=409,
+                detail=(
+                    f"Version {since} is ahead of the catalog (version {changes['version']}); "
+                    "reload the full catalog."
+                )
+            )
+        return changes
+    
+    @staticmethod
+    def search_loans(search_term: str, limit: Optional[int] = None) -> List[dict]:
+        """Search loans by product name, best matches first."""
+        loans = loan_db.get_loans_by_name(search_term, limit)
         if not loans:
             raise HTTPException(
                 status_code=404, 
@@ -77,24 +291,287 @@ class LoanCalculationService:
     """Service class for loan calculation business logic."""
     
     @staticmethod
-    def calculate_loan(calculation_input: LoanCalculation) -> List[dict]:
-        """Calculate loan payments and generate amortization schedule."""
-        # Find the loan product
-        loan_product = loan_db.get_loan_by_name(calculation_input.loanName)
+    async def calculate_loan_async(
+        calculation_input: LoanCalculation,
+        output_format: OutputFormat = "display",
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Union[List[dict], dict]:
+        """
+        Calculate loan payments and generate amortization schedule.
+        
+        The "display" format returns currency strings row by row; the "raw"
+        format returns plain floats with the schedule laid out as columns.
+        offset and limit select a page of the schedule; the summary always
+        covers the whole loan. Results are served from calculation_cache,
+        or from the shared cache when enabled, when the same request was
+        computed before.
+        
+        Cache lookups and catalog validation run on the loop. Calculations
+        whose estimated cost reaches settings.OFFLOAD_MIN_COST are computed
+        in the shared process pool so they neither block the loop nor hold
+        the GIL; when the pool's queue is full the request is rejected with
+        a 503. The estimate covers the whole computation, so a small page of
+        a cents or prepayment schedule, which still walks every month, can
+        be offloaded too.
+        Identical requests arriving while one is being computed share its
+        result instead of computing it again.
+        """
+        cached = await LoanCalculationService.get_calculation_async(calculation_input, output_format, offset, limit)
+        return LoanCalculationService._build_response(cached, output_format)
+    
+    @staticmethod
+    async def get_calculation_async(
+        calculation_input: LoanCalculation,
+        output_format: OutputFormat = "display",
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> tuple:
+        """
+        Get the cached (summary, schedule, num_payments) entry for a request,
+        computing it on a cache miss.
+        
+        The summary has no payoff date yet; see stamp_summary. A limit of 0
+        yields just the summary, with an empty schedule.
+        """
+        cache_key = LoanCalculationService._cache_key(calculation_input, output_format, offset, limit)
+        cached = LoanCalculationService._get_cached(cache_key)
+        if cached is None:
+            cached = await calculation_flights.run(
+                cache_key,
+                lambda: LoanCalculationService._compute_async(calculation_input, output_format, offset, limit, cache_key)
+            )
+        return cached
+    
+    @staticmethod
+    async def _compute_async(
+        calculation_input: LoanCalculation,
+        output_format: OutputFormat,
+        offset: int,
+        limit: Optional[int],
+        cache_key: tuple
+    ) -> tuple:
+        """Compute a request on the loop or in the process pool, and cache it."""
+        annual_rate = LoanCalculationService._resolve_annual_rate(calculation_input)
+        
+        if _computation_cost(calculation_input, offset, limit) >= settings.OFFLOAD_MIN_COST:
+            with track_stage("calculation.offload"):
+                cached = await run_in_process_pool(
+                    LoanCalculationService._render_schedule,
+                    calculation_input, annual_rate, output_format, offset, limit
+                )
+        else:
+            with profiler.capture():
+                cached = LoanCalculationService._render_schedule(
+                    calculation_input, annual_rate, output_format, offset, limit
+                )
+        LoanCalculationService._put_cached(cache_key, cached, calculation_input.loanName)
+        return cached
+    
+    @staticmethod
+    def _cache_key(
+        calculation_input: LoanCalculation,
+        output_format: OutputFormat,
+        offset: int,
+        limit: Optional[int]
+    ) -> tuple:
+        """
+        Build the calculation cache key for a request.
+        
+        The key pins the product state the result is computed from, so a
+        result that finishes computing after its product changed, or that
+        another worker cached against an older catalog, is never served.
+        """
+        return (
+            calculation_input.loanName,
+            float(calculation_input.amount),
+            calculation_input.years,
+            calculation_input.customInterestRate,
+            float(calculation_input.extraMonthlyPayment),
+            tuple((lump_sum.month, lump_sum.amount) for lump_sum in calculation_input.lumpSums),
+            calculation_input.recastMode,
+            tuple((change.month, change.annualInterestRate) for change in calculation_input.rateChanges),
+            calculation_input.engine,
+            calculation_input.rounding,
+            output_format,
+            offset,
+            limit,
+            _product_state(calculation_input.loanName)
+        )
+    
+    @staticmethod
+    def _get_cached(cache_key: tuple) -> Optional[tuple]:
+        """Look a request up in calculation_cache, then in the shared cache."""
+        with track_stage("calculation.cache_lookup"):
+            cached = calculation_cache.get(cache_key)
+            if cached is None and shared_calculation_cache is not None:
+                cached = shared_calculation_cache.get(cache_key)
+        return cached
+    
+    @staticmethod
+    def _put_cached(cache_key: tuple, cached: tuple, loan_name: str) -> None:
+        """Store a computed request in calculation_cache and the shared cache."""
+        calculation_cache.put(cache_key, cached, tag=loan_name)
+        if shared_calculation_cache is not None:
+            shared_calculation_cache.put(cache_key, cached, tag=loan_name)
+    
+    @staticmethod
+    def stamp_summary(summary: dict, num_payments: int) -> dict:
+        """
+        Add the payoff date to a cached summary.
+        
+        The payoff date moves with today's date, so it is stamped per response
+        instead of cached.
+        """
+        return {**summary, "latest_date_of_payment_after_loan": calculate_payoff_date(num_payments)}
+    
+    @staticmethod
+    def _build_response(cached: tuple, output_format: OutputFormat) -> Union[List[dict], dict]:
+        """Assemble the response body from a cached (summary, schedule, num_payments) entry."""
+        summary, amortization_schedule, num_payments = cached
+        summary = LoanCalculationService.stamp_summary(summary, num_payments)
+        
+        if output_format == "raw":
+            return {"summary": summary, "amortization_schedule": amortization_schedule}
+        
+        return [{"summary": summary}, amortization_schedule]
+    
+    @staticmethod
+    def _render_schedule(
+        calculation_input: LoanCalculation,
+        annual_rate: float,
+        output_format: OutputFormat,
+        offset: int,
+        limit: Optional[int]
+    ) -> tuple:
+        """
+        Compute and format an already validated request.
+        
+        Does not touch the catalog, so it can run in a worker process.
+        """
+        # Calculate loan summary and amortization schedule
+        with track_stage("calculation.schedule"):
+            summary, columns, num_payments = LoanCalculationService._compute_schedule(
+                calculation_input, annual_rate, offset, limit
+            )
+        
+        # Formatting is only paid for when the client asks for display output
+        with track_stage("calculation.formatting"):
+            if output_format == "raw":
+                summary = round_loan_summary(summary)
+            else:
+                summary = format_loan_summary(summary)
+            # Encoding here means cache hits and pool workers hand back ready-made bytes
+            amortization_schedule = AmortizationSchedule(columns, output_format)
+            amortization_schedule.to_json()
+        
+        del summary["latest_date_of_payment_after_loan"]
+        return summary, amortization_schedule, num_payments
+    
+    @staticmethod
+    def _compute_schedule(
+        calculation_input: LoanCalculation,
+        annual_rate: float,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> tuple:
+        """
+        Compute the numeric summary, the requested window of schedule columns
+        and the total number of payments.
+        
+        Plain loans use the closed-form row lookup, loans with extra payments
+        or rate changes go through the segmented engine and the "cents" engine
+        runs the exact integer recurrence.
+        """
+        if calculation_input.engine == "cents":
+            columns = compute_amortization_columns_cents(
+                calculation_input.amount, annual_rate, calculation_input.years, calculation_input.rounding
+            )
+            summary = summarize_amortization_columns(calculation_input.amount, annual_rate, columns)
+            return summary, slice_amortization_columns(columns, offset, limit), len(columns["month"])
+        
+        if not _has_schedule_events(calculation_input):
+            summary = compute_loan_summary(calculation_input.amount, annual_rate, calculation_input.years)
+            columns = compute_amortization_columns(
+                calculation_input.amount, annual_rate, calculation_input.years, offset, limit
+            )
+            return summary, columns, calculation_input.years * 12
+        
+        rate_changes = [(change.month, change.annualInterestRate) for change in calculation_input.rateChanges]
+        columns = compute_prepayment_columns(
+            calculation_input.amount,
+            annual_rate,
+            calculation_input.years,
+            calculation_input.extraMonthlyPayment,
+            [(lump_sum.month, lump_sum.amount) for lump_sum in calculation_input.lumpSums],
+            calculation_input.recastMode,
+            rate_changes
+        )
+        # A change in month 1 replaces the product's rate before any interest is charged
+        summary = summarize_amortization_columns(
+            calculation_input.amount, starting_annual_rate(annual_rate, rate_changes), columns
+        )
+        return summary, slice_amortization_columns(columns, offset, limit), len(columns["month"])
+    
+    @staticmethod
+    def _get_loan_product(loan_name: str) -> dict:
+        """Find a loan product by exact name or raise a 404."""
+        loan_product = loan_db.get_loan_by_name(loan_name)
         if not loan_product:
             raise HTTPException(
                 status_code=404, 
-                detail=f"Loan product '{calculation_input.loanName}' not found."
+                detail=f"Loan product '{loan_name}' not found."
             )
-        
-        # Validate loan amount
+        return loan_product
+    
+    @staticmethod
+    def _validate_amount_and_term(amount: float, years: int, loan_product: dict) -> None:
+        """Raise a 400 if the amount is outside the product's range or the term is too short."""
         is_valid, error_message = validate_loan_amount(
-            calculation_input.amount,
+            amount,
             loan_product["minimumAmount"],
             loan_product["maximumAmount"]
         )
+        if is_valid:
+            is_valid, error_message = validate_loan_term(years)
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_message)
+    
+    @staticmethod
+    def _resolve_annual_rate(calculation_input: LoanCalculation) -> float:
+        """Validate the request against its loan product and return the annual rate to apply."""
+        loan_product = LoanCalculationService._get_loan_product(calculation_input.loanName)
+        LoanCalculationService._validate_amount_and_term(
+            calculation_input.amount, calculation_input.years, loan_product
+        )
+        
+        # Validate lump sums
+        for lump_sum in calculation_input.lumpSums:
+            if lump_sum.month > calculation_input.years * 12:
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Lump sum in month {lump_sum.month} falls after the last payment "
+                        f"(month {calculation_input.years * 12})."
+                    )
+                )
+        
+        # Validate rate changes
+        for change in calculation_input.rateChanges:
+            if change.month > calculation_input.years * 12:
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Rate change in month {change.month} falls after the last payment "
+                        f"(month {calculation_input.years * 12})."
+                    )
+                )
+        
+        if calculation_input.engine == "cents" and _has_schedule_events(calculation_input):
+            raise HTTPException(
+                status_code=400,
+                detail="Extra payments, lump sums and rate changes are not supported by the cents engine."
+            )
         
         # Determine interest rate
         annual_rate = (
@@ -102,23 +579,619 @@ class LoanCalculationService:
             if calculation_input.customInterestRate is not None 
             else loan_product["anual_interest_rate"]
         )
+        return annual_rate
+    
+    @staticmethod
+    def stream_loan(
+        calculation_input: LoanCalculation,
+        media: StreamFormat,
+        output_format: OutputFormat = "display",
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Validate a calculation and return a generator streaming its schedule.
         
-        # Calculate loan summary and amortization schedule
-        summary = calculate_loan_summary(
-            calculation_input.amount,
-            annual_rate,
-            calculation_input.years
+        Validation runs before the generator is returned so errors still map
+        to HTTP status codes. NDJSON output starts with a summary line and
+        then has one line per month; CSV output has a header and one row per
+        month. Rows are computed in chunks of STREAM_CHUNK_MONTHS.
+        """
+        annual_rate = LoanCalculationService._resolve_annual_rate(calculation_input)
+        with_prepayments = _has_schedule_events(calculation_input)
+        
+        if not _uses_closed_form(calculation_input):
+            # These totals depend on the whole schedule, which is bounded by the term
+            summary, columns, _ = LoanCalculationService._compute_schedule(calculation_input, annual_rate, offset, limit)
+            chunk_months = settings.STREAM_CHUNK_MONTHS
+            chunks = (
+                slice_amortization_columns(columns, start, chunk_months)
+                for start in range(0, len(columns["month"]), chunk_months)
+            )
+        else:
+            summary = compute_loan_summary(calculation_input.amount, annual_rate, calculation_input.years)
+            chunks = iter_amortization_columns(
+                calculation_input.amount,
+                annual_rate,
+                calculation_input.years,
+                offset,
+                limit,
+                settings.STREAM_CHUNK_MONTHS
+            )
+        
+        def ndjson() -> Iterator[str]:
+            rendered_summary = round_loan_summary(summary) if output_format == "raw" else format_loan_summary(summary)
+            yield json.dumps({"summary": rendered_summary}) + "\n"
+            for columns in chunks:
+                yield AmortizationSchedule(columns, output_format).to_ndjson()
+        
+        def csv_rows() -> Iterator[str]:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(schedule_fields(output_format, with_prepayments))
+            yield buffer.getvalue()
+            for columns in chunks:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(AmortizationSchedule(columns, output_format).iter_values())
+                yield buffer.getvalue()
+        
+        return ndjson() if media == "ndjson" else csv_rows()
+    
+    @staticmethod
+    def solve_max_amount(solve_input: MaxAmountSolve) -> dict:
+        """
+        Find the largest amount a monthly payment can repay over a term.
+        
+        The result is clamped to the product's maximum amount, and a 400 is
+        raised when even the product's minimum amount is unaffordable.
+        """
+        loan_product = LoanCalculationService._get_loan_product(solve_input.loanName)
+        is_valid, error_message = validate_loan_term(solve_input.years)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error_message)
+        
+        annual_rate = (
+            solve_input.customInterestRate
+            if solve_input.customInterestRate is not None
+            else loan_product["anual_interest_rate"]
         )
+        affordable_amount = float(solve_max_principal([solve_input.monthlyPayment], [annual_rate], [solve_input.years])[0])
         
-        amortization_schedule = generate_amortization_schedule(
-            calculation_input.amount,
-            annual_rate,
-            calculation_input.years
+        if affordable_amount < loan_product["minimumAmount"]:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"A monthly payment of ${solve_input.monthlyPayment:,.2f} over {solve_input.years} years "
+                    f"only covers ${affordable_amount:,.2f}, below this loan's minimum of "
+                    f"${loan_product['minimumAmount']:,.2f}."
+                )
+            )
+        
+        amount = min(affordable_amount, float(loan_product["maximumAmount"]))
+        return {
+            "loanName": solve_input.loanName,
+            "amount": round(amount, 2),
+            "affordable_amount": round(affordable_amount, 2),
+            "clamped": amount < affordable_amount,
+            "years": solve_input.years,
+            "annual_interest_rate": annual_rate,
+            "monthly_payment": round(calculate_compound_interest(amount, annual_rate, solve_input.years), 2)
+        }
+    
+    @staticmethod
+    def solve_min_term(solve_input: MinTermSolve) -> dict:
+        """
+        Find the shortest whole-year term whose payment fits the monthly budget.
+        
+        A 400 is raised when the payment does not cover the interest, or
+        when the term would exceed SOLVER_MAX_TERM_YEARS.
+        """
+        loan_product = LoanCalculationService._get_loan_product(solve_input.loanName)
+        is_valid, error_message = validate_loan_amount(
+            solve_input.amount,
+            loan_product["minimumAmount"],
+            loan_product["maximumAmount"]
         )
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error_message)
         
-        return [{"summary": summary}, amortization_schedule]
+        annual_rate = (
+            solve_input.customInterestRate
+            if solve_input.customInterestRate is not None
+            else loan_product["anual_interest_rate"]
+        )
+        months = float(solve_min_term_months([solve_input.amount], [annual_rate], [solve_input.monthlyPayment])[0])
+        if months == float("inf"):
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"A monthly payment of ${solve_input.monthlyPayment:,.2f} does not cover the monthly "
+                    f"interest on ${solve_input.amount:,.2f}."
+                )
+            )
+        
+        # Tolerate float noise so an exact 360-month answer is not rounded up to 31 years
+        years = max(1, math.ceil(months / 12 - 1e-9))
+        if years > settings.SOLVER_MAX_TERM_YEARS:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"A monthly payment of ${solve_input.monthlyPayment:,.2f} needs {years} years to repay "
+                    f"${solve_input.amount:,.2f}, longer than the maximum term of "
+                    f"{settings.SOLVER_MAX_TERM_YEARS} years."
+                )
+            )
+        return {
+            "loanName": solve_input.loanName,
+            "amount": solve_input.amount,
+            "years": years,
+            "months_needed": round(months, 2),
+            "annual_interest_rate": annual_rate,
+            "monthly_payment": round(calculate_compound_interest(solve_input.amount, annual_rate, years), 2)
+        }
+    
+    @staticmethod
+    def solve_rate(solve_input: RateSolve) -> dict:
+        """Find the annual interest rate implied by an amount, term and monthly payment."""
+        loan_product = LoanCalculationService._get_loan_product(solve_input.loanName)
+        LoanCalculationService._validate_amount_and_term(solve_input.amount, solve_input.years, loan_product)
+        
+        annual_rate = float(solve_annual_rate([solve_input.amount], [solve_input.monthlyPayment], [solve_input.years])[0])
+        if math.isnan(annual_rate):
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"A monthly payment of ${solve_input.monthlyPayment:,.2f} cannot repay "
+                    f"${solve_input.amount:,.2f} in {solve_input.years} years even at 0% interest."
+                )
+            )
+        
+        return {
+            "loanName": solve_input.loanName,
+            "amount": solve_input.amount,
+            "years": solve_input.years,
+            "monthly_payment": solve_input.monthlyPayment,
+            "annual_interest_rate": annual_rate,
+            "product_annual_interest_rate": loan_product["anual_interest_rate"]
+        }
+    
+    @staticmethod
+    @timed_stage("calculation.compare")
+    def compare_loans(comparison_input: LoanComparison, output_format: OutputFormat = "display") -> List[dict]:
+        """
+        Summarize the same amount and term for every product that can lend it.
+        
+        Products whose amount range covers the request are included, cheapest
+        monthly payment first. Payments come from the annuity factors cached
+        per product in the catalog, so no exponentiation is repeated for
+        standard terms.
+        """
+        is_valid, error_message = validate_loan_term(comparison_input.years)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error_message)
+        
+        amount = comparison_input.amount
+        eligible = [
+            loan for loan in loan_db.get_all_loans()
+            if loan["minimumAmount"] <= amount <= loan["maximumAmount"]
+        ]
+        if not eligible:
+            return []
+        
+        annual_rates = np.array([loan["anual_interest_rate"] for loan in eligible], dtype=np.float64)
+        if comparison_input.years <= settings.STANDARD_TERM_YEARS:
+            factors = np.array([loan_db.get_annuity_factors(loan)[comparison_input.years - 1] for loan in eligible])
+        else:
+            factors = calculate_compound_interest_batch(
+                np.ones(len(eligible)), annual_rates, np.full(len(eligible), comparison_input.years)
+            )
+        
+        num_payments = comparison_input.years * 12
+        monthly_payments = amount * factors
+        payoff_date = calculate_payoff_date(num_payments)
+        render = round_loan_summary if output_format == "raw" else format_loan_summary
+        
+        results = []
+        for position in np.argsort(monthly_payments, kind="stable").tolist():
+            loan = eligible[position]
+            monthly_payment = float(monthly_payments[position])
+            results.append({
+                "id": loan["id"],
+                "productName": loan["productName"],
+                "summary": render({
+                    "total_payment": monthly_payment * num_payments,
+                    "principal": amount,
+                    "total_interest": monthly_payment * num_payments - amount,
+                    "monthly_payment": monthly_payment,
+                    "annual_interest_rate": loan["anual_interest_rate"],
+                    "latest_date_of_payment_after_loan": payoff_date
+                })
+            })
+        return results
+    
+    @staticmethod
+    @timed_stage("calculation.grid")
+    def calculate_sensitivity_grid(grid_input: SensitivityGrid) -> dict:
+        """
+        Calculate monthly payment and total interest over a grid of rates and terms.
+        
+        Rows follow the requested annual rates and columns the requested
+        terms; the whole grid is one broadcasted array operation.
+        """
+        loan_product = LoanCalculationService._get_loan_product(grid_input.loanName)
+        
+        annual_rates = grid_input.annualRates
+        if isinstance(annual_rates, ValueRange):
+            annual_rates = expand_range(annual_rates.start, annual_rates.stop, annual_rates.step).tolist()
+        years = grid_input.years
+        if isinstance(years, TermRange):
+            years = list(range(years.start, years.stop + 1, years.step))
+        
+        if not annual_rates or not years:
+            raise HTTPException(status_code=400, detail="The grid needs at least one rate and one term.")
+        if len(annual_rates) * len(years) > settings.GRID_MAX_CELLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Grid of {len(annual_rates)}x{len(years)} exceeds the maximum of {settings.GRID_MAX_CELLS} cells."
+            )
+        for num_years in years:
+            LoanCalculationService._validate_amount_and_term(grid_input.amount, num_years, loan_product)
+        
+        monthly_payments, total_interest = calculate_payment_grid(grid_input.amount, annual_rates, years)
+        return {
+            "loanName": grid_input.loanName,
+            "amount": grid_input.amount,
+            "annual_interest_rates": annual_rates,
+            "years": years,
+            "monthly_payment": np.round(monthly_payments, 2).tolist(),
+            "total_interest": np.round(total_interest, 2).tolist()
+        }
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """
+        Get hit/miss/eviction counters of the calculation cache and, when
+        enabled, the shared cache, plus the calculations in flight, the
+        requests that joined one of them and the process pool's backlog.
+        """
+        stats = calculation_cache.stats()
+        stats["in_flight"] = calculation_flights.in_flight()
+        stats["coalesced"] = calculation_flights.coalesced
+        stats["process_pool"] = {"workers": process_pool_size(), "pending": pending_process_pool_tasks()}
+        if shared_calculation_cache is not None:
+            stats["shared"] = shared_calculation_cache.stats()
+        return stats
+    
+    @staticmethod
+    async def calculate_loan_batch_async(batch_input: LoanCalculationBatch) -> List[dict]:
+        """
+        Calculate many loans in vectorized passes.
+        
+        Invalid items do not abort the batch; each one is reported inline
+        with the status code and detail the single-loan endpoint would raise.
+        Rates are resolved against the catalog on the loop; batches whose
+        estimated cost reaches settings.OFFLOAD_MIN_COST are then computed
+        in the shared process pool, under the same admission limit as
+        single calculations.
+        """
+        items = batch_input.items
+        if len(items) > settings.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch contains {len(items)} items; the maximum is {settings.BATCH_MAX_ITEMS}."
+            )
+        
+        results: List[Optional[dict]] = [None] * len(items)
+        annual_rates: List[Optional[float]] = [None] * len(items)
+        cost = 0.0
+        for index, item in enumerate(items):
+            try:
+                annual_rates[index] = LoanCalculationService._resolve_annual_rate(item)
+            except HTTPException as error:
+                results[index] = {"index": index, "error": {"status_code": error.status_code, "detail": error.detail}}
+                continue
+            # Every item costs at least a row, even in summary-only batches
+            cost += max(1.0, _computation_cost(item, 0, None if batch_input.include_schedule else 0))
+        
+        with track_stage("calculation.batch"):
+            if cost >= settings.OFFLOAD_MIN_COST:
+                return await run_in_process_pool(
+                    LoanCalculationService._compute_batch, batch_input, annual_rates, results
+                )
+            return LoanCalculationService._compute_batch(batch_input, annual_rates, results)
+    
+    @staticmethod
+    def _compute_batch(
+        batch_input: LoanCalculationBatch,
+        annual_rates: List[Optional[float]],
+        results: List[Optional[dict]]
+    ) -> List[dict]:
+        """
+        Fill in the results of a batch whose rates are already resolved.
+        
+        Does not touch the catalog, so it can run in a worker process.
+        """
+        items = batch_input.items
+        valid_indexes, principals, valid_rates, num_years = [], [], [], []
+        
+        for index, item in enumerate(items):
+            annual_rate = annual_rates[index]
+            if annual_rate is None:
+                continue
+            
+            # Prepayment, rate-change and cents scenarios are computed one by one
+            if not _uses_closed_form(item):
+                summary, columns, _ = LoanCalculationService._compute_schedule(item, annual_rate)
+                results[index] = {"index": index, "summary": round_loan_summary(summary)}
+                if batch_input.include_schedule:
+                    results[index]["amortization_schedule"] = round_amortization_columns(columns)
+                continue
+            
+            valid_indexes.append(index)
+            principals.append(item.amount)
+            valid_rates.append(annual_rate)
+            num_years.append(item.years)
+        
+        # Compute valid items in fixed-size chunks to bound the size of the intermediate arrays
+        chunk_size = settings.BATCH_CHUNK_SIZE
+        for start in range(0, len(valid_indexes), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            chunk_indexes = valid_indexes[chunk]
+            
+            if batch_input.include_schedule:
+                schedules = generate_amortization_schedules_batch(
+                    principals[chunk], valid_rates[chunk], num_years[chunk]
+                )
+                monthly_payments = schedules["monthly_payment"]
+                principal_paid = np.round(schedules["principal_paid"], 2)
+                interest_paid = np.round(schedules["interest_paid"], 2)
+                remaining_balance = np.round(schedules["remaining_balance"], 2)
+                month_numbers = list(range(1, remaining_balance.shape[1] + 1))
+            else:
+                monthly_payments = calculate_compound_interest_batch(
+                    principals[chunk], valid_rates[chunk], num_years[chunk]
+                )
+            
+            summaries = calculate_loan_summaries_batch(
+                principals[chunk], valid_rates[chunk], num_years[chunk], monthly_payments
+            )
+            
+            for row, (index, summary) in enumerate(zip(chunk_indexes, summaries)):
+                result = {"index": index, "summary": summary}
+                if batch_input.include_schedule:
+                    num_payments = num_years[start + row] * 12
+                    result["amortization_schedule"] = {
+                        "month": month_numbers[:num_payments],
+                        "principal_paid": principal_paid[row, :num_payments].tolist(),
+                        "interest_paid": interest_paid[row, :num_payments].tolist(),
+                        "remaining_balance": remaining_balance[row, :num_payments].tolist()
+                    }
+                results[index] = result
+        
+        return results
+
+
+class PortfolioService:
+    """Service class for portfolio-level cash flow projections."""
+    
+    @staticmethod
+    @timed_stage("portfolio.projection")
+    def project_portfolio(loans: Iterable[PortfolioLoan]) -> dict:
+        """
+        Aggregate the monthly cash flows of a book of loans, in total and per product.
+        
+        Loans are consumed in chunks of settings.PORTFOLIO_CHUNK_SIZE, so memory
+        grows with the chunk size and the longest term rather than with the
+        number of loans. Once a book exceeds settings.PORTFOLIO_PROCESS_POOL_THRESHOLD
+        loans, the remaining chunks are projected in worker processes; they
+        count against the pool's admission limit like offloaded calculations,
+        and a 503 is raised when the pool is full.
+        
+        Args:
+            loans: The loans in the book, possibly a lazily parsed stream
+            
+        Returns:
+            Dictionary with the month numbers, the portfolio totals and one
+            entry per product that holds at least one loan
+        """
+        catalog = loan_db.get_all_loans()
+        total, loan_counts, pending = None, np.zeros(len(catalog), dtype=np.int64), deque()
+        max_in_flight = 2 * process_pool_size()
+        
+        loan_count = 0
+        for principals, annual_rates, num_years, product_indexes in PortfolioService._iter_chunks(loans, catalog):
+            loan_count += len(principals)
+            loan_counts += np.bincount(product_indexes, minlength=len(catalog))
+            arguments = (principals, annual_rates, num_years, product_indexes, len(catalog))
+            
+            if loan_count <= settings.PORTFOLIO_PROCESS_POOL_THRESHOLD:
+                total = add_portfolio_cash_flows(total, project_portfolio_cash_flows(*arguments))
+                continue
+            
+            # Bound the number of chunks waiting in the pool so parsing cannot outrun the workers
+            pending.append(submit_to_process_pool(project_portfolio_cash_flows, *arguments))
+            if len(pending) >= max_in_flight:
+                total = add_portfolio_cash_flows(total, pending.popleft().result())
+        
+        while pending:
+            total = add_portfolio_cash_flows(total, pending.popleft().result())
+        
+        if total is None:
+            total = np.zeros((len(catalog), len(PORTFOLIO_FLOW_FIELDS), 0))
+        
+        def _round_flows(flows: np.ndarray) -> dict:
+            return {
+                field: np.round(flows[position], 2).tolist()
+                for position, field in enumerate(PORTFOLIO_FLOW_FIELDS)
+            }
+        
+        return {
+            "loan_count": loan_count,
+            "months": list(range(1, total.shape[-1] + 1)),
+            "total": _round_flows(total.sum(axis=0)),
+            "by_product": [
+                {
+                    "id": product["id"],
+                    "productName": product["productName"],
+                    "loan_count": int(loan_counts[index]),
+                    **_round_flows(total[index])
+                }
+                for index, product in enumerate(catalog)
+                if loan_counts[index]
+            ]
+        }
+    
+    @staticmethod
+    def parse_portfolio_csv(csv_file: BinaryIO) -> Iterator[PortfolioLoan]:
+        """
+        Lazily parse an uploaded CSV book with one loan per row.
+        
+        The header must name the loanName, amount and years columns;
+        customInterestRate is optional and may be left empty.
+        """
+        reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding="utf-8-sig", newline=""))
+        missing = {"loanName", "amount", "years"} - set(reader.fieldnames or ())
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"CSV header is missing the column(s): {', '.join(sorted(missing))}."
+            )
+        
+        for row_number, row in enumerate(reader, start=2):
+            try:
+                yield PortfolioLoan(
+                    loanName=row["loanName"],
+                    amount=row["amount"],
+                    years=row["years"],
+                    customInterestRate=row.get("customInterestRate") or None
+                )
+            except ValidationError as error:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Row {row_number}: {error.errors()[0]['msg']}."
+                )
+    
+    @staticmethod
+    def _iter_chunks(
+        loans: Iterable[PortfolioLoan], catalog: List[dict]
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """Validate loans against the catalog and group them into arrays of at most PORTFOLIO_CHUNK_SIZE."""
+        products_by_name = {}
+        for index, product in enumerate(catalog):
+            products_by_name.setdefault(product["productName"], (index, product))
+        
+        chunk_size = settings.PORTFOLIO_CHUNK_SIZE
+        principals, annual_rates, num_years, product_indexes = [], [], [], []
+        
+        for position, loan in enumerate(loans):
+            if position >= settings.PORTFOLIO_MAX_LOANS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Portfolio exceeds the maximum of {settings.PORTFOLIO_MAX_LOANS} loans."
+                )
+            if loan.loanName not in products_by_name:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Loan {position}: loan product '{loan.loanName}' not found."
+                )
+            
+            product_index, product = products_by_name[loan.loanName]
+            try:
+                LoanCalculationService._validate_amount_and_term(loan.amount, loan.years, product)
+            except HTTPException as error:
+                raise HTTPException(status_code=error.status_code, detail=f"Loan {position}: {error.detail}")
+            
+            principals.append(loan.amount)
+            annual_rates.append(
+                loan.customInterestRate if loan.customInterestRate is not None else product["anual_interest_rate"]
+            )
+            num_years.append(loan.years)
+            product_indexes.append(product_index)
+            
+            if len(principals) == chunk_size:
+                yield np.array(principals), np.array(annual_rates), np.array(num_years), np.array(product_indexes)
+                principals, annual_rates, num_years, product_indexes = [], [], [], []
+        
+        if principals:
+            yield np.array(principals), np.array(annual_rates), np.array(num_years), np.array(product_indexes)
+
+
+def _has_prepayments(calculation_input: LoanCalculation) -> bool:
+    """Check whether a calculation needs the prepayment engine."""
+    return calculation_input.extraMonthlyPayment > 0 or bool(calculation_input.lumpSums)
+
+
+def _has_schedule_events(calculation_input: LoanCalculation) -> bool:
+    """Check whether a calculation needs the segmented engine for prepayments or rate changes."""
+    return _has_prepayments(calculation_input) or bool(calculation_input.rateChanges)
+
+
+def _uses_closed_form(calculation_input: LoanCalculation) -> bool:
+    """Check whether any month of a calculation's schedule can be computed on its own."""
+    return calculation_input.engine == "float" and not _has_schedule_events(calculation_input)
+
+
+def _computation_cost(calculation_input: LoanCalculation, offset: int = 0, limit: Optional[int] = None) -> float:
+    """
+    Estimate the CPU cost of a calculation in rendered schedule rows.
+    
+    The closed form computes only the requested rows. The cents and
+    segmented engines walk every month of the loan whatever the page, and
+    the segmented engine does extra work for each lump sum and rate change.
+    """
+    num_payments = calculation_input.years * 12
+    page_rows = max(0, min(num_payments - offset, limit if limit is not None else num_payments))
+    if _uses_closed_form(calculation_input):
+        return page_rows
+    
+    events = len(calculation_input.lumpSums) + len(calculation_input.rateChanges)
+    return page_rows + num_payments * settings.OFFLOAD_MONTH_COST + events * settings.OFFLOAD_EVENT_COST
+
+
+def _product_state(loan_name: str) -> Optional[tuple]:
+    """The catalog state a product's calculations depend on: its id, version and pricing fields."""
+    loan = loan_db.get_loan_by_name(loan_name)
+    if loan is None:
+        return None
+    return (
+        loan["id"],
+        loan_db.get_loan_version(loan["id"]),
+        loan["minimumAmount"],
+        loan["maximumAmount"],
+        loan["anual_interest_rate"]
+    )
+
+
+def _invalidate_calculations(previous: Optional[dict], current: Optional[dict]) -> None:
+    """Drop cached calculations for a product whose name, rate or amount limits changed."""
+    pricing_fields = ("productName", "minimumAmount", "maximumAmount", "anual_interest_rate")
+    if previous and current and all(previous[field] == current[field] for field in pricing_fields):
+        return
+    for loan in (previous, current):
+        if loan:
+            calculation_cache.invalidate_tag(loan["productName"])
+            if shared_calculation_cache is not None:
+                shared_calculation_cache.invalidate_tag(loan["productName"])
+
 
+calculation_cache = LRUCache(
+    max_entries=settings.CALCULATION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.CALCULATION_CACHE_MAX_BYTES
+)
+calculation_flights = SingleFlight()
+shared_calculation_cache = (
+    SharedCalculationCache(
+        settings.SHARED_CACHE_PATH,
+        settings.SHARED_CACHE_MAX_ENTRIES,
+        settings.SHARED_CACHE_MAX_BYTES
+    )
+    if settings.SHARED_CACHE_ENABLED
+    else None
+)
+loan_db.add_listener(_invalidate_calculations)
 
 # Service instances
 loan_service = LoanService()
-loan_calculation_service = LoanCalculationService() 
\ No newline at end of file
+loan_calculation_service = LoanCalculationService()
+portfolio_service = PortfolioService() 
\ No newline at end of file
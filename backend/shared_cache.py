@@ -0,0 +1,255 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator, Optional, Tuple
+import numpy as np
+
+from .schedule import AmortizationSchedule
+
+try:
+    import fcntl
+except ImportError:  # fcntl is POSIX-only; the shared cache is unavailable elsewhere
+    fcntl = None
+
+
+MAGIC = b"LCSHM001"
+_HEADER = struct.Struct("<8sQQQ")  # magic, record count, ring size, ring head
+_HEAD_OFFSET = 24
+_ENTRY_HEADER = struct.Struct("<16sI")  # key digest, metadata length
+_RECORD = np.dtype([
+    ("key_low", "<u8"),
+    ("key_high", "<u8"),
+    ("tag", "<u8"),
+    ("start", "<u8"),
+    ("length", "<u8")
+])
+_PROBES = 8  # Records an entry may occupy, starting at its home slot
+_ALIGNMENT = 8
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _digest(key: Hashable) -> bytes:
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+
+
+def _tag_hash(tag: Hashable) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(tag).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class SharedCalculationCache:
+    """
+    Calculation cache shared by every process on a host through a memory-mapped file.
+    
+    The file (normally on /dev/shm) holds a header, a table of max_entries
+    records and a ring of max_bytes where entries are appended. An entry
+    stores the summary and schedule metadata as JSON, each schedule column
+    as raw array bytes and the schedule's encoded JSON body. Reads copy the
+    columns and body out of the mapping, so an entry that was read stays
+    intact however much is written after it.
+    
+    A key may sit in one of _PROBES records from its home slot; an insert
+    that finds none free evicts the oldest entry in that window. Entries the
+    ring has since written over count as absent. Processes coordinate with
+    flock on the file, shared for reads and exclusive for writes.
+    
+    Keys are hashed from their repr, so they must be tuples of plain values
+    whose repr is stable across processes.
+    """
+    
+    def __init__(self, path: str, max_entries: int, max_bytes: int):
+        if fcntl is None:
+            raise RuntimeError("The shared calculation cache needs a POSIX host with fcntl.")
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        
+        records_offset = _align(_HEADER.size)
+        self._data_offset = _align(records_offset + max_entries * _RECORD.itemsize)
+        size = self._data_offset + max_bytes
+        
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # The first process to start lays the file out; later ones attach to it
+            header = os.pread(self._fd, _HEADER.size, 0)
+            expected = _HEADER.pack(MAGIC, max_entries, max_bytes, 0)[:_HEAD_OFFSET]
+            if os.fstat(self._fd).st_size != size or header[:_HEAD_OFFSET] != expected:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _HEADER.pack(MAGIC, max_entries, max_bytes, 0), 0)
+            self._mmap = mmap.mmap(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._records = np.ndarray(max_entries, dtype=_RECORD, buffer=self._mmap, offset=records_offset)
+    
+    def get(self, key: Hashable) -> Optional[Tuple[dict, AmortizationSchedule, int]]:
+        """Get a cached (summary, schedule, num_payments) entry."""
+        digest = _digest(key)
+        window = self._window(digest)
+        with self._locked(fcntl.LOCK_SH):
+            records = self._records[window]
+            found = np.flatnonzero(self._matches(records, digest) & self._live(records, self._head()))
+            value = self._read_entry(int(records["start"][found[0]]), digest) if len(found) else None
+        
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def put(self, key: Hashable, value: Tuple[dict, AmortizationSchedule, int], tag: Hashable = None) -> None:
+        """
+        Store a (summary, schedule, num_payments) entry.
+        
+        Entries larger than the whole ring are not cached. The tag groups
+        entries so they can be dropped together with invalidate_tag.
+        """
+        summary, schedule, num_payments = value
+        columns = [(name, np.ascontiguousarray(column)) for name, column in schedule.columns.items()]
+        encoded = schedule.to_json()
+        metadata = json.dumps({
+            "summary": summary,
+            "num_payments": num_payments,
+            "output_format": schedule.output_format,
+            "columns": [[name, column.dtype.str, len(column)] for name, column in columns],
+            "body_length": len(encoded)
+        }).encode("utf-8")
+        length = _align(
+            _align(_ENTRY_HEADER.size + len(metadata))
+            + sum(_align(column.nbytes) for _, column in columns)
+            + len(encoded)
+        )
+        if length > self.max_bytes:
+            return
+        
+        digest = _digest(key)
+        window = self._window(digest)
+        with self._locked(fcntl.LOCK_EX):
+            # Entries never straddle the end of the ring; one that would starts the next lap
+            start = self._head()
+            if start % self.max_bytes + length > self.max_bytes:
+                start += self.max_bytes - start % self.max_bytes
+            self._write_entry(start % self.max_bytes, digest, metadata, columns, encoded)
+            head = start + length
+            self._mmap[_HEAD_OFFSET:_HEAD_OFFSET + 8] = struct.pack("<Q", head)
+            
+            records = self._records[window]
+            live = self._live(records, head)
+            same_key = np.flatnonzero(self._matches(records, digest))
+            free = np.flatnonzero(~live)
+            if len(same_key):
+                slot = same_key[0]
+            elif len(free):
+                slot = free[0]
+            else:
+                slot = int(np.argmin(records["start"]))
+                self.evictions += 1
+            
+            self._records[window[slot]] = (
+                int.from_bytes(digest[:8], "little"),
+                int.from_bytes(digest[8:], "little"),
+                _tag_hash(tag),
+                start,
+                length
+            )
+    
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry stored under the given tag, in every process."""
+        with self._locked(fcntl.LOCK_EX):
+            lengths = self._records["length"]
+            tagged = (self._records["tag"] == _tag_hash(tag)) & (lengths > 0)
+            count = int(tagged.sum())
+            lengths[tagged] = 0
+        self.invalidations += count
+        return count
+    
+    def stats(self) -> dict:
+        """Get the shared size and this process's hit/miss/eviction counters."""
+        with self._locked(fcntl.LOCK_SH):
+            live = self._live(self._records, self._head())
+            entries = int(live.sum())
+            used_bytes = int(self._records["length"][live].sum())
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": used_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+    
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        # flock is held per open file, so threads of one process also need the thread lock
+        with self._lock:
+            fcntl.flock(self._fd, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+    
+    def _head(self) -> int:
+        return struct.unpack_from("<Q", self._mmap, _HEAD_OFFSET)[0]
+    
+    def _window(self, digest: bytes) -> np.ndarray:
+        home = int.from_bytes(digest[:8], "little") % self.max_entries
+        return (home + np.arange(_PROBES)) % self.max_entries
+    
+    @staticmethod
+    def _matches(records: np.ndarray, digest: bytes) -> np.ndarray:
+        return (
+            (records["key_low"] == int.from_bytes(digest[:8], "little"))
+            & (records["key_high"] == int.from_bytes(digest[8:], "little"))
+            & (records["length"] > 0)
+        )
+    
+    def _live(self, records: np.ndarray, head: int) -> np.ndarray:
+        # An entry is intact until the head has moved a full ring past its start
+        return (records["length"] > 0) & (records["start"] + np.uint64(self.max_bytes) >= head)
+    
+    def _write_entry(self, offset: int, digest: bytes, metadata: bytes, columns: list, encoded: bytes) -> None:
+        position = self._data_offset + offset
+        self._mmap[position:position + _ENTRY_HEADER.size] = _ENTRY_HEADER.pack(digest, len(metadata))
+        position += _ENTRY_HEADER.size
+        self._mmap[position:position + len(metadata)] = metadata
+        position = _align(position + len(metadata))
+        for _, column in columns:
+            self._mmap[position:position + column.nbytes] = column.tobytes()
+            position = _align(position + column.nbytes)
+        self._mmap[position:position + len(encoded)] = encoded
+    
+    def _read_entry(self, start: int, digest: bytes) -> Optional[Tuple[dict, AmortizationSchedule, int]]:
+        position = self._data_offset + start % self.max_bytes
+        entry_digest, metadata_length = _ENTRY_HEADER.unpack_from(self._mmap, position)
+        if entry_digest != digest:
+            return None
+        position += _ENTRY_HEADER.size
+        metadata = json.loads(self._mmap[position:position + metadata_length])
+        position = _align(position + metadata_length)
+        
+        columns = {}
+        for name, dtype, length in metadata["columns"]:
+            # Copied while the lock is held: the ring may overwrite this entry once it is released
+            column = np.frombuffer(self._mmap, dtype=dtype, count=length, offset=position).copy()
+            column.flags.writeable = False
+            columns[name] = column
+            position = _align(position + column.nbytes)
+        encoded = self._mmap[position:position + metadata["body_length"]]
+        
+        schedule = AmortizationSchedule(columns, metadata["output_format"], encoded)
+        return metadata["summary"], schedule, metadata["num_payments"]
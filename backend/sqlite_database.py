@@ -0,0 +1,297 @@
+import sqlite3
+import threading
+from typing import List, Optional
+
+from .database import DEFAULT_LOANS, BaseLoanDatabase, LoanOperationError
+from .metrics import timed_stage
+from .models import Loan, LoanOperation
+from .search import match_tier, normalize_text
+
+
+LOAN_COLUMNS = ("id", "productName", "minimumAmount", "maximumAmount", "anual_interest_rate")
+
+SCHEMA_VERSION = 2
+
+# Statements are kept as constants so sqlite3's per-connection statement cache reuses them
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS loans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        productName TEXT NOT NULL,
+        searchName TEXT NOT NULL,
+        minimumAmount REAL NOT NULL,
+        maximumAmount REAL NOT NULL,
+        anual_interest_rate REAL NOT NULL
+    )
+"""
+CREATE_NAME_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_loans_product_name ON loans (productName, id)"
+# Schema version 2: catalog versioning and delete tombstones
+MIGRATE_V2_SQL = (
+    "ALTER TABLE loans ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS idx_loans_version ON loans (version)",
+    "CREATE TABLE IF NOT EXISTS deleted_loans (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS catalog_state (version INTEGER NOT NULL)",
+    "INSERT INTO catalog_state (version) VALUES (0)",
+)
+SELECT_ALL_SQL = "SELECT id, productName, minimumAmount, maximumAmount, anual_interest_rate FROM loans ORDER BY id"
+SELECT_BY_ID_SQL = "SELECT id, productName, minimumAmount, maximumAmount, anual_interest_rate FROM loans WHERE id = ?"
+SELECT_BY_NAME_SQL = (
+    "SELECT id, productName, minimumAmount, maximumAmount, anual_interest_rate "
+    "FROM loans WHERE productName = ? ORDER BY id LIMIT 1"
+)
+SEARCH_SQL = (
+    "SELECT id, productName, minimumAmount, maximumAmount, anual_interest_rate, searchName "
+    "FROM loans WHERE searchName LIKE ? ESCAPE '\\'"
+)
+INSERT_SQL = (
+    "INSERT INTO loans (id, productName, searchName, minimumAmount, maximumAmount, anual_interest_rate) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPDATE_SQL = (
+    "UPDATE loans SET productName = ?, searchName = ?, minimumAmount = ?, maximumAmount = ?, "
+    "anual_interest_rate = ? WHERE id = ?"
+)
+DELETE_SQL = "DELETE FROM loans WHERE id = ?"
+BUMP_VERSION_SQL = "UPDATE catalog_state SET version = version + 1 RETURNING version"
+SELECT_VERSION_SQL = "SELECT version FROM catalog_state"
+SET_LOAN_VERSION_SQL = "UPDATE loans SET version = ? WHERE id = ?"
+SELECT_LOAN_VERSION_SQL = "SELECT version FROM loans WHERE id = ?"
+INSERT_TOMBSTONE_SQL = "INSERT INTO deleted_loans (id, version) VALUES (?, ?)"
+SELECT_CHANGED_SQL = (
+    "SELECT id, productName, minimumAmount, maximumAmount, anual_interest_rate "
+    "FROM loans WHERE version > ? ORDER BY id"
+)
+SELECT_DELETED_SQL = "SELECT id FROM deleted_loans WHERE version > ? ORDER BY id"
+
+
+def _row_to_loan(row: tuple) -> dict:
+    return dict(zip(LOAN_COLUMNS, row))
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SQLiteLoanDatabase(BaseLoanDatabase):
+    """
+    Loan catalog persisted in SQLite.
+    
+    Each thread reuses its own connection, the database runs in WAL mode so
+    readers never block the writer, and writes take an immediate transaction
+    so concurrent workers sharing the file serialize cleanly. Ids use
+    AUTOINCREMENT and are never reused after a delete. The catalog version
+    lives in the file, so every process sharing it sees the same versions.
+    """
+
+    def __init__(self, database_url: str):
+        super().__init__()
+        self.path = database_url.split("sqlite:///", 1)[-1]
+        self._local = threading.local()
+        self._initialize()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _initialize(self) -> None:
+        """Create the schema and seed the default catalog the first time the file is used."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            schema_version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if schema_version < 1:
+                connection.execute(CREATE_TABLE_SQL)
+                connection.execute(CREATE_NAME_INDEX_SQL)
+                connection.executemany(INSERT_SQL, [self._insert_params(loan) for loan in DEFAULT_LOANS])
+            if schema_version < 2:
+                for statement in MIGRATE_V2_SQL:
+                    connection.execute(statement)
+            if schema_version < SCHEMA_VERSION:
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection, loan_id: int) -> None:
+        """Advance the catalog version and stamp it on a loan, inside the caller's transaction."""
+        version = connection.execute(BUMP_VERSION_SQL).fetchone()[0]
+        connection.execute(SET_LOAN_VERSION_SQL, (version, loan_id))
+
+    @staticmethod
+    def _insert_params(loan_dict: dict) -> tuple:
+        return (
+            loan_dict.get("id"),
+            loan_dict["productName"],
+            normalize_text(loan_dict["productName"]),
+            loan_dict["minimumAmount"],
+            loan_dict["maximumAmount"],
+            loan_dict["anual_interest_rate"]
+        )
+
+    @timed_stage("catalog.get_all_loans")
+    def get_all_loans(self) -> List[dict]:
+        """Get all loans from the database."""
+        return [_row_to_loan(row) for row in self._connection().execute(SELECT_ALL_SQL)]
+
+    @timed_stage("catalog.get_loan_by_id")
+    def get_loan_by_id(self, loan_id: int) -> Optional[dict]:
+        """Get a loan by its ID."""
+        row = self._connection().execute(SELECT_BY_ID_SQL, (loan_id,)).fetchone()
+        return _row_to_loan(row) if row else None
+
+    @timed_stage("catalog.get_loans_by_name")
+    def get_loans_by_name(self, name: str, limit: Optional[int] = None) -> List[dict]:
+        """Get loans that match the given name (case- and accent-insensitive partial match), best first."""
+        needle = normalize_text(name)
+        rows = self._connection().execute(SEARCH_SQL, (f"%{_escape_like(needle)}%",)).fetchall()
+        # LIKE also folds ASCII case, so confirm the exact normalized substring before ranking
+        rows = [row for row in rows if needle in row[5]]
+        rows.sort(key=lambda row: (match_tier(needle, row[5]), len(row[5]), row[0]))
+        return [_row_to_loan(row[:5]) for row in rows[:limit]]
+
+    @timed_stage("catalog.create_loan")
+    def create_loan(self, loan: Loan) -> dict:
+        """Create a new loan in the database."""
+        loan_dict = loan.model_dump()
+        loan_dict["id"] = None
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            loan_dict["id"] = connection.execute(INSERT_SQL, self._insert_params(loan_dict)).lastrowid
+            self._bump_version(connection, loan_dict["id"])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        self._notify(None, loan_dict)
+        return loan_dict
+
+    @timed_stage("catalog.update_loan")
+    def update_loan(self, loan_id: int, updated_loan: Loan) -> Optional[dict]:
+        """Update an existing loan in the database."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(SELECT_BY_ID_SQL, (loan_id,)).fetchone()
+            if row is None:
+                connection.execute("ROLLBACK")
+                return None
+            
+            previous = _row_to_loan(row)
+            loan_dict = {**previous, **updated_loan.model_dump(exclude_unset=True)}
+            loan_dict["id"] = loan_id  # Ensure ID from URL is respected
+            connection.execute(UPDATE_SQL, self._insert_params(loan_dict)[1:] + (loan_id,))
+            self._bump_version(connection, loan_id)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        self._notify(previous, loan_dict)
+        return loan_dict
+
+    @timed_stage("catalog.delete_loan")
+    def delete_loan(self, loan_id: int) -> bool:
+        """Delete a loan from the database."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(SELECT_BY_ID_SQL, (loan_id,)).fetchone()
+            if row is not None:
+                connection.execute(DELETE_SQL, (loan_id,))
+                version = connection.execute(BUMP_VERSION_SQL).fetchone()[0]
+                connection.execute(INSERT_TOMBSTONE_SQL, (loan_id, version))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        if row is None:
+            return False
+        self._notify(_row_to_loan(row), None)
+        return True
+
+    @timed_stage("catalog.get_loan_by_name")
+    def get_loan_by_name(self, loan_name: str) -> Optional[dict]:
+        """Get a loan by its exact name."""
+        row = self._connection().execute(SELECT_BY_NAME_SQL, (loan_name,)).fetchone()
+        return _row_to_loan(row) if row else None
+
+    @timed_stage("catalog.apply_operations")
+    def apply_operations(self, operations: List[LoanOperation]) -> List[Optional[dict]]:
+        """
+        Apply a batch of creates, updates and deletes atomically.
+        
+        The whole batch runs in one immediate transaction that is rolled back
+        if any operation targets a missing loan.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute(BUMP_VERSION_SQL).fetchone()[0]
+            results, changes = [], []
+            for index, operation in enumerate(operations):
+                if operation.op == "create":
+                    loan_dict = operation.loan.model_dump()
+                    loan_dict["id"] = None
+                    loan_dict["id"] = connection.execute(INSERT_SQL, self._insert_params(loan_dict)).lastrowid
+                    connection.execute(SET_LOAN_VERSION_SQL, (version, loan_dict["id"]))
+                    changes.append((None, loan_dict))
+                    results.append(loan_dict)
+                    continue
+                
+                row = connection.execute(SELECT_BY_ID_SQL, (operation.id,)).fetchone()
+                if row is None:
+                    raise LoanOperationError(index, f"Loan with id {operation.id} not found")
+                previous = _row_to_loan(row)
+                
+                if operation.op == "update":
+                    loan_dict = {**previous, **operation.loan.model_dump(exclude_unset=True)}
+                    loan_dict["id"] = operation.id
+                    connection.execute(UPDATE_SQL, self._insert_params(loan_dict)[1:] + (operation.id,))
+                    connection.execute(SET_LOAN_VERSION_SQL, (version, operation.id))
+                    changes.append((previous, loan_dict))
+                    results.append(loan_dict)
+                else:
+                    connection.execute(DELETE_SQL, (operation.id,))
+                    connection.execute(INSERT_TOMBSTONE_SQL, (operation.id, version))
+                    changes.append((previous, None))
+                    results.append(None)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        
+        for previous, current in changes:
+            self._notify(previous, current)
+        return results
+
+    def get_version(self) -> int:
+        """Get the catalog version, incremented by every create, update and delete."""
+        return self._connection().execute(SELECT_VERSION_SQL).fetchone()[0]
+
+    def get_loan_version(self, loan_id: int) -> Optional[int]:
+        """Get the catalog version at which a loan last changed, or None if it does not exist."""
+        row = self._connection().execute(SELECT_LOAN_VERSION_SQL, (loan_id,)).fetchone()
+        return row[0] if row else None
+
+    @timed_stage("catalog.get_changes_since")
+    def get_changes_since(self, version: int) -> dict:
+        """Get the loans changed and the ids deleted after the given catalog version."""
+        connection = self._connection()
+        # A read transaction gives the three queries one consistent WAL snapshot
+        connection.execute("BEGIN")
+        try:
+            current_version = connection.execute(SELECT_VERSION_SQL).fetchone()[0]
+            changed = [_row_to_loan(row) for row in connection.execute(SELECT_CHANGED_SQL, (version,))]
+            deleted = [row[0] for row in connection.execute(SELECT_DELETED_SQL, (version,))]
+        finally:
+            connection.execute("COMMIT")
+        return {"version": current_version, "changed": changed, "deleted": deleted}
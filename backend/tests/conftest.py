@@ -0,0 +1,30 @@
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.database import loan_db
+from backend.main import app
+from backend.models import Loan
+
+
+_product_numbers = itertools.count(1)
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def product():
+    """A catalog product of its own, so tests can change it without affecting each other."""
+    loan = loan_db.create_loan(Loan(
+        productName=f"Test Product {next(_product_numbers)}",
+        minimumAmount=1000000,
+        maximumAmount=100000000,
+        anual_interest_rate=0.12
+    ))
+    yield loan
+    loan_db.delete_loan(loan["id"])
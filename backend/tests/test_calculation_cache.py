@@ -0,0 +1,43 @@
+from backend.models import Loan
+from backend.services import LoanCalculationService, loan_service
+
+
+def _calculation(product: dict, years: int = 10) -> dict:
+    return {"amount": 10000000, "loanName": product["productName"], "years": years}
+
+
+def _monthly_payment(client, product: dict) -> float:
+    response = client.post("/calculate-loan?format=raw", json=_calculation(product))
+    assert response.status_code == 200
+    return response.json()["summary"]["monthly_payment"]
+
+
+def test_repeated_calculation_is_served_from_cache(client, product):
+    first = client.post("/calculate-loan?format=raw", json=_calculation(product))
+    hits = client.get("/calculate-loan/cache").json()["hits"]
+    second = client.post("/calculate-loan?format=raw", json=_calculation(product))
+    
+    assert second.content == first.content
+    assert client.get("/calculate-loan/cache").json()["hits"] == hits + 1
+
+
+def test_product_update_invalidates_cached_calculations(client, product):
+    before = _monthly_payment(client, product)
+    loan_service.update_loan(product["id"], Loan(**{**product, "anual_interest_rate": 0.05}))
+    
+    assert _monthly_payment(client, product) < before
+
+
+def test_update_during_computation_does_not_leave_stale_result(client, product, monkeypatch):
+    render_schedule = LoanCalculationService._render_schedule
+    
+    def render_while_updating(calculation_input, annual_rate, *args):
+        # The rate was read before the update, so this result is computed at the old rate
+        loan_service.update_loan(product["id"], Loan(**{**product, "anual_interest_rate": 0.05}))
+        return render_schedule(calculation_input, annual_rate, *args)
+    
+    monkeypatch.setattr(LoanCalculationService, "_render_schedule", staticmethod(render_while_updating))
+    stale = _monthly_payment(client, product)
+    monkeypatch.setattr(LoanCalculationService, "_render_schedule", staticmethod(render_schedule))
+    
+    assert _monthly_payment(client, product) < stale
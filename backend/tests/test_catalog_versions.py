@@ -0,0 +1,69 @@
+from backend.models import Loan
+from backend.services import loan_service
+
+
+def test_unchanged_catalog_answers_not_modified(client):
+    first = client.get("/loans")
+    etag = first.headers["etag"]
+    
+    second = client.get("/loans", headers={"If-None-Match": etag})
+    
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_search_matching_nothing_is_not_confirmed_by_the_catalog_etag(client, product):
+    etag = client.get("/loans").headers["etag"]
+    
+    missing = client.get("/loans", params={"name": "zzqx no such product"}, headers={"If-None-Match": etag})
+    found = client.get("/loans", params={"name": product["productName"]}, headers={"If-None-Match": etag})
+    
+    assert missing.status_code == 404
+    assert found.status_code == 304
+
+
+def test_catalog_change_moves_the_etag(client, product):
+    etag = client.get("/loans").headers["etag"]
+    loan_etag = client.get(f"/loans/{product['id']}").headers["etag"]
+    loan_service.update_loan(product["id"], Loan(**{**product, "maximumAmount": 200000000}))
+    
+    catalog = client.get("/loans", headers={"If-None-Match": etag})
+    loan = client.get(f"/loans/{product['id']}", headers={"If-None-Match": loan_etag})
+    
+    assert catalog.status_code == 200
+    assert catalog.headers["etag"] != etag
+    assert loan.status_code == 200
+    assert loan.json()["maximumAmount"] == 200000000
+
+
+def test_changes_since_a_version(client, product):
+    version = client.get("/loans/changes", params={"since": 0}).json()["version"]
+    loan_service.update_loan(product["id"], Loan(**{**product, "anual_interest_rate": 0.2}))
+    created = client.post("/loans", json={
+        "productName": "Short-lived Product", "minimumAmount": 1, "maximumAmount": 2, "anual_interest_rate": 0.1
+    }).json()
+    client.delete(f"/loans/{created['id']}")
+    
+    changes = client.get("/loans/changes", params={"since": version}).json()
+    
+    assert changes["version"] == version + 3
+    assert [loan["id"] for loan in changes["changed"]] == [product["id"]]
+    assert changes["changed"][0]["anual_interest_rate"] == 0.2
+    assert changes["deleted"] == [created["id"]]
+
+
+def test_changes_since_current_version_are_empty(client):
+    version = client.get("/loans/changes", params={"since": 0}).json()["version"]
+    
+    changes = client.get("/loans/changes", params={"since": version}).json()
+    
+    assert changes == {"version": version, "changed": [], "deleted": []}
+
+
+def test_changes_since_a_version_ahead_of_the_catalog_conflict(client):
+    version = client.get("/loans/changes", params={"since": 0}).json()["version"]
+    
+    response = client.get("/loans/changes", params={"since": version + 1})
+    
+    assert response.status_code == 409
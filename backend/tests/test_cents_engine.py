@@ -0,0 +1,121 @@
+import random
+from decimal import ROUND_CEILING, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal, localcontext
+
+import numpy as np
+import pytest
+
+from backend.utils import compute_amortization_columns_cents
+
+
+ROUNDING_MODES = {"half_even": ROUND_HALF_EVEN, "half_up": ROUND_HALF_UP}
+
+
+def reference_schedule(principal, annual_rate, num_years, rounding):
+    """Walk the loan one month at a time in Decimal cents, following the engine's documented rules."""
+    with localcontext() as context:
+        context.prec = 60
+        num_payments = num_years * 12
+        balance = Decimal(round(principal * 100))
+        monthly_rate = Decimal(repr(annual_rate)) / 12
+        if monthly_rate == 0:
+            payment = (balance / num_payments).to_integral_value(ROUND_CEILING)
+        else:
+            payment = (balance * monthly_rate / (1 - (1 + monthly_rate) ** -num_payments)).to_integral_value(ROUND_CEILING)
+        rows = []
+        
+        for month in range(1, num_payments + 1):
+            interest = (balance * monthly_rate).to_integral_value(ROUNDING_MODES[rounding])
+            principal_paid = payment - interest
+            if month == num_payments or principal_paid >= balance:
+                principal_paid = balance
+            balance -= principal_paid
+            rows.append((month, principal_paid + interest, principal_paid, interest, balance))
+            if balance == 0:
+                break
+    
+    fields = ("month", "monthly_payment", "principal_paid", "interest_paid", "remaining_balance")
+    return {field: [int(value) for value in column] for field, column in zip(fields, zip(*rows))}
+
+
+def in_cents(columns):
+    return {
+        field: [int(value) for value in (column if field == "month" else np.round(column * 100))]
+        for field, column in columns.items()
+    }
+
+
+def random_loan(seed: int) -> tuple:
+    generator = random.Random(seed)
+    principal = generator.choice([
+        round(generator.uniform(1e6, 1e9), 2),
+        float(generator.randrange(1000000, 1000000000, 50000)),
+        round(generator.uniform(0.01, 50), 2)  # Pays off early once the payment is rounded up
+    ])
+    annual_rate = generator.choice([
+        0.0,
+        generator.choice([0.06, 0.12, 0.18, 0.24]),  # Small rate denominators hit frequent ties
+        round(generator.uniform(0.01, 0.3), 3),
+        round(generator.uniform(0.01, 0.3), 4)
+    ])
+    return principal, annual_rate, generator.randint(1, 40)
+
+
+@pytest.mark.parametrize("rounding", ["half_even", "half_up"])
+@pytest.mark.parametrize("seed", range(150))
+def test_matches_decimal_reference(seed, rounding):
+    principal, annual_rate, num_years = random_loan(seed)
+    
+    columns = compute_amortization_columns_cents(principal, annual_rate, num_years, rounding)
+    
+    assert in_cents(columns) == reference_schedule(principal, annual_rate, num_years, rounding)
+
+
+@pytest.mark.parametrize("rounding", ["half_even", "half_up"])
+@pytest.mark.parametrize("seed", range(0, 150, 5))
+def test_columns_reconcile_exactly(seed, rounding):
+    principal, annual_rate, num_years = random_loan(seed)
+    
+    cents = in_cents(compute_amortization_columns_cents(principal, annual_rate, num_years, rounding))
+    
+    assert sum(cents["principal_paid"]) == round(principal * 100)
+    assert all(
+        payment == principal_paid + interest
+        for payment, principal_paid, interest in zip(cents["monthly_payment"], cents["principal_paid"], cents["interest_paid"])
+    )
+    # Every payment but the trued-up last one is the same
+    assert len(set(cents["monthly_payment"][:-1])) <= 1
+    assert cents["remaining_balance"][-1] == 0
+    assert all(balance > 0 for balance in cents["remaining_balance"][:-1])
+
+
+def test_rounding_modes_differ_on_ties():
+    # 1% a month on a balance ending in 50 cents lands exactly on half a cent
+    half_even = in_cents(compute_amortization_columns_cents(1000.50, 0.12, 1, "half_even"))
+    half_up = in_cents(compute_amortization_columns_cents(1000.50, 0.12, 1, "half_up"))
+    
+    assert half_even["interest_paid"][0] == 1000
+    assert half_up["interest_paid"][0] == 1001
+
+
+def test_pays_off_early_when_rounded_payment_clears_the_balance():
+    # 0.05 over 12 months rounds the payment up to a whole cent, clearing the loan in 5
+    cents = in_cents(compute_amortization_columns_cents(0.05, 0.0, 1))
+    
+    assert cents["month"] == [1, 2, 3, 4, 5]
+    assert cents["monthly_payment"] == [1, 1, 1, 1, 1]
+    assert cents["remaining_balance"] == [4, 3, 2, 1, 0]
+
+
+@pytest.mark.parametrize("principal, annual_rate, num_years", [
+    (10000000, 1e-9, 5),
+    (100000000, 1e-9, 30),
+    (50000000, 1e-8, 20),
+    (150000000, 1e-7, 40)
+])
+def test_payment_is_rounded_up_for_tiny_rates(principal, annual_rate, num_years):
+    columns = compute_amortization_columns_cents(principal, annual_rate, num_years)
+    cents = in_cents(columns)
+    
+    assert cents == reference_schedule(principal, annual_rate, num_years, "half_even")
+    # Rounding the payment up leaves the trued-up final payment no larger than the rest
+    assert cents["monthly_payment"][-1] <= cents["monthly_payment"][0]
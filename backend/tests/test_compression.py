@@ -0,0 +1,59 @@
+import pytest
+
+from backend.compression import negotiate_encoding, supported_encodings
+from backend.config import settings
+
+
+CALCULATION = {"amount": 20000000, "loanName": "Libranza", "years": 10}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.4", "gzip"),
+    ("gzip;q=0", None),
+    ("*", supported_encodings()[0]),
+    ("*, gzip;q=0", "br" if "br" in supported_encodings() else None),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("encoding", supported_encodings())
+def test_large_response_is_compressed(client, encoding):
+    identity = client.post("/calculate-loan", json=CALCULATION, headers={"Accept-Encoding": "identity"})
+    compressed = client.post("/calculate-loan", json=CALCULATION, headers={"Accept-Encoding": encoding})
+    
+    assert "content-encoding" not in identity.headers
+    assert compressed.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert int(compressed.headers["content-length"]) < len(identity.content)
+    # The test client decodes the body, which must match the identity representation
+    assert compressed.content == identity.content
+
+
+def test_small_response_is_sent_as_is(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    
+    assert "content-encoding" not in response.headers
+
+
+def test_streamed_response_is_compressed(client):
+    response = client.post("/calculate-loan?stream=ndjson", json=CALCULATION, headers={"Accept-Encoding": "gzip"})
+    
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 121
+
+
+def test_compressed_etag_is_weak_and_still_revalidates(client, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_BYTES", 0)
+    
+    response = client.get("/loans", headers={"Accept-Encoding": "gzip"})
+    
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith("W/")
+    revalidated = client.get(
+        "/loans", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+from backend.models import LoanCalculation
+from backend.services import calculation_flights, loan_calculation_service
+
+
+LIVE_PATH = "/calculate-loan/live"
+
+
+def _form(product, **changes) -> dict:
+    return {"amount": 5000000, "loanName": product["productName"], "years": 10, **changes}
+
+
+def test_summary_comes_before_the_first_rows(client, product):
+    with client.websocket_connect(LIVE_PATH) as websocket:
+        websocket.send_json({"type": "calculate", "id": 1, "input": _form(product), "limit": 3})
+        summary = websocket.receive_json()
+        page = websocket.receive_json()
+    
+    assert summary["type"] == "summary"
+    assert summary["id"] == 1
+    assert summary["months"] == 120
+    assert "latest_date_of_payment_after_loan" in summary["summary"]
+    assert page["type"] == "page"
+    assert page["offset"] == 0
+    assert [row["month"] for row in page["schedule"]] == [1, 2, 3]
+
+
+def test_pages_of_other_calculations_are_dropped(client, product):
+    with client.websocket_connect(LIVE_PATH) as websocket:
+        websocket.send_json({"type": "calculate", "id": 1, "input": _form(product)})
+        assert websocket.receive_json()["type"] == "summary"
+        
+        websocket.send_json({"type": "page", "id": 99, "offset": 0, "limit": 5})
+        websocket.send_json({"type": "page", "id": 1, "offset": 118, "limit": 5})
+        page = websocket.receive_json()
+    
+    assert page["id"] == 1
+    assert [row["month"] for row in page["schedule"]] == [119, 120]
+
+
+def test_superseded_calculation_is_not_answered(client, product, monkeypatch):
+    started = threading.Event()
+    get_calculation = loan_calculation_service.get_calculation_async
+    
+    async def held_first_calculation(calculation_input, *args):
+        # The first input is held long enough for the second one to overtake it
+        if calculation_input.amount == 5000000:
+            started.set()
+            await asyncio.sleep(2)
+        return await get_calculation(calculation_input, *args)
+    
+    monkeypatch.setattr(loan_calculation_service, "get_calculation_async", held_first_calculation)
+    
+    with client.websocket_connect(LIVE_PATH) as websocket:
+        websocket.send_json({"type": "calculate", "id": 1, "input": _form(product), "limit": 2})
+        assert started.wait(timeout=5)
+        websocket.send_json({"type": "calculate", "id": 2, "input": _form(product, amount=6000000), "limit": 2})
+        messages = [websocket.receive_json(), websocket.receive_json()]
+        websocket.send_json({"type": "page", "id": 1, "offset": 0, "limit": 1})
+        websocket.send_json({"type": "page", "id": 2, "offset": 5, "limit": 1})
+        messages.append(websocket.receive_json())
+    
+    assert [(message["type"], message["id"]) for message in messages] == [("summary", 2), ("page", 2), ("page", 2)]
+    assert messages[2]["offset"] == 5
+
+
+def test_queued_calculation_is_replaced_by_a_newer_one(client, product):
+    with client.websocket_connect(LIVE_PATH) as websocket:
+        for request_id in range(1, 11):
+            websocket.send_json({
+                "type": "calculate", "id": request_id, "input": _form(product, amount=5000000 + request_id), "limit": 1
+            })
+        messages = []
+        while not messages or messages[-1]["id"] != 10 or messages[-1]["type"] != "page":
+            messages.append(websocket.receive_json())
+    
+    ids = [message["id"] for message in messages]
+    assert ids == sorted(ids)
+    assert messages[-2]["type"] == "summary"
+
+
+def test_errors_are_reported_with_the_message_id(client, product):
+    with client.websocket_connect(LIVE_PATH) as websocket:
+        websocket.send_text("not json")
+        malformed = websocket.receive_json()
+        websocket.send_json({"type": "unknown", "id": 4})
+        unknown_type = websocket.receive_json()
+        websocket.send_json({"type": "calculate", "id": 5, "input": _form(product, loanName="Missing Product")})
+        missing_product = websocket.receive_json()
+        
+        # The connection stays usable after errors
+        websocket.send_json({"type": "calculate", "id": 6, "input": _form(product)})
+        summary = websocket.receive_json()
+    
+    assert (malformed["type"], malformed["id"], malformed["status_code"]) == ("error", None, 422)
+    assert (unknown_type["id"], unknown_type["status_code"]) == (4, 422)
+    assert (missing_product["id"], missing_product["status_code"]) == (5, 404)
+    assert (summary["type"], summary["id"]) == ("summary", 6)
+
+
+def test_identical_concurrent_calculations_are_computed_once(product):
+    calculation = LoanCalculation(amount=7777777, loanName=product["productName"], years=10)
+    
+    async def calculate_concurrently():
+        return await asyncio.gather(*[
+            loan_calculation_service.get_calculation_async(calculation, "display", 0, None) for _ in range(8)
+        ])
+    
+    executed, coalesced = calculation_flights.executed, calculation_flights.coalesced
+    results = asyncio.run(calculate_concurrently())
+    
+    assert calculation_flights.executed - executed == 1
+    assert calculation_flights.coalesced - coalesced == 7
+    assert all(result is results[0] for result in results)
+    assert calculation_flights.in_flight() == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_calculation(product):
+    calculation = LoanCalculation(amount=8888888, loanName=product["productName"], years=10)
+    
+    async def cancel_one_caller():
+        callers = [
+            asyncio.ensure_future(loan_calculation_service.get_calculation_async(calculation, "raw", 0, None))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        callers[0].cancel()
+        return await asyncio.gather(*callers, return_exceptions=True)
+    
+    first, *others = asyncio.run(cancel_one_caller())
+    
+    assert isinstance(first, asyncio.CancelledError)
+    assert others[0] is others[1]
+    assert others[0][2] == 120
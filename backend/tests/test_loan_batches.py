@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from backend import services
+from backend.database import LoanDatabase
+from backend.sqlite_database import SQLiteLoanDatabase
+
+
+NEW_LOAN = {"productName": "Batch Product", "minimumAmount": 1000, "maximumAmount": 2000, "anual_interest_rate": 0.1}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def catalog(request, tmp_path, monkeypatch):
+    """A fresh catalog of each backend, seeded with the default loans."""
+    if request.param == "memory":
+        database = LoanDatabase()
+    else:
+        database = SQLiteLoanDatabase(f"sqlite:///{tmp_path / 'catalog.db'}")
+    monkeypatch.setattr(services, "loan_db", database)
+    return database
+
+
+def test_batch_applies_every_operation(client, catalog):
+    version = catalog.get_version()
+    
+    response = client.post("/loans/batch", json={"operations": [
+        {"op": "create", "loan": NEW_LOAN},
+        {"op": "update", "id": 1, "loan": {**catalog.get_loan_by_id(1), "anual_interest_rate": 0.2}},
+        {"op": "delete", "id": 2},
+    ]})
+    
+    assert response.status_code == 200
+    assert response.json()["version"] == catalog.get_version() == version + 1
+    assert catalog.get_loan_by_name("Batch Product") is not None
+    assert catalog.get_loan_by_id(1)["anual_interest_rate"] == 0.2
+    assert catalog.get_loan_by_id(2) is None
+
+
+def test_failed_batch_is_rolled_back(client, catalog):
+    before = catalog.get_all_loans()
+    version = catalog.get_version()
+    
+    response = client.post("/loans/batch", json={"operations": [
+        {"op": "create", "loan": NEW_LOAN},
+        {"op": "update", "id": 1, "loan": {**before[0], "anual_interest_rate": 0.2}},
+        {"op": "delete", "id": 2},
+        {"op": "delete", "id": 999},
+    ]})
+    
+    assert response.status_code == 404
+    assert response.json()["detail"].startswith("Operation 3:")
+    assert catalog.get_all_loans() == before
+    assert catalog.get_version() == version
+    assert catalog.get_changes_since(version) == {"version": version, "changed": [], "deleted": []}
+
+
+def test_invalid_import_row_rejects_the_whole_file(client, catalog):
+    before = catalog.get_all_loans()
+    sheet = (
+        "productName,minimumAmount,maximumAmount,anual_interest_rate\n"
+        "Imported A,1000,2000,0.1\n"
+        "Imported B,not a number,2000,0.1\n"
+    )
+    
+    response = client.post("/loans/import?format=csv", files={"file": ("loans.csv", io.BytesIO(sheet.encode()))})
+    
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 3:")
+    assert catalog.get_all_loans() == before
@@ -0,0 +1,108 @@
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from backend.utils import calculate_compound_interest, compute_prepayment_columns
+
+
+def reference_schedule(principal, annual_rate, num_years, extra_monthly_payment=0.0, lump_sums=(),
+                       recast_mode="reduce_term", rate_changes=()):
+    """Walk the loan one month at a time, following compute_prepayment_columns' documented rules."""
+    num_payments = num_years * 12
+    prepayments = defaultdict(float)
+    for month, amount in lump_sums:
+        prepayments[month] += amount
+    new_rates = dict(rate_changes)
+    annual_rate = new_rates.pop(1, annual_rate)
+    scheduled_payment = calculate_compound_interest(principal, annual_rate, num_years)
+    balance = float(principal)
+    rows = []
+    
+    for month in range(1, num_payments + 1):
+        if month in new_rates:
+            annual_rate = new_rates[month]
+            scheduled_payment = calculate_compound_interest(balance, annual_rate, (num_payments - month + 1) / 12)
+        interest = balance * annual_rate / 12
+        payment = scheduled_payment + extra_monthly_payment
+        if month == num_payments or balance + interest <= payment:
+            payment = balance + interest
+        balance -= payment - interest
+        
+        prepayment = 0.0
+        if balance > 0 and month in prepayments:
+            prepayment = min(prepayments[month], balance)
+            balance -= prepayment
+            if recast_mode == "reduce_payment" and balance > 0:
+                scheduled_payment = calculate_compound_interest(balance, annual_rate, (num_payments - month) / 12)
+        rows.append((month, payment, payment - interest, interest, prepayment, balance))
+        if balance <= 0:
+            break
+    
+    fields = ("month", "monthly_payment", "principal_paid", "interest_paid", "prepayment", "remaining_balance")
+    return dict(zip(fields, (np.array(column) for column in zip(*rows))))
+
+
+def random_scenario(seed: int) -> dict:
+    generator = random.Random(seed)
+    num_years = generator.randint(1, 30)
+    num_payments = num_years * 12
+    principal = generator.uniform(1e6, 1e8)
+    return {
+        "principal": principal,
+        "annual_rate": generator.choice([0.0, generator.uniform(0.01, 0.3)]),
+        "num_years": num_years,
+        "extra_monthly_payment": generator.choice([0.0, generator.uniform(0, principal / 100)]),
+        "lump_sums": [
+            (generator.randint(1, num_payments), generator.uniform(0, principal / 5))
+            for _ in range(generator.randint(0, 4))
+        ],
+        "recast_mode": generator.choice(["reduce_term", "reduce_payment"]),
+        "rate_changes": [
+            (generator.randint(1, num_payments), generator.uniform(0.01, 0.3))
+            for _ in range(generator.randint(0, 3))
+        ]
+    }
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_month_by_month_reference(seed):
+    scenario = random_scenario(seed)
+    columns = compute_prepayment_columns(**scenario)
+    expected = reference_schedule(**scenario)
+    
+    assert columns["month"].tolist() == expected["month"].tolist()
+    for field in ("monthly_payment", "principal_paid", "interest_paid", "prepayment", "remaining_balance"):
+        np.testing.assert_allclose(columns[field], expected[field], rtol=1e-9, atol=1e-4, err_msg=field)
+
+
+def test_balance_is_repaid_exactly():
+    columns = compute_prepayment_columns(5e7, 0.12, 20, extra_monthly_payment=2e5, lump_sums=[(24, 5e6)])
+    
+    assert columns["remaining_balance"][-1] == 0
+    assert columns["principal_paid"].sum() + columns["prepayment"].sum() == pytest.approx(5e7)
+
+
+def test_extra_payments_shorten_the_loan_and_save_interest(client):
+    calculation = {"amount": 20000000, "loanName": "Libranza", "years": 10}
+    plain = client.post("/calculate-loan?format=raw", json=calculation).json()
+    prepaid = client.post(
+        "/calculate-loan?format=raw",
+        json={**calculation, "extraMonthlyPayment": 100000, "lumpSums": [{"month": 12, "amount": 2000000}]}
+    ).json()
+    
+    assert len(prepaid["amortization_schedule"]["month"]) < len(plain["amortization_schedule"]["month"])
+    assert prepaid["summary"]["total_interest"] < plain["summary"]["total_interest"]
+
+
+def test_rate_change_in_the_first_month_is_the_reported_rate(client, product):
+    response = client.post("/calculate-loan?format=raw", json={
+        "amount": 20000000, "loanName": product["productName"], "years": 10,
+        "rateChanges": [{"month": 1, "annualInterestRate": 0.05}]
+    })
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"]["annual_interest_rate"] == 0.05
+    assert body["amortization_schedule"]["interest_paid"][0] == pytest.approx(20000000 * 0.05 / 12, abs=0.01)
@@ -0,0 +1,76 @@
+from backend.config import settings
+
+
+def _long_calculation(years: int = 40) -> dict:
+    return {"amount": 150000000, "loanName": "Hipotecario Vivienda", "years": years}
+
+
+def test_long_schedule_is_computed_in_process_pool(client):
+    response = client.post("/calculate-loan?format=raw", json=_long_calculation(39))
+    
+    assert response.status_code == 200
+    assert len(response.json()["amortization_schedule"]["month"]) == 39 * 12
+    stats = client.get("/calculate-loan/cache").json()
+    assert stats["process_pool"]["pending"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_full_process_pool_rejects_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    
+    response = client.post("/calculate-loan", json=_long_calculation(38))
+    
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.PROCESS_POOL_RETRY_AFTER_SECONDS)
+
+
+def test_short_schedule_is_not_offloaded(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    
+    assert client.post("/calculate-loan", json=_long_calculation(5)).status_code == 200
+
+
+def test_small_page_is_offloaded_by_the_cost_of_the_whole_schedule(client, monkeypatch):
+    monkeypatch.setattr(settings, "OFFLOAD_MIN_COST", 40)
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    
+    # Both return 12 rows, but only the cents engine walks all 480 months to get there
+    closed_form = client.post("/calculate-loan?limit=12", json=_long_calculation(40))
+    cents = client.post("/calculate-loan?limit=12", json={**_long_calculation(40), "engine": "cents"})
+    
+    assert closed_form.status_code == 200
+    assert cents.status_code == 503
+
+
+def test_many_rate_changes_are_offloaded(client, monkeypatch):
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    rate_changes = [{"month": month, "annualInterestRate": 0.1 + month % 5 / 100} for month in range(2, 402, 2)]
+    
+    response = client.post("/calculate-loan?limit=12", json={**_long_calculation(40), "rateChanges": rate_changes})
+    
+    assert response.status_code == 503
+
+
+def test_large_batch_is_computed_in_process_pool(client, monkeypatch):
+    batch = {"items": [{**_long_calculation(years), "engine": "cents"} for years in (10, 20, 30)]}
+    monkeypatch.setattr(settings, "OFFLOAD_MIN_COST", 10 ** 9)
+    on_loop = client.post("/calculate-loan/batch", json=batch)
+    monkeypatch.setattr(settings, "OFFLOAD_MIN_COST", 0)
+    offloaded = client.post("/calculate-loan/batch", json=batch)
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    rejected = client.post("/calculate-loan/batch", json=batch)
+    
+    assert on_loop.status_code == offloaded.status_code == 200
+    assert offloaded.json() == on_loop.json()
+    assert rejected.status_code == 503
+
+
+def test_portfolio_chunks_count_against_the_admission_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "PORTFOLIO_PROCESS_POOL_THRESHOLD", 0)
+    monkeypatch.setattr(settings, "PROCESS_POOL_MAX_PENDING", 0)
+    
+    response = client.post("/portfolio/projection", json={
+        "loans": [{"loanName": "Hipotecario Vivienda", "amount": 150000000, "years": 30}]
+    })
+    
+    assert response.status_code == 503
@@ -0,0 +1,35 @@
+import pytest
+
+
+def _grid(years) -> dict:
+    return {"loanName": "Libranza", "amount": 10000000, "annualRates": [0.1, 0.2], "years": years}
+
+
+def test_grid_over_term_range(client):
+    response = client.post("/calculate-loan/grid", json=_grid({"start": 5, "stop": 15, "step": 5}))
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body["years"] == [5, 10, 15]
+    assert len(body["monthly_payment"]) == 2
+    assert all(len(row) == 3 for row in body["monthly_payment"])
+    # Longer terms lower the payment and raise the interest paid
+    assert body["monthly_payment"][0] == sorted(body["monthly_payment"][0], reverse=True)
+    assert body["total_interest"][0] == sorted(body["total_interest"][0])
+
+
+@pytest.mark.parametrize("years", [
+    {"start": 1, "stop": 3, "step": 0.5},
+    {"start": 1.5, "stop": 3, "step": 1},
+])
+def test_fractional_term_range_is_rejected(client, years):
+    assert client.post("/calculate-loan/grid", json=_grid(years)).status_code == 422
+
+
+def test_grid_matches_single_calculations(client):
+    body = client.post("/calculate-loan/grid", json=_grid([10])).json()
+    
+    for rate, row in zip(body["annual_interest_rates"], body["monthly_payment"]):
+        calculation = {"amount": 10000000, "loanName": "Libranza", "years": 10, "customInterestRate": rate}
+        summary = client.post("/calculate-loan?format=raw", json=calculation).json()["summary"]
+        assert row[0] == pytest.approx(summary["monthly_payment"], abs=0.01)
@@ -0,0 +1,122 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.schedule import AmortizationSchedule
+from backend.shared_cache import _PROBES, SharedCalculationCache
+from backend.utils import compute_amortization_columns
+
+
+MAX_BYTES = 1024 * 1024
+
+
+def entry(years: int, annual_rate: float = 0.12) -> tuple:
+    columns = compute_amortization_columns(1000000 * years, annual_rate, years)
+    return {"years": years}, AmortizationSchedule(columns, "raw"), years * 12
+
+
+def contents(value) -> tuple:
+    summary, schedule, num_payments = value
+    return summary, {name: column.tolist() for name, column in schedule.columns.items()}, schedule.to_json(), num_payments
+
+
+def in_other_process(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def read_in_other_process(path: str, max_entries: int, key) -> tuple:
+    value = SharedCalculationCache(path, max_entries, MAX_BYTES).get(key)
+    return None if value is None else contents(value)
+
+
+def invalidate_in_other_process(path: str, max_entries: int, tag) -> int:
+    return SharedCalculationCache(path, max_entries, MAX_BYTES).invalidate_tag(tag)
+
+
+def attach_with_other_layout(path: str, max_entries: int, old_key) -> tuple:
+    cache = SharedCalculationCache(path, max_entries, MAX_BYTES)
+    missing = cache.get(old_key) is None
+    cache.put(("new",), entry(2))
+    return missing, cache.stats()["entries"]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "calculations")
+
+
+def test_entry_is_read_back_by_another_process(path):
+    cache = SharedCalculationCache(path, 64, MAX_BYTES)
+    cache.put(("loan", 5), entry(5))
+    
+    assert in_other_process(read_in_other_process, path, 64, ("loan", 5)) == contents(entry(5))
+    assert in_other_process(read_in_other_process, path, 64, ("loan", 6)) is None
+
+
+def test_invalidated_tag_is_dropped_for_every_process(path):
+    cache = SharedCalculationCache(path, 64, MAX_BYTES)
+    cache.put(("loan", 1), entry(1), tag="Product A")
+    cache.put(("loan", 2), entry(2), tag="Product A")
+    cache.put(("loan", 3), entry(3), tag="Product B")
+    
+    assert in_other_process(invalidate_in_other_process, path, 64, "Product A") == 2
+    
+    assert cache.get(("loan", 1)) is None
+    assert cache.get(("loan", 2)) is None
+    assert contents(cache.get(("loan", 3))) == contents(entry(3))
+
+
+def test_full_probe_window_evicts_its_oldest_entry(path):
+    # With as many records as probes, every key shares the same window
+    cache = SharedCalculationCache(path, _PROBES, MAX_BYTES)
+    for years in range(1, _PROBES + 1):
+        cache.put(("loan", years), entry(years))
+    assert cache.evictions == 0
+    
+    cache.put(("loan", _PROBES + 1), entry(_PROBES + 1))
+    
+    assert cache.evictions == 1
+    assert cache.get(("loan", 1)) is None
+    assert all(cache.get(("loan", years)) is not None for years in range(2, _PROBES + 2))
+
+
+def test_entries_written_over_by_the_ring_are_misses(tmp_path):
+    measuring = SharedCalculationCache(str(tmp_path / "measure"), 64, MAX_BYTES)
+    measuring.put(("loan", 1), entry(1))
+    entry_bytes = measuring.stats()["bytes"]
+    
+    # Room for two entries and a half, so the third starts a new lap over the first
+    cache = SharedCalculationCache(str(tmp_path / "ring"), 64, entry_bytes * 5 // 2)
+    cache.put(("loan", 1), entry(1))
+    cache.put(("loan", 2), entry(1))
+    held = cache.get(("loan", 1))
+    cache.put(("loan", 3), entry(1, 0.18))
+    
+    assert cache.get(("loan", 1)) is None
+    assert contents(cache.get(("loan", 2))) == contents(entry(1))
+    assert contents(cache.get(("loan", 3))) == contents(entry(1, 0.18))
+    # A result read before the ring came round is unaffected by the overwrite
+    np.testing.assert_array_equal(held[1].columns["remaining_balance"], entry(1)[1].columns["remaining_balance"])
+
+
+def test_entry_larger_than_the_ring_is_not_cached(path):
+    cache = SharedCalculationCache(path, 64, 1024)
+    
+    cache.put(("loan", 40), entry(40))
+    
+    assert cache.get(("loan", 40)) is None
+
+
+def test_attaching_with_another_layout_lays_the_file_out_again(path):
+    SharedCalculationCache(path, 64, MAX_BYTES).put(("old",), entry(1))
+    
+    missing, entries = in_other_process(attach_with_other_layout, path, 128, ("old",))
+    
+    assert missing
+    assert entries == 1
+    relaid = SharedCalculationCache(path, 128, MAX_BYTES)
+    assert relaid.get(("old",)) is None
+    assert contents(relaid.get(("new",))) == contents(entry(2))
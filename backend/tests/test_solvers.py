@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from backend.utils import (
+    calculate_compound_interest,
+    calculate_compound_interest_batch,
+    solve_annual_rate,
+    solve_max_principal,
+    solve_min_term_months,
+)
+
+
+@pytest.fixture
+def loans():
+    generator = np.random.default_rng(11)
+    size = 2000
+    return {
+        "principals": generator.uniform(1e5, 1e9, size),
+        "annual_rates": np.where(generator.random(size) < 0.05, 0.0, generator.uniform(0.001, 0.4, size)),
+        "num_years": generator.integers(1, 41, size)
+    }
+
+
+def test_max_principal_round_trips_through_the_payment(loans):
+    payments = calculate_compound_interest_batch(loans["principals"], loans["annual_rates"], loans["num_years"])
+    
+    principals = solve_max_principal(payments, loans["annual_rates"], loans["num_years"])
+    
+    np.testing.assert_allclose(principals, loans["principals"], rtol=1e-9)
+
+
+def test_min_term_round_trips_through_the_payment(loans):
+    payments = calculate_compound_interest_batch(loans["principals"], loans["annual_rates"], loans["num_years"])
+    
+    months = solve_min_term_months(loans["principals"], loans["annual_rates"], payments)
+    
+    np.testing.assert_allclose(months, loans["num_years"] * 12, rtol=1e-6)
+
+
+def test_min_term_is_infinite_when_the_payment_only_covers_interest():
+    months = solve_min_term_months([1000000, 1000000], [0.12, 0.12], [10000, 9999])
+    
+    assert np.isinf(months).all()
+
+
+def test_rate_round_trips_through_the_payment(loans):
+    payments = calculate_compound_interest_batch(loans["principals"], loans["annual_rates"], loans["num_years"])
+    
+    rates = solve_annual_rate(loans["principals"], payments, loans["num_years"])
+    
+    np.testing.assert_allclose(rates, loans["annual_rates"], rtol=1e-7, atol=1e-10)
+
+
+def test_rate_is_nan_when_even_zero_interest_cannot_repay():
+    rates = solve_annual_rate([1200000, 1200000], [10000, 9999], [10, 10])
+    
+    assert rates[0] == 0.0
+    assert np.isnan(rates[1])
+
+
+def test_max_amount_is_clamped_to_the_product(client, product):
+    payment = calculate_compound_interest(product["maximumAmount"] * 2, product["anual_interest_rate"], 20)
+    
+    response = client.post("/calculate-loan/solve/max-amount", json={
+        "loanName": product["productName"], "monthlyPayment": payment, "years": 20
+    })
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body["clamped"] is True
+    assert body["amount"] == product["maximumAmount"]
+    assert body["affordable_amount"] == pytest.approx(product["maximumAmount"] * 2)
+
+
+def test_max_amount_below_the_product_minimum_is_rejected(client, product):
+    response = client.post("/calculate-loan/solve/max-amount", json={
+        "loanName": product["productName"], "monthlyPayment": 100, "years": 5
+    })
+    
+    assert response.status_code == 400
+
+
+def test_exact_payment_gives_whole_year_term(client, product):
+    payment = calculate_compound_interest(50000000, product["anual_interest_rate"], 30)
+    
+    response = client.post("/calculate-loan/solve/min-term", json={
+        "loanName": product["productName"], "amount": 50000000, "monthlyPayment": payment
+    })
+    
+    assert response.status_code == 200
+    assert response.json()["years"] == 30
+
+
+def test_implied_rate_of_the_product_payment(client, product):
+    payment = calculate_compound_interest(50000000, product["anual_interest_rate"], 15)
+    
+    response = client.post("/calculate-loan/solve/rate", json={
+        "loanName": product["productName"], "amount": 50000000, "monthlyPayment": payment, "years": 15
+    })
+    
+    assert response.status_code == 200
+    assert response.json()["annual_interest_rate"] == pytest.approx(product["anual_interest_rate"], rel=1e-9)
+
+
+def test_min_term_beyond_the_maximum_is_rejected(client, product):
+    # Barely more than the 12% interest on 50,000,000 takes 53 years to repay
+    response = client.post("/calculate-loan/solve/min-term", json={
+        "loanName": product["productName"], "amount": 50000000, "monthlyPayment": 501000
+    })
+    
+    assert response.status_code == 400
+    assert "maximum term of 40 years" in response.json()["detail"]
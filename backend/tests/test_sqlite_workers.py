@@ -0,0 +1,20 @@
+from backend import services
+from backend.models import Loan
+from backend.sqlite_database import SQLiteLoanDatabase
+
+
+def test_product_changed_by_another_worker_is_recalculated(client, tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    this_worker = SQLiteLoanDatabase(database_url)
+    other_worker = SQLiteLoanDatabase(database_url)
+    monkeypatch.setattr(services, "loan_db", this_worker)
+    calculation = {"amount": 10000000, "loanName": "Libranza", "years": 10}
+    
+    before = client.post("/calculate-loan?format=raw", json=calculation).json()["summary"]["monthly_payment"]
+    libranza = other_worker.get_loan_by_name("Libranza")
+    # Only the other worker's listeners hear about this update
+    other_worker.update_loan(libranza["id"], Loan(**{**libranza, "anual_interest_rate": 0.02}))
+    after = client.post("/calculate-loan?format=raw", json=calculation).json()["summary"]["monthly_payment"]
+    
+    assert this_worker.get_loan_by_name("Libranza")["anual_interest_rate"] == 0.02
+    assert after < before
@@ -1,5 +1,14 @@
+import math
+import sys
+from array import array
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .schedule import AmortizationSchedule
 
 
 def calculate_compound_interest(principal: float, annual_rate: float, num_years: int) -> float:
@@ -25,9 +34,22 @@ def calculate_compound_interest(principal: float, annual_rate: float, num_years:
     return principal * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
 
 
-def calculate_loan_summary(principal: float, annual_rate: float, num_years: int) -> dict:
+def calculate_payoff_date(num_payments: int) -> str:
     """
-    Calculate the complete loan summary including total payments and interest.
+    Estimate the date of the last payment, counting 30 days per month from today.
+    
+    Args:
+        num_payments: Number of monthly payments
+        
+    Returns:
+        Date formatted as YYYY-MM-DD
+    """
+    return (datetime.now() + timedelta(days=num_payments * 30)).strftime('%Y-%m-%d')
+
+
+def compute_loan_summary(principal: float, annual_rate: float, num_years: int) -> dict:
+    """
+    Calculate the numeric loan summary including total payments and interest.
     
     Args:
         principal: The loan amount
@@ -35,7 +57,7 @@ def calculate_loan_summary(principal: float, annual_rate: float, num_years: int)
         num_years: Number of years for the loan
         
     Returns:
-        Dictionary containing loan summary information
+        Dictionary containing unformatted loan summary values
     """
     monthly_payment = calculate_compound_interest(principal, annual_rate, num_years)
     num_payments = num_years * 12
@@ -43,18 +65,58 @@ def calculate_loan_summary(principal: float, annual_rate: float, num_years: int)
     total_interest = total_paid - principal
     
     return {
-        "total_payment": f"${total_paid:,.2f}",
-        "principal": f"${principal:,.2f}",
-        "total_interest": f"${total_interest:,.2f}",
-        "monthly_payment": f"${monthly_payment:,.2f}",
-        "annual_interest_rate": f"{annual_rate * 100:.2f}%",
-        "latest_date_of_payment_after_loan": f"{(datetime.now() + timedelta(days=num_payments * 30)).strftime('%Y-%m-%d')}"
+        "total_payment": total_paid,
+        "principal": principal,
+        "total_interest": total_interest,
+        "monthly_payment": monthly_payment,
+        "annual_interest_rate": annual_rate,
+        "latest_date_of_payment_after_loan": calculate_payoff_date(num_payments)
     }
 
 
-def generate_amortization_schedule(principal: float, annual_rate: float, num_years: int) -> List[dict]:
+def format_loan_summary(summary: dict) -> dict:
     """
-    Generate a month-by-month amortization schedule for the loan.
+    Format a numeric loan summary for display.
+    
+    Args:
+        summary: Summary produced by compute_loan_summary
+        
+    Returns:
+        Dictionary with currency and percentage strings
+    """
+    return {
+        "total_payment": f"${summary['total_payment']:,.2f}",
+        "principal": f"${summary['principal']:,.2f}",
+        "total_interest": f"${summary['total_interest']:,.2f}",
+        "monthly_payment": f"${summary['monthly_payment']:,.2f}",
+        "annual_interest_rate": f"{summary['annual_interest_rate'] * 100:.2f}%",
+        "latest_date_of_payment_after_loan": summary["latest_date_of_payment_after_loan"]
+    }
+
+
+def round_loan_summary(summary: dict) -> dict:
+    """
+    Round the amounts of a numeric loan summary to cents.
+    
+    Args:
+        summary: Summary produced by compute_loan_summary
+        
+    Returns:
+        Dictionary with plain float amounts
+    """
+    return {
+        "total_payment": round(summary["total_payment"], 2),
+        "principal": round(summary["principal"], 2),
+        "total_interest": round(summary["total_interest"], 2),
+        "monthly_payment": round(summary["monthly_payment"], 2),
+        "annual_interest_rate": summary["annual_interest_rate"],
+        "latest_date_of_payment_after_loan": summary["latest_date_of_payment_after_loan"]
+    }
+
+
+def calculate_loan_summary(principal: float, annual_rate: float, num_years: int) -> dict:
+    """
+    Calculate the complete loan summary including total payments and interest.
     
     Args:
         principal: The loan amount
@@ -62,34 +124,498 @@ def generate_amortization_schedule(principal: float, annual_rate: float, num_yea
         num_years: Number of years for the loan
         
     Returns:
-        List of dictionaries containing monthly payment breakdowns
+        Dictionary containing loan summary information
+    """
+    return format_loan_summary(compute_loan_summary(principal, annual_rate, num_years))
+
+
+def calculate_remaining_balance(
+    principal: float,
+    monthly_rate: float,
+    monthly_payment: float,
+    months: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the remaining balance after the given numbers of payments.
+    
+    Uses the closed form B(k) = P(1+r)^k - M((1+r)^k - 1)/r, so any month
+    costs the same to evaluate regardless of the loan term.
+    
+    Args:
+        principal: The loan amount
+        monthly_rate: Monthly interest rate (as decimal)
+        monthly_payment: Fixed monthly payment
+        months: Numbers of payments already made
+        
+    Returns:
+        Array of remaining balances, one per entry in months
+    """
+    months = np.asarray(months, dtype=np.float64)
+    if monthly_rate == 0:
+        return principal - monthly_payment * months
+    
+    growth = np.power(1 + monthly_rate, months)
+    return principal * growth - monthly_payment * (growth - 1) / monthly_rate
+
+
+def compute_amortization_columns(
+    principal: float,
+    annual_rate: float,
+    num_years: int,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute the month-by-month amortization schedule as numeric columns.
+    
+    Only the requested window of months is evaluated, so a page deep into a
+    long loan costs the same as the first page of a short one.
+    
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal)
+        num_years: Number of years for the loan
+        offset: Number of leading months to skip
+        limit: Maximum number of months to return (all remaining if None)
+        
+    Returns:
+        Dictionary of parallel "month", "monthly_payment", "principal_paid",
+        "interest_paid" and "remaining_balance" arrays
     """
     monthly_rate = annual_rate / 12
     num_payments = num_years * 12
     monthly_payment = calculate_compound_interest(principal, annual_rate, num_years)
     
-    amortization_schedule = []
-    remaining_balance = principal
+    first_month = min(offset, num_payments) + 1
+    last_month = num_payments if limit is None else min(num_payments, first_month - 1 + limit)
+    months = np.arange(first_month, last_month + 1)
+    
+    balances = calculate_remaining_balance(
+        principal, monthly_rate, monthly_payment, np.arange(first_month - 1, last_month + 1)
+    )
+    interest_paid = balances[:-1] * monthly_rate
+    principal_paid = monthly_payment - interest_paid
+    remaining_balance = balances[1:]
+    
+    # Adjust the final payment to ensure the balance is exactly zero
+    if len(months) and last_month == num_payments:
+        principal_paid[-1] += remaining_balance[-1]
+        remaining_balance[-1] = 0
     
-    for month in range(1, num_payments + 1):
-        interest_for_month = remaining_balance * monthly_rate
-        principal_for_month = monthly_payment - interest_for_month
-        remaining_balance -= principal_for_month
+    return {
+        "month": months,
+        "monthly_payment": np.full(len(months), monthly_payment),
+        "principal_paid": principal_paid,
+        "interest_paid": interest_paid,
+        "remaining_balance": remaining_balance
+    }
+
+
+@lru_cache(maxsize=256)
+def _monthly_rate_fraction(annual_rate: float) -> Tuple[int, int]:
+    """
+    The monthly rate as an exact (numerator, denominator) pair.
+    
+    The annual rate's shortest decimal form is taken exactly (0.165 -> 33/200),
+    so the monthly rate is numerator / denominator with small integers.
+    """
+    annual_fraction = Fraction(repr(annual_rate))
+    return annual_fraction.numerator, 12 * annual_fraction.denominator
+
+
+def _exact_payment_cents(principal_cents: int, rate_numerator: int, denominator: int, num_payments: int) -> int:
+    """
+    The annuity payment rounded up to the cent, in exact integer arithmetic.
+    
+    With r = rate_numerator / denominator the payment is
+    P * r * (1+r)^n / ((1+r)^n - 1); both powers are scaled by denominator^n.
+    """
+    growth = (denominator + rate_numerator) ** num_payments
+    numerator = principal_cents * rate_numerator * growth
+    return -(-numerator // (denominator * (growth - denominator ** num_payments)))
+
+
+def compute_amortization_columns_cents(
+    principal: float,
+    annual_rate: float,
+    num_years: int,
+    rounding: str = "half_even"
+) -> Dict[str, np.ndarray]:
+    """
+    Compute the amortization schedule in exact integer cents.
+    
+    The principal is rounded to cents and the payment is rounded up to the
+    next cent. Each month's interest is rounded to the cent with the given
+    rule, and the final payment is trued up so it clears the balance
+    exactly. Every value is a whole number of cents, so the columns
+    reconcile exactly (principal paid sums to the principal, and each row
+    satisfies payment = principal + interest).
+    
+    Only the interest recurrence runs month by month, on Python integers:
+    each month's rounding depends on the rounded balance before it, so it
+    has no closed form. Payments, principal and balances are then derived
+    with integer array arithmetic.
+    
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal)
+        num_years: Number of years for the loan
+        rounding: "half_even" (banker's rounding) or "half_up"
+        
+    Returns:
+        Dictionary with the columns of compute_amortization_columns, in
+        currency units
+    """
+    num_payments = num_years * 12
+    principal_cents = round(principal * 100)
+    rate_numerator, denominator = _monthly_rate_fraction(annual_rate)
+    
+    if rate_numerator == 0:
+        payment_cents = -(-principal_cents // num_payments)
+    else:
+        # The float annuity is within a few ulps times (n + 1/r) of the exact one: the
+        # (1+r)^n - 1 term cancels for tiny rates. Only when that error bound reaches a
+        # whole cent could the ceiling be wrong, and the payment is then computed exactly
+        payment = calculate_compound_interest(principal_cents, annual_rate, num_years)
+        error_bound = payment * 64 * sys.float_info.epsilon * (num_payments + denominator / rate_numerator)
+        payment_cents = math.ceil(payment)
+        if payment_cents - payment < error_bound or payment - (payment_cents - 1) < error_bound:
+            payment_cents = _exact_payment_cents(principal_cents, rate_numerator, denominator, num_payments)
+    
+    # Half-up: interest = floor(scaled / (2 * denominator)), scaled = 2 * balance * rate_numerator + denominator.
+    # scaled is carried from month to month instead of the balance, saving a multiplication per month.
+    # The division is exact only on a tie, which half-even moves down when it landed on an odd cent.
+    twice_numerator, twice_denominator = 2 * rate_numerator, 2 * denominator
+    scaled = principal_cents * twice_numerator + denominator
+    scaled_payment = payment_cents * twice_numerator
+    interest = [0] * num_payments
+    if rounding == "half_up":
+        for month in range(num_payments):
+            monthly_interest = scaled // twice_denominator
+            interest[month] = monthly_interest
+            scaled += monthly_interest * twice_numerator - scaled_payment
+    else:
+        for month in range(num_payments):
+            monthly_interest = scaled // twice_denominator
+            if monthly_interest & 1 and monthly_interest * twice_denominator == scaled:
+                monthly_interest -= 1
+            interest[month] = monthly_interest
+            scaled += monthly_interest * twice_numerator - scaled_payment
+    
+    # Packing through array('q') converts the Python ints faster than np.array does
+    interest_paid = np.frombuffer(array("q", interest), dtype=np.int64)
+    principal_paid = payment_cents - interest_paid
+    remaining_balance = principal_cents - np.cumsum(principal_paid)
+    
+    # The rounded-up payment can clear tiny loans early. Interest never exceeds
+    # the payment, so balances never rise and only the second-to-last month
+    # needs checking before searching for the payoff month
+    payoff = num_payments - 1
+    if num_payments > 1 and remaining_balance[-2] <= 0:
+        payoff = int(np.argmax(remaining_balance <= 0))
+        interest_paid = interest_paid[:payoff + 1]
+        principal_paid = principal_paid[:payoff + 1]
+        remaining_balance = remaining_balance[:payoff + 1]
+    # The payoff month gets the true-up
+    principal_paid[payoff] += remaining_balance[payoff]
+    remaining_balance[payoff] = 0
+    monthly_payment = principal_paid + interest_paid
+    
+    return {
+        "month": np.arange(1, payoff + 2),
+        "monthly_payment": monthly_payment / 100,
+        "principal_paid": principal_paid / 100,
+        "interest_paid": interest_paid / 100,
+        "remaining_balance": remaining_balance / 100
+    }
+
+
+def starting_annual_rate(annual_rate: float, rate_changes: Sequence[Tuple[int, float]] = ()) -> float:
+    """
+    Return the rate charged in the first month of a loan with rate changes.
+    
+    A change in month 1 replaces the loan's own rate from the start; the
+    last one given wins, as in compute_prepayment_columns.
+    
+    Args:
+        annual_rate: Annual interest rate (as decimal) of the loan
+        rate_changes: (month, annual rate) pairs
+        
+    Returns:
+        The annual rate of the first month
+    """
+    for month, rate in rate_changes:
+        if month == 1:
+            annual_rate = rate
+    return annual_rate
+
+
+def compute_prepayment_columns(
+    principal: float,
+    annual_rate: float,
+    num_years: int,
+    extra_monthly_payment: float = 0.0,
+    lump_sums: Sequence[Tuple[int, float]] = (),
+    recast_mode: str = "reduce_term",
+    rate_changes: Sequence[Tuple[int, float]] = ()
+) -> Dict[str, np.ndarray]:
+    """
+    Compute an amortization schedule with extra payments or rate changes as
+    numeric columns.
+    
+    The schedule is split into segments at lump-sum and rate-change months.
+    Within a segment the rate and payment are constant, so a first pass
+    walks the segments using the closed-form remaining balance and payoff
+    month, and a second pass evaluates every month of every segment in one
+    vectorized step. The Python-level cost grows with the number of events,
+    not the number of months.
+    
+    The extra monthly payment is added to every scheduled payment. A lump
+    sum is paid right after the regular payment of its month. With
+    "reduce_term" the scheduled payment never changes and the loan ends
+    early; with "reduce_payment" the scheduled payment is recomputed after
+    each lump sum so the balance is still repaid over the original term.
+    A rate change applies from its month on, so that month's interest is
+    already charged at the new rate, and the scheduled payment is
+    re-amortized over the months left in the original term.
+    
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal) until the first rate change
+        num_years: Number of years for the loan
+        extra_monthly_payment: Amount added to every monthly payment
+        lump_sums: (month, amount) pairs of one-off prepayments
+        recast_mode: "reduce_term" or "reduce_payment"
+        rate_changes: (month, annual rate) pairs; the last one given for a month wins
+        
+    Returns:
+        Dictionary of parallel "month", "monthly_payment", "principal_paid",
+        "interest_paid", "prepayment" and "remaining_balance" arrays
+    """
+    num_payments = num_years * 12
+    
+    prepayments: Dict[int, float] = {}
+    for month, amount in lump_sums:
+        prepayments[month] = prepayments.get(month, 0.0) + amount
+    # Keyed by the month after which the new rate applies
+    new_rates = {month - 1: rate for month, rate in rate_changes if month > 1}
+    annual_rate = starting_annual_rate(annual_rate, rate_changes)
+    scheduled_payment = calculate_compound_interest(principal, annual_rate, num_years)
+    boundaries = sorted({month for month in [*prepayments, *new_rates] if month < num_payments}) + [num_payments]
+    
+    # First pass: each segment's length, rate, payment and opening balance
+    lengths, monthly_rates, payments, opening_balances, closing_balances, settled, applied = [], [], [], [], [], [], []
+    balance = float(principal)
+    month = 0
+    
+    for boundary in boundaries:
+        monthly_rate = annual_rate / 12
+        payment = scheduled_payment + extra_monthly_payment
+        if monthly_rate == 0:
+            months_to_payoff = balance / payment
+        elif balance * monthly_rate >= payment:
+            months_to_payoff = math.inf
+        else:
+            months_to_payoff = -math.log1p(-balance * monthly_rate / payment) / math.log1p(monthly_rate)
+        # Tolerate float noise so an exact payoff month is not pushed one month later
+        payoff_length = math.ceil(months_to_payoff - 1e-9) if months_to_payoff != math.inf else math.inf
+        length = min(boundary - month, payoff_length)
+        
+        lengths.append(length)
+        monthly_rates.append(monthly_rate)
+        payments.append(payment)
+        opening_balances.append(balance)
+        
+        # The last payment of the loan is settled so the balance is exactly zero
+        settles = length == payoff_length or month + length == num_payments
+        settled.append(settles)
+        if settles:
+            balance = 0.0
+        elif monthly_rate == 0:
+            balance -= payment * length
+        else:
+            growth = (1 + monthly_rate) ** length
+            balance = balance * growth - payment * (growth - 1) / monthly_rate
+        month += length
+        
+        prepayment = 0.0
+        if month == boundary and balance > 0 and month in prepayments:
+            prepayment = min(prepayments[month], balance)
+            balance -= prepayment
+            if recast_mode == "reduce_payment" and balance > 0:
+                # Re-amortize the new balance over the months left in the original term
+                scheduled_payment = calculate_compound_interest(balance, annual_rate, (num_payments - month) / 12)
+        if month == boundary and balance > 0 and month in new_rates:
+            annual_rate = new_rates[month]
+            scheduled_payment = calculate_compound_interest(balance, annual_rate, (num_payments - month) / 12)
+        applied.append(prepayment)
+        closing_balances.append(balance)
+        if balance <= 0:
+            break
+    
+    # Second pass: every month of every segment at once, from its segment's opening balance
+    lengths = np.array(lengths)
+    segment_ends = np.cumsum(lengths)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    elapsed = np.arange(month) - np.repeat(segment_ends - lengths, lengths)
+    rate = np.array(monthly_rates)[segment]
+    payment = np.array(payments)[segment]
+    opening = np.array(opening_balances)[segment]
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth_before = np.power(1 + rate, elapsed)
+        growth_after = np.power(1 + rate, elapsed + 1)
+        balance_before = np.where(
+            rate == 0, opening - payment * elapsed, opening * growth_before - payment * (growth_before - 1) / rate
+        )
+        remaining_balance = np.where(
+            rate == 0,
+            opening - payment * (elapsed + 1),
+            opening * growth_after - payment * (growth_after - 1) / rate
+        )
+    interest_paid = balance_before * rate
+    principal_paid = payment - interest_paid
+    
+    last_rows = segment_ends - 1
+    settled_rows = last_rows[np.array(settled)]
+    principal_paid[settled_rows] = balance_before[settled_rows]
+    payment[settled_rows] = interest_paid[settled_rows] + balance_before[settled_rows]
+    prepayment = np.zeros(month)
+    prepayment[last_rows] = applied
+    remaining_balance[last_rows] = closing_balances
+    
+    return {
+        "month": np.arange(1, month + 1),
+        "monthly_payment": payment,
+        "principal_paid": principal_paid,
+        "interest_paid": interest_paid,
+        "prepayment": prepayment,
+        "remaining_balance": remaining_balance
+    }
+
+
+def slice_amortization_columns(
+    columns: Dict[str, np.ndarray],
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Select a window of rows from precomputed amortization columns.
+    
+    Args:
+        columns: Parallel column arrays
+        offset: Number of leading months to skip
+        limit: Maximum number of months to keep (all remaining if None)
         
-        # Adjust the final payment to ensure the balance is exactly zero
-        if month == num_payments and remaining_balance != 0:
-            principal_for_month += remaining_balance
-            remaining_balance = 0
+    Returns:
+        Columns restricted to the requested months
+    """
+    stop = None if limit is None else offset + limit
+    return {key: column[offset:stop] for key, column in columns.items()}
 
-        amortization_schedule.append({
-            "month": month,
-            "monthly_payment": f"${monthly_payment:,.2f}",
-            "principal_paid": f"${principal_for_month:,.2f}",
-            "interest_paid": f"${interest_for_month:,.2f}",
-            "remaining_balance": f"${remaining_balance:,.2f}"
-        })
+
+def summarize_amortization_columns(principal: float, annual_rate: float, columns: Dict[str, np.ndarray]) -> dict:
+    """
+    Build a numeric loan summary from a complete schedule.
+    
+    Used for schedules whose totals do not follow from the annuity formula,
+    such as those with prepayments.
     
-    return amortization_schedule
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal)
+        columns: Columns covering the whole loan
+        
+    Returns:
+        Dictionary with the keys of compute_loan_summary
+    """
+    total_paid = float(columns["monthly_payment"].sum() + columns.get("prepayment", np.zeros(1)).sum())
+    
+    return {
+        "total_payment": total_paid,
+        "principal": principal,
+        "total_interest": float(columns["interest_paid"].sum()),
+        "monthly_payment": float(columns["monthly_payment"][0]),
+        "annual_interest_rate": annual_rate,
+        "latest_date_of_payment_after_loan": calculate_payoff_date(len(columns["month"]))
+    }
+
+
+def iter_amortization_columns(
+    principal: float,
+    annual_rate: float,
+    num_years: int,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    chunk_months: int = 120
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yield the amortization schedule as successive chunks of numeric columns.
+    
+    Each chunk is computed only when requested, so memory use is bounded by
+    chunk_months no matter how long the loan is.
+    
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal)
+        num_years: Number of years for the loan
+        offset: Number of leading months to skip
+        limit: Maximum number of months to yield (all remaining if None)
+        chunk_months: Number of months per chunk
+        
+    Yields:
+        Columns in the layout returned by compute_amortization_columns
+    """
+    num_payments = num_years * 12
+    end = num_payments if limit is None else min(num_payments, offset + limit)
+    
+    for chunk_start in range(offset, end, chunk_months):
+        yield compute_amortization_columns(
+            principal, annual_rate, num_years, chunk_start, min(chunk_months, end - chunk_start)
+        )
+
+
+def round_amortization_columns(columns: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """
+    Convert numeric amortization columns to plain lists rounded to cents.
+    
+    For fixed-payment schedules the monthly payment is left out because it
+    is constant and already reported in the summary. Schedules with
+    prepayments keep it, along with the prepayment column.
+    
+    Args:
+        columns: Columns produced by compute_amortization_columns or
+            compute_prepayment_columns
+        
+    Returns:
+        Dictionary of parallel "month", "principal_paid", "interest_paid"
+        and "remaining_balance" lists
+    """
+    return AmortizationSchedule(columns, "raw").to_list()
+
+
+def generate_amortization_schedule(
+    principal: float,
+    annual_rate: float,
+    num_years: int,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> AmortizationSchedule:
+    """
+    Generate a month-by-month amortization schedule for the loan.
+    
+    Args:
+        principal: The loan amount
+        annual_rate: Annual interest rate (as decimal)
+        num_years: Number of years for the loan
+        offset: Number of leading months to skip
+        limit: Maximum number of months to return (all remaining if None)
+        
+    Returns:
+        Array-backed schedule of monthly payment breakdowns in display
+        format; rows are materialized on access
+    """
+    return AmortizationSchedule(compute_amortization_columns(principal, annual_rate, num_years, offset, limit))
 
 
 def validate_loan_amount(amount: float, minimum_amount: float, maximum_amount: float) -> Tuple[bool, str]:
@@ -111,4 +637,370 @@ def validate_loan_amount(amount: float, minimum_amount: float, maximum_amount: f
         )
         return False, error_msg
     
-    return True, "" 
\ No newline at end of file
+    return True, ""
+
+
+def calculate_payment_grid(
+    principal: float,
+    annual_rates: Sequence[float],
+    num_years: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate monthly payments and total interest for every rate/term pair.
+    
+    The annuity formula is broadcast over a (rates x terms) grid in a single
+    array operation.
+    
+    Args:
+        principal: The loan amount
+        annual_rates: Annual interest rates (as decimals), one per grid row
+        num_years: Loan terms in years, one per grid column
+        
+    Returns:
+        Tuple of (monthly payments, total interest) matrices
+    """
+    rates = np.asarray(annual_rates, dtype=np.float64)[:, None]
+    years = np.asarray(num_years, dtype=np.int64)[None, :]
+    
+    monthly_payments = calculate_compound_interest_batch(principal, rates, years)
+    total_interest = monthly_payments * (years * 12) - principal
+    return monthly_payments, total_interest
+
+
+def expand_range(start: float, stop: float, step: float) -> np.ndarray:
+    """
+    Expand an inclusive start/stop/step range into its values.
+    
+    Args:
+        start: First value
+        stop: Last value (included when it falls on a step)
+        step: Positive distance between consecutive values
+        
+    Returns:
+        Array of values, rounded to 10 decimals to drop float accumulation noise
+    """
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return np.round(start + step * np.arange(max(count, 0)), 10)
+
+
+def solve_max_principal(
+    monthly_payments: Sequence[float],
+    annual_rates: Sequence[float],
+    num_years: Sequence[int]
+) -> np.ndarray:
+    """
+    Find the largest principal each monthly payment can amortize.
+    
+    Inverts the annuity formula: P = M * (1 - (1+r)^-n) / r.
+    
+    Args:
+        monthly_payments: Target monthly payments
+        annual_rates: Annual interest rates (as decimals)
+        num_years: Number of years for each loan
+        
+    Returns:
+        Array of maximum principals
+    """
+    monthly_payments = np.asarray(monthly_payments, dtype=np.float64)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 12
+    num_payments = np.asarray(num_years, dtype=np.float64) * 12
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        principals = monthly_payments * (1 - np.power(1 + monthly_rates, -num_payments)) / monthly_rates
+    return np.where(monthly_rates == 0, monthly_payments * num_payments, principals)
+
+
+def solve_min_term_months(
+    principals: Sequence[float],
+    annual_rates: Sequence[float],
+    monthly_payments: Sequence[float]
+) -> np.ndarray:
+    """
+    Find the number of months each monthly payment needs to repay a principal.
+    
+    Solves the annuity formula for n: n = -log(1 - P*r/M) / log(1+r).
+    
+    Args:
+        principals: Loan amounts
+        annual_rates: Annual interest rates (as decimals)
+        monthly_payments: Monthly payments
+        
+    Returns:
+        Array of fractional month counts; inf where the payment does not
+        even cover the first month's interest
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 12
+    monthly_payments = np.asarray(monthly_payments, dtype=np.float64)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        months = -np.log1p(-principals * monthly_rates / monthly_payments) / np.log1p(monthly_rates)
+        months = np.where(monthly_rates == 0, principals / monthly_payments, months)
+    return np.where(np.isnan(months) | (principals * monthly_rates >= monthly_payments), np.inf, months)
+
+
+def solve_annual_rate(
+    principals: Sequence[float],
+    monthly_payments: Sequence[float],
+    num_years: Sequence[int],
+    tolerance: float = 1e-12,
+    max_iterations: int = 100
+) -> np.ndarray:
+    """
+    Find the annual rate implied by a principal, monthly payment and term.
+    
+    Runs Newton's method on all loans at once, falling back to bisection
+    whenever a Newton step leaves the bracket [0, M/P] that is known to
+    contain the monthly rate.
+    
+    Args:
+        principals: Loan amounts
+        monthly_payments: Monthly payments
+        num_years: Number of years for each loan
+        tolerance: Convergence threshold on the monthly rate
+        max_iterations: Maximum number of iterations
+        
+    Returns:
+        Array of annual rates; NaN where the payment is too small to repay
+        the principal even at 0% interest
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    monthly_payments = np.asarray(monthly_payments, dtype=np.float64)
+    num_payments = np.asarray(num_years, dtype=np.float64) * 12
+    
+    # The payment is P/n at 0% and exceeds P*r at any rate r, so the root lies in [0, M/P]
+    low = np.zeros_like(principals)
+    high = monthly_payments / principals
+    rates = high / 2
+    
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iterations):
+            discount = np.power(1 + rates, -num_payments)
+            annuity = 1 - discount
+            error = principals * rates / annuity - monthly_payments
+            slope = principals * (annuity - rates * num_payments * discount / (1 + rates)) / annuity**2
+            
+            low = np.where(error < 0, rates, low)
+            high = np.where(error > 0, rates, high)
+            
+            newton = rates - error / slope
+            next_rates = np.where((newton > low) & (newton < high), newton, (low + high) / 2)
+            converged = np.all(np.abs(next_rates - rates) <= tolerance)
+            rates = next_rates
+            if converged:
+                break
+    
+    zero_rate_payments = principals / num_payments
+    rates = np.where(np.isclose(monthly_payments, zero_rate_payments, rtol=1e-12, atol=0), 0.0, rates)
+    return np.where(monthly_payments < zero_rate_payments, np.nan, rates * 12)
+
+
+def validate_loan_term(num_years: int) -> Tuple[bool, str]:
+    """
+    Validate that a loan term is long enough to be amortized.
+    
+    Args:
+        num_years: The requested number of years
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if num_years < 1:
+        return False, f"Requested term of {num_years} years is not valid; loans must last at least 1 year."
+    
+    return True, ""
+
+
+def calculate_compound_interest_batch(
+    principals: Sequence[float],
+    annual_rates: Sequence[float],
+    num_years: Sequence[int]
+) -> np.ndarray:
+    """
+    Vectorized version of calculate_compound_interest for many loans at once.
+    
+    Args:
+        principals: Loan amounts
+        annual_rates: Annual interest rates (as decimals)
+        num_years: Number of years for each loan
+        
+    Returns:
+        Array of monthly payment amounts, one per loan
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    monthly_rates = np.asarray(annual_rates, dtype=np.float64) / 12
+    num_payments = np.asarray(num_years, dtype=np.float64) * 12
+    
+    growth = np.power(1 + monthly_rates, num_payments)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payments = principals * (monthly_rates * growth) / (growth - 1)
+    
+    # 0% interest loans fall back to straight-line repayment
+    return np.where(monthly_rates == 0, principals / num_payments, payments)
+
+
+def calculate_loan_summaries_batch(
+    principals: Sequence[float],
+    annual_rates: Sequence[float],
+    num_years: Sequence[int],
+    monthly_payments: Sequence[float]
+) -> List[dict]:
+    """
+    Build numeric loan summaries for many loans at once.
+    
+    Args:
+        principals: Loan amounts
+        annual_rates: Annual interest rates (as decimals)
+        num_years: Number of years for each loan
+        monthly_payments: Monthly payments from calculate_compound_interest_batch
+        
+    Returns:
+        List of summary dictionaries with amounts rounded to cents
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    num_payments = np.asarray(num_years, dtype=np.int64) * 12
+    monthly_payments = np.asarray(monthly_payments, dtype=np.float64)
+    total_paid = monthly_payments * num_payments
+    
+    columns = zip(
+        np.round(total_paid, 2).tolist(),
+        np.round(principals, 2).tolist(),
+        np.round(total_paid - principals, 2).tolist(),
+        np.round(monthly_payments, 2).tolist(),
+        np.asarray(annual_rates, dtype=np.float64).tolist(),
+        num_payments.tolist()
+    )
+    
+    return [
+        {
+            "total_payment": total,
+            "principal": principal,
+            "total_interest": interest,
+            "monthly_payment": payment,
+            "annual_interest_rate": rate,
+            "latest_date_of_payment_after_loan": calculate_payoff_date(payments)
+        }
+        for total, principal, interest, payment, rate, payments in columns
+    ]
+
+
+def generate_amortization_schedules_batch(
+    principals: Sequence[float],
+    annual_rates: Sequence[float],
+    num_years: Sequence[int]
+) -> Dict[str, np.ndarray]:
+    """
+    Generate amortization schedules for many loans at once.
+    
+    Every month is computed directly from the closed-form remaining balance
+    B(k) = P(1+r)^k - M((1+r)^k - 1)/r, so no loop over months is needed.
+    Loans shorter than the longest term are padded with NaN.
+    
+    Args:
+        principals: Loan amounts
+        annual_rates: Annual interest rates (as decimals)
+        num_years: Number of years for each loan
+        
+    Returns:
+        Dictionary with the per-loan "monthly_payment" and "num_payments"
+        vectors and the "principal_paid", "interest_paid" and
+        "remaining_balance" matrices of shape (loans, longest term in months)
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    annual_rates = np.asarray(annual_rates, dtype=np.float64)
+    num_payments = np.asarray(num_years, dtype=np.int64) * 12
+    monthly_payments = calculate_compound_interest_batch(principals, annual_rates, num_years)
+    
+    monthly_rates = (annual_rates / 12)[:, None]
+    principal_col = principals[:, None]
+    payment_col = monthly_payments[:, None]
+    months = np.arange(int(num_payments.max(initial=0)) + 1, dtype=np.float64)[None, :]
+    
+    growth = np.power(1 + monthly_rates, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balances = principal_col * growth - payment_col * (growth - 1) / monthly_rates
+    balances = np.where(monthly_rates == 0, principal_col - payment_col * months, balances)
+    
+    interest_paid = balances[:, :-1] * monthly_rates
+    principal_paid = payment_col - interest_paid
+    remaining_balance = balances[:, 1:]
+    
+    # Adjust the final payment of every loan so its balance is exactly zero
+    rows = np.arange(len(principals))
+    last = num_payments - 1
+    principal_paid[rows, last] += remaining_balance[rows, last]
+    remaining_balance[rows, last] = 0
+    
+    beyond_term = np.arange(remaining_balance.shape[1])[None, :] > last[:, None]
+    for column in (interest_paid, principal_paid, remaining_balance):
+        column[beyond_term] = np.nan
+    
+    return {
+        "monthly_payment": monthly_payments,
+        "num_payments": num_payments,
+        "principal_paid": principal_paid,
+        "interest_paid": interest_paid,
+        "remaining_balance": remaining_balance
+    }
+
+
+PORTFOLIO_FLOW_FIELDS = ("principal_paid", "interest_paid", "remaining_balance")
+
+
+def project_portfolio_cash_flows(
+    principals: Sequence[float],
+    annual_rates: Sequence[float],
+    num_years: Sequence[int],
+    product_indexes: Sequence[int],
+    num_products: int
+) -> np.ndarray:
+    """
+    Aggregate the monthly cash flows of a chunk of loans per product.
+    
+    Args:
+        principals: Loan amounts
+        annual_rates: Annual interest rates (as decimals)
+        num_years: Number of years for each loan
+        product_indexes: Index of each loan's product, in [0, num_products)
+        num_products: Number of products in the catalog
+        
+    Returns:
+        Array of shape (num_products, len(PORTFOLIO_FLOW_FIELDS), longest term
+        in months) holding the summed principal, interest and remaining
+        balance of every product's loans for each month
+    """
+    schedules = generate_amortization_schedules_batch(principals, annual_rates, num_years)
+    flows = np.stack(
+        [np.nan_to_num(schedules[field], nan=0.0) for field in PORTFOLIO_FLOW_FIELDS], axis=1
+    )
+    
+    # Sort loans by product so each product's rows can be summed in one reduceat pass
+    product_indexes = np.asarray(product_indexes, dtype=np.int64)
+    order = np.argsort(product_indexes, kind="stable")
+    products, starts = np.unique(product_indexes[order], return_index=True)
+    
+    totals = np.zeros((num_products,) + flows.shape[1:])
+    if len(products):
+        totals[products] = np.add.reduceat(flows[order], starts, axis=0)
+    return totals
+
+
+def add_portfolio_cash_flows(total: Optional[np.ndarray], chunk: np.ndarray) -> np.ndarray:
+    """
+    Add the cash flows of one chunk to a running portfolio total.
+    
+    Chunks may cover different horizons; the shorter one is padded with zeros.
+    
+    Args:
+        total: Running total from project_portfolio_cash_flows, or None
+        chunk: Cash flows of the next chunk
+        
+    Returns:
+        The combined cash flows
+    """
+    if total is None:
+        return chunk
+    if chunk.shape[-1] > total.shape[-1]:
+        total, chunk = chunk, total
+    total[..., :chunk.shape[-1]] += chunk
+    return total
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from fastapi import HTTPException
+
+from .config import settings
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+_pending_tasks = 0
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared process pool used for CPU-heavy calculations.
+
+    The pool is created on first use so that workers are only spawned when a
+    request actually needs them.
+
+    Returns:
+        The process pool executor
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_WORKERS)
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared process pool, if it was started."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+def process_pool_size() -> int:
+    """Number of worker processes the shared pool runs with."""
+    return settings.PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+
+def pending_process_pool_tasks() -> int:
+    """Number of tasks admitted through submit_to_process_pool that have not finished."""
+    return _pending_tasks
+
+
+def submit_to_process_pool(function: Callable, *args: Any) -> Future:
+    """
+    Submit a function to the shared process pool under admission control.
+    
+    At most settings.PROCESS_POOL_MAX_PENDING tasks are admitted at once;
+    beyond that the submission is rejected with a 503 and a Retry-After
+    header instead of queueing, so latency stays bounded under load.
+    
+    Args:
+        function: A picklable, module-level callable
+        *args: Picklable arguments for the function
+        
+    Returns:
+        The future of the function's result
+    """
+    global _pending_tasks
+    with _process_pool_lock:
+        if _pending_tasks >= settings.PROCESS_POOL_MAX_PENDING:
+            raise HTTPException(
+                status_code=503,
+                detail="Calculation workers are busy; retry shortly.",
+                headers={"Retry-After": str(settings.PROCESS_POOL_RETRY_AFTER_SECONDS)}
+            )
+        _pending_tasks += 1
+    
+    try:
+        future = get_process_pool().submit(function, *args)
+    except BaseException:
+        _finish_task(None)
+        raise
+    future.add_done_callback(_finish_task)
+    return future
+
+
+def _finish_task(_future: Optional[Future]) -> None:
+    global _pending_tasks
+    with _process_pool_lock:
+        _pending_tasks -= 1
+
+
+async def run_in_process_pool(function: Callable, *args: Any) -> Any:
+    """
+    Run a function in the shared process pool without blocking the event loop.
+    
+    Admission works as in submit_to_process_pool.
+    
+    Args:
+        function: A picklable, module-level callable
+        *args: Picklable arguments for the function
+        
+    Returns:
+        The function's result
+    """
+    return await asyncio.wrap_future(submit_to_process_pool(function, *args))
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+    
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task. Waiters are shielded from each
+    other: a caller that is cancelled stops waiting, but the shared work
+    carries on for the rest. Must be used from a single event loop.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+    
+    async def run(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run function(), or join the run already in flight for the same key.
+        
+        Args:
+            key: Identifies equivalent calls
+            function: Zero-argument coroutine function doing the work
+            
+        Returns:
+            The shared result; the shared exception is raised to every caller
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+    
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        return len(self._calls)
+    
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
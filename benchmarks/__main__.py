@@ -0,0 +1,103 @@
+"""
+Run the benchmark suite and optionally compare it against a stored baseline.
+
+Usage:
+    python -m benchmarks                          # run everything, print JSON
+    python -m benchmarks --suite utils --quick    # one suite, fewer rounds
+    python -m benchmarks --output current.json    # save results
+    python -m benchmarks --baseline baseline.json # report regressions
+
+Timings are compared on the median. The exit status is 1 when any
+benchmark is slower than the baseline by more than --threshold, or when a
+result bounded by another one (a "max_ratio" key) exceeds its bound.
+"""
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+
+from . import bench_catalog, bench_engines, bench_http, bench_responses, bench_utils
+from .harness import result_key
+
+
+SUITES = {
+    "utils": bench_utils.run,
+    "catalog": bench_catalog.run,
+    "engines": bench_engines.run,
+    "responses": bench_responses.run,
+    "http": bench_http.run,
+}
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Return the benchmarks whose median regressed beyond the threshold."""
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    
+    for result in results:
+        key = result_key(result)
+        if key not in previous:
+            continue
+        ratio = result["median"] / previous[key]["median"]
+        print(f"{key:<70} {previous[key]['median']:>12.1f} -> {result['median']:>12.1f} us  x{ratio:.2f}", file=sys.stderr)
+        if ratio > 1 + threshold:
+            regressions.append({"benchmark": key, "ratio": ratio})
+    return regressions
+
+
+def exceeded_bounds(results: list) -> list:
+    """Return the benchmarks whose ratio to a reference exceeds their max_ratio."""
+    return [
+        {"benchmark": result_key(result), "ratio": result["ratio"], "max_ratio": result["max_ratio"]}
+        for result in results
+        if "max_ratio" in result and result["ratio"] > result["max_ratio"]
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="suite to run (repeatable, default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer rounds and smaller inputs")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results stored by a previous --output")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing (default 0.10)")
+    args = parser.parse_args()
+    
+    results = []
+    for suite in args.suite or SUITES:
+        print(f"running {suite} benchmarks...", file=sys.stderr)
+        results.extend(SUITES[suite](quick=args.quick))
+    
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick
+        },
+        "results": results
+    }
+    
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    
+    exceeded = exceeded_bounds(results)
+    if exceeded:
+        print(json.dumps({"exceeded": exceeded}, indent=2), file=sys.stderr)
+    
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(json.dumps({"regressions": regressions}, indent=2), file=sys.stderr)
+            return 1
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Benchmarks for LoanDatabase lookups at increasing catalog sizes."""
+
+import random
+from typing import List
+
+from backend.database import LoanDatabase
+
+from .harness import measure
+
+
+CATALOG_SIZES = (10, 1000, 100000)
+
+
+def make_catalog(size: int) -> LoanDatabase:
+    """Build an in-memory catalog of synthetic partner products."""
+    return LoanDatabase([
+        {
+            "id": i,
+            "productName": f"Partner Crédito {i:06d}",
+            "minimumAmount": 1000000,
+            "maximumAmount": 100000000,
+            "anual_interest_rate": 0.1 + (i % 20) / 100
+        }
+        for i in range(1, size + 1)
+    ])
+
+
+def run(quick: bool = False) -> List[dict]:
+    repeat = 3 if quick else 7
+    sizes = CATALOG_SIZES[:2] if quick else CATALOG_SIZES
+    results = []
+    
+    for size in sizes:
+        db = make_catalog(size)
+        rng = random.Random(0)
+        ids = [rng.randint(1, size) for _ in range(1024)]
+        names = [f"Partner Crédito {loan_id:06d}" for loan_id in ids]
+        cursor = iter(range(1 << 62))
+        params = {"products": size}
+        
+        results.append(measure("catalog.get_loan_by_id", lambda: db.get_loan_by_id(ids[next(cursor) & 1023]), params, repeat))
+        results.append(measure("catalog.get_loan_by_name", lambda: db.get_loan_by_name(names[next(cursor) & 1023]), params, repeat))
+        results.append(measure("catalog.search", lambda: db.get_loans_by_name(names[next(cursor) & 1023][-5:], 10), params, repeat))
+        results.append(measure("catalog.get_all_loans", db.get_all_loans, params, repeat))
+    return results
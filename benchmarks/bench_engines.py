@@ -0,0 +1,84 @@
+"""
+Cost of the exact "cents" engine relative to the float engine.
+
+Times a complete /calculate-loan computation (LoanCalculationService._render_schedule:
+summary, schedule and its encoded body) with each engine. Each cents result
+carries its ratio to the float result and the MAX_RATIO it must stay within;
+the run exits 1 when it does not.
+
+The bound is on the request path only. The engines alone
+(engines.columns) are reported with their ratio but no bound: the cents
+recurrence runs month by month and is several times slower than the
+float engine's closed form.
+"""
+
+import statistics
+from typing import List, Optional
+
+from backend.models import LoanCalculation
+from backend.services import LoanCalculationService
+from backend.utils import compute_amortization_columns, compute_amortization_columns_cents
+
+from .harness import measure
+
+
+MAX_RATIO = 2.0
+PRINCIPAL = 150000000
+ANNUAL_RATE = 0.165
+
+
+def run(quick: bool = False) -> List[dict]:
+    repeat = 5 if quick else 15
+    results = []
+    
+    for years in (30, 40):
+        results.extend(compare_engines(
+            "engines.columns",
+            {
+                "float": lambda: compute_amortization_columns(PRINCIPAL, ANNUAL_RATE, years),
+                "cents": lambda: compute_amortization_columns_cents(PRINCIPAL, ANNUAL_RATE, years)
+            },
+            {"years": years}, repeat
+        ))
+        
+        for output_format in ("raw", "display"):
+            operations = {}
+            for engine in ("float", "cents"):
+                calculation = LoanCalculation(amount=PRINCIPAL, loanName="Hipotecario Vivienda", years=years, engine=engine)
+                operations[engine] = lambda calculation=calculation: LoanCalculationService._render_schedule(
+                    calculation, ANNUAL_RATE, output_format, 0, None
+                )
+            results.extend(compare_engines(
+                "engines.render_schedule", operations, {"years": years, "format": output_format}, repeat, MAX_RATIO
+            ))
+    
+    return results
+
+
+def compare_engines(name: str, operations: dict, params: dict, repeat: int, max_ratio: Optional[float] = None) -> List[dict]:
+    """Time the float and cents variants of an operation and attach the cents/float ratio."""
+    # Rounds of the two engines alternate so both see the same load on the machine
+    rounds = {engine: [] for engine in operations}
+    for _ in range(repeat):
+        for engine, operation in operations.items():
+            rounds[engine].append(measure(name, operation, {**params, "engine": engine}, repeat=1))
+    timings = {engine: merge_rounds(engine_rounds) for engine, engine_rounds in rounds.items()}
+    
+    # Each cents round is compared with the float round next to it; the median
+    # ratio discounts rounds where other load on the machine hit one engine only
+    timings["cents"]["ratio"] = statistics.median(
+        cents["best"] / float_round["best"] for cents, float_round in zip(rounds["cents"], rounds["float"])
+    )
+    if max_ratio is not None:
+        timings["cents"]["max_ratio"] = max_ratio
+    return list(timings.values())
+
+
+def merge_rounds(rounds: List[dict]) -> dict:
+    """Combine single-round measure results of one operation into one result."""
+    return {
+        **rounds[0],
+        "best": min(result["best"] for result in rounds),
+        "median": statistics.median(result["median"] for result in rounds),
+        "rounds": len(rounds)
+    }
@@ -0,0 +1,69 @@
+"""
+In-process HTTP load test against backend.main.app.
+
+Requests go through the full ASGI stack (routing, validation, services and
+JSON serialization) via httpx's ASGI transport, without opening sockets.
+Requires httpx.
+"""
+
+import asyncio
+import time
+from typing import List
+
+from backend.main import app
+
+from .harness import percentile
+
+
+THIRTY_YEAR_LOAN = {"amount": 150000000, "loanName": "Hipotecario Vivienda", "years": 30}
+
+SCENARIOS = (
+    ("http.get_loans", "GET", "/loans", None, "identity"),
+    ("http.search_loans", "POST", "/loans/search", {"productName": "credito"}, "identity"),
+    ("http.calculate_loan", "POST", "/calculate-loan", THIRTY_YEAR_LOAN, "identity"),
+    ("http.calculate_loan", "POST", "/calculate-loan", THIRTY_YEAR_LOAN, "gzip"),
+    ("http.calculate_loan", "POST", "/calculate-loan", THIRTY_YEAR_LOAN, "br"),
+    ("http.calculate_loan_raw", "POST", "/calculate-loan?format=raw", THIRTY_YEAR_LOAN, "identity"),
+    ("http.calculate_loan_raw", "POST", "/calculate-loan?format=raw", THIRTY_YEAR_LOAN, "gzip"),
+)
+
+
+async def _load(method: str, path: str, body: dict, accept_encoding: str, requests: int, concurrency: int) -> dict:
+    import httpx
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies: List[float] = []
+        remaining = iter(range(requests))
+        
+        async def worker() -> None:
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers={"Accept-Encoding": accept_encoding})
+                latencies.append((time.perf_counter() - start) * 1e6)
+                response.raise_for_status()
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    
+    return {
+        "unit": "us",
+        "best": min(latencies),
+        "median": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "requests_per_s": requests / elapsed
+    }
+
+
+def run(quick: bool = False) -> List[dict]:
+    requests = 200 if quick else 2000
+    concurrency = 16
+    results = []
+    for name, method, path, body, accept_encoding in SCENARIOS:
+        stats = asyncio.run(_load(method, path, body, accept_encoding, requests, concurrency))
+        params = {"concurrency": concurrency, "requests": requests}
+        if accept_encoding != "identity":
+            params["encoding"] = accept_encoding
+        results.append({"name": name, "params": params, **stats})
+    return results
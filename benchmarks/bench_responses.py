@@ -0,0 +1,73 @@
+"""
+Serialization and compression cost of 30-year /calculate-loan responses.
+
+Compares the stdlib path FastAPI takes for plain return values
+(jsonable_encoder followed by json.dumps over a list of row dictionaries)
+with the fast path the hot routes use (a pre-built response encoded by
+orjson when installed, splicing in the schedule's cached body), then times
+gzip and brotli on the encoded body. encode_fast_cold encodes a freshly
+built schedule, as on a cache miss. Each call is timed individually so p50
+and p99 can be reported.
+"""
+
+import asyncio
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.compression import _Compressor, supported_encodings
+from backend.main import TimedJSONResponse
+from backend.models import LoanCalculation
+from backend.schedule import AmortizationSchedule, orjson
+from backend.services import LoanCalculationService
+
+from .harness import sample
+
+
+CALCULATION = LoanCalculation(amount=150000000, loanName="Hipotecario Vivienda", years=30)
+
+
+def replace_schedule(content, schedule):
+    """Copy a calculate_loan_async response with a different schedule value."""
+    if isinstance(content, dict):
+        return {**content, "amortization_schedule": schedule}
+    return [content[0], schedule]
+
+
+def run(quick: bool = False) -> List[dict]:
+    samples = 50 if quick else 500
+    encoder = "orjson" if orjson is not None else "stdlib"
+    results = []
+    
+    for output_format in ("display", "raw"):
+        content = asyncio.run(LoanCalculationService.calculate_loan_async(CALCULATION, output_format))
+        params = {"years": 30, "format": output_format}
+        schedule = content["amortization_schedule"] if output_format == "raw" else content[1]
+        legacy_content = replace_schedule(content, schedule.to_list())
+        
+        results.append(sample(
+            "responses.encode_legacy",
+            lambda: JSONResponse(jsonable_encoder(legacy_content)).body, params, samples
+        ))
+        results.append(sample(
+            "responses.encode_fast",
+            lambda: TimedJSONResponse(content).body, {**params, "encoder": encoder}, samples
+        ))
+        results.append(sample(
+            "responses.encode_fast_cold",
+            lambda: TimedJSONResponse(
+                replace_schedule(content, AmortizationSchedule(schedule.columns, output_format))
+            ).body,
+            {**params, "encoder": encoder}, samples
+        ))
+        
+        body = TimedJSONResponse(content).body
+        for encoding in supported_encodings():
+            results.append(sample(
+                "responses.compress",
+                lambda: _Compressor(encoding).compress(body, final=True),
+                {**params, "encoding": encoding, "bytes": len(body)}, samples
+            ))
+    
+    return results
@@ -0,0 +1,102 @@
+"""
+Memory and allocation cost of an amortization schedule representation.
+
+Compares the list of per-month dictionaries the API used to build with the
+array-backed AmortizationSchedule, before and after its JSON body is
+encoded, and the allocations made while encoding each one. Reported per
+term and output format: bytes still held afterwards, peak traced bytes,
+live memory blocks and new garbage-collected objects.
+
+Usage:
+    python -m benchmarks.bench_schedule_memory [--years 30 40]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, List
+
+from backend.schedule import AmortizationSchedule, _dumps
+from backend.utils import compute_amortization_columns
+
+PRINCIPAL = 150000000
+ANNUAL_RATE = 0.12
+
+
+def allocations(build: Callable[[], object]) -> dict:
+    """Trace one call of build and summarize what it allocated and kept."""
+    gc.collect()
+    tracked_before = len(gc.get_objects())
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    
+    value = build()
+    
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    differences = after.compare_to(before, "filename")
+    tracked_after = len(gc.get_objects())
+    del value
+    
+    return {
+        "retained_bytes": sum(difference.size_diff for difference in differences),
+        "peak_bytes": peak,
+        "live_blocks": sum(difference.count_diff for difference in differences),
+        "gc_objects": tracked_after - tracked_before - 1
+    }
+
+
+def run(terms: List[int]) -> List[dict]:
+    # What tracing itself costs is measured once and subtracted from every result
+    overhead = allocations(lambda: None)
+    results = []
+    for years in terms:
+        columns = compute_amortization_columns(PRINCIPAL, ANNUAL_RATE, years)
+        
+        def compact_schedule(output_format: str) -> AmortizationSchedule:
+            # Copies the columns so the schedule is charged for its own arrays
+            return AmortizationSchedule({name: column.copy() for name, column in columns.items()}, output_format)
+        
+        def compact_encoded(output_format: str) -> AmortizationSchedule:
+            schedule = compact_schedule(output_format)
+            schedule.to_json()
+            return schedule
+        
+        for output_format in ("display", "raw"):
+            legacy = AmortizationSchedule(columns, output_format).to_list()
+            compact = compact_encoded(output_format)
+            variants = {
+                "list_of_dicts": lambda: AmortizationSchedule(columns, output_format).to_list(),
+                "compact": lambda: compact_schedule(output_format),
+                "compact_encoded": lambda: compact_encoded(output_format),
+                "encode_list_of_dicts": lambda: _dumps(legacy),
+                "encode_compact_cached": compact.to_json,
+            }
+            for name, build in variants.items():
+                measured = allocations(build)
+                results.append({
+                    "representation": name,
+                    "years": years,
+                    "format": output_format,
+                    **{metric: value - overhead[metric] for metric, value in measured.items()}
+                })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[30, 40])
+    args = parser.parse_args()
+    
+    results = run(args.years)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
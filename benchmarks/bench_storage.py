@@ -0,0 +1,79 @@
+"""
+Compare read/write throughput of the in-memory and SQLite catalog backends.
+
+Usage:
+    python -m benchmarks.bench_storage [--products 10000] [--reads 20000]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backend.database import LoanDatabase
+from backend.models import Loan
+from backend.sqlite_database import SQLiteLoanDatabase
+
+
+def make_loans(count: int) -> list:
+    """Build a synthetic partner catalog."""
+    return [
+        Loan(
+            productName=f"Partner Crédito {i:06d}",
+            minimumAmount=1000000,
+            maximumAmount=100000000,
+            anual_interest_rate=0.1 + (i % 20) / 100
+        )
+        for i in range(count)
+    ]
+
+
+def measure(operation, count: int) -> float:
+    """Run an operation count times and return operations per second."""
+    start = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return count / (time.perf_counter() - start)
+
+
+def bench_backend(name: str, db, loans: list, reads: int) -> dict:
+    random.seed(0)
+    created_ids = []
+    results = {"backend": name, "products": len(loans)}
+    
+    results["create_per_s"] = measure(lambda i: created_ids.append(db.create_loan(loans[i])["id"]), len(loans))
+    
+    ids = [random.choice(created_ids) for _ in range(reads)]
+    names = [loans[random.randrange(len(loans))].productName for _ in range(reads)]
+    results["get_by_id_per_s"] = measure(lambda i: db.get_loan_by_id(ids[i]), reads)
+    results["get_by_name_per_s"] = measure(lambda i: db.get_loan_by_name(names[i]), reads)
+    results["search_per_s"] = measure(lambda i: db.get_loans_by_name(names[i][-6:], 10), min(reads, 2000))
+    results["get_all_per_s"] = measure(lambda i: db.get_all_loans(), 50)
+    
+    updates = min(reads, len(loans))
+    results["update_per_s"] = measure(lambda i: db.update_loan(ids[i], loans[i]), updates)
+    results["delete_per_s"] = measure(lambda i: db.delete_loan(created_ids[i]), len(created_ids) // 2)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+    
+    loans = make_loans(args.products)
+    results = [bench_backend("memory", LoanDatabase(), loans, args.reads)]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        results.append(bench_backend("sqlite", SQLiteLoanDatabase(f"sqlite:///{path}"), loans, args.reads))
+    
+    for result in results:
+        print(json.dumps({key: round(value) if isinstance(value, float) else value for key, value in result.items()}))
+
+
+if __name__ == "__main__":
+    main()
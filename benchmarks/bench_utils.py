@@ -0,0 +1,64 @@
+"""Microbenchmarks for the calculation functions in backend.utils."""
+
+from typing import List
+
+from backend.utils import (
+    calculate_compound_interest,
+    calculate_loan_summary,
+    compute_amortization_columns,
+    compute_amortization_columns_cents,
+    compute_prepayment_columns,
+    generate_amortization_schedule,
+    generate_amortization_schedules_batch,
+)
+
+from .harness import measure
+
+
+TERMS = (1, 5, 10, 20, 30, 40)
+PRINCIPAL = 150000000
+ANNUAL_RATE = 0.12
+
+
+def run(quick: bool = False) -> List[dict]:
+    repeat = 3 if quick else 7
+    results = [
+        measure("utils.calculate_compound_interest", lambda: calculate_compound_interest(PRINCIPAL, ANNUAL_RATE, 30), repeat=repeat)
+    ]
+    
+    for years in TERMS:
+        params = {"years": years}
+        results.append(measure(
+            "utils.calculate_loan_summary",
+            lambda: calculate_loan_summary(PRINCIPAL, ANNUAL_RATE, years), params, repeat
+        ))
+        results.append(measure(
+            "utils.compute_amortization_columns",
+            lambda: compute_amortization_columns(PRINCIPAL, ANNUAL_RATE, years), params, repeat
+        ))
+        results.append(measure(
+            "utils.compute_amortization_columns_cents",
+            lambda: compute_amortization_columns_cents(PRINCIPAL, ANNUAL_RATE, years), params, repeat
+        ))
+        results.append(measure(
+            "utils.generate_amortization_schedule",
+            lambda: generate_amortization_schedule(PRINCIPAL, ANNUAL_RATE, years).to_json(), params, repeat
+        ))
+    
+    # Stepped rate paths over 40 years, up to a change every month
+    for changes in (12, 120, 479):
+        rate_path = [(month, ANNUAL_RATE + month % 7 / 100) for month in range(2, 481, 480 // changes)][:changes]
+        results.append(measure(
+            "utils.compute_prepayment_columns",
+            lambda: compute_prepayment_columns(PRINCIPAL, ANNUAL_RATE, 40, rate_changes=rate_path),
+            {"years": 40, "rate_changes": changes}, repeat
+        ))
+    
+    principals = [PRINCIPAL] * 1000
+    rates = [ANNUAL_RATE] * 1000
+    years = [30] * 1000
+    results.append(measure(
+        "utils.generate_amortization_schedules_batch",
+        lambda: generate_amortization_schedules_batch(principals, rates, years), {"loans": 1000, "years": 30}, repeat
+    ))
+    return results
@@ -0,0 +1,95 @@
+"""Timing helpers shared by the benchmark suites."""
+
+import statistics
+import time
+from typing import Callable, List
+
+
+def measure(name: str, operation: Callable[[], object], params: dict = None, repeat: int = 7, min_time: float = 0.05) -> dict:
+    """
+    Time an operation and summarize its per-call latency.
+    
+    The number of calls per round is calibrated so each round lasts at least
+    min_time seconds; the best round is reported alongside the median.
+    
+    Args:
+        name: Benchmark name, stable across runs so results can be compared
+        operation: Zero-argument callable to time
+        params: Parameters identifying this variant of the benchmark
+        repeat: Number of timed rounds
+        min_time: Minimum duration of a round in seconds
+        
+    Returns:
+        Result record with per-call times in microseconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    
+    rounds: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    
+    return {
+        "name": name,
+        "params": params or {},
+        "unit": "us",
+        "best": min(rounds),
+        "median": statistics.median(rounds),
+        "calls_per_round": number
+    }
+
+
+def sample(name: str, operation: Callable[[], object], params: dict = None, samples: int = 200, warmup: int = 5) -> dict:
+    """
+    Time every call of an operation individually to report tail latency.
+    
+    Args:
+        name: Benchmark name, stable across runs so results can be compared
+        operation: Zero-argument callable to time
+        params: Parameters identifying this variant of the benchmark
+        samples: Number of timed calls
+        warmup: Untimed calls made first
+        
+    Returns:
+        Result record with the best, median (p50) and p99 call in microseconds
+    """
+    for _ in range(warmup):
+        operation()
+    
+    latencies: List[float] = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    
+    return {
+        "name": name,
+        "params": params or {},
+        "unit": "us",
+        "best": min(latencies),
+        "median": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99)
+    }
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def result_key(result: dict) -> str:
+    """Build the identifier used to match a result against a baseline."""
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
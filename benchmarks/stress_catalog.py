@@ -0,0 +1,172 @@
+"""
+Stress the loan catalog with concurrent readers and writers.
+
+Reader threads continuously take snapshots and check that each one is
+internally consistent; writer threads create, update and delete loans and
+apply two-loan batches. Afterwards the final catalog is cross-checked
+against its name and search indexes and against every id a writer was
+handed. Prints throughput and exits 1 if any invariant was violated.
+
+Usage:
+    python -m benchmarks.stress_catalog [--readers 8] [--writers 4] [--seconds 5] [--backend memory]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import List
+
+from backend.database import BaseLoanDatabase, LoanDatabase
+from backend.models import Loan, LoanOperation
+
+
+def make_loan(name: str, minimum: float) -> Loan:
+    # Every loan written keeps maximumAmount == 10 * minimumAmount, so a torn read is detectable
+    return Loan(productName=name, minimumAmount=minimum, maximumAmount=minimum * 10, anual_interest_rate=0.12)
+
+
+def check_snapshot(loans: List[dict]) -> List[str]:
+    """Return the invariant violations found in one catalog snapshot."""
+    violations = []
+    ids = [loan["id"] for loan in loans]
+    if ids != sorted(set(ids)):
+        violations.append("snapshot ids are duplicated or out of order")
+
+    pairs = Counter()
+    for loan in loans:
+        if loan["productName"].startswith("stress") and loan["maximumAmount"] != loan["minimumAmount"] * 10:
+            violations.append(f"loan {loan['id']} has a torn update")
+        if loan["productName"].startswith("pair-"):
+            pairs[loan["productName"][:-2]] += 1
+    violations.extend(f"batch {name} is only partly visible" for name, count in pairs.items() if count != 2)
+    return violations
+
+
+def reader(db: BaseLoanDatabase, stop: threading.Event, stats: dict, violations: list) -> None:
+    operations = 0
+    last_version = -1
+    while not stop.is_set():
+        version = db.get_version()
+        if version < last_version:
+            violations.append(f"version went backwards from {last_version} to {version}")
+        last_version = version
+
+        loans = db.get_all_loans()
+        violations.extend(check_snapshot(loans))
+        if loans:
+            loan = random.choice(loans)
+            found = db.get_loan_by_id(loan["id"])
+            if found is not None and found["id"] != loan["id"]:
+                violations.append(f"get_loan_by_id({loan['id']}) returned loan {found['id']}")
+        for match in db.get_loans_by_name("stress", limit=5):
+            if "stress" not in match["productName"]:
+                violations.append(f"search for 'stress' returned '{match['productName']}'")
+        operations += 4
+    stats["reads"] += operations
+
+
+def writer(db: BaseLoanDatabase, number: int, stop: threading.Event, stats: dict, created_ids: list) -> None:
+    operations = 0
+    mine: List[int] = []
+    rounds = 0
+    while not stop.is_set():
+        rounds += 1
+        action = random.random()
+        if action < 0.4 or not mine:
+            loan = db.create_loan(make_loan(f"stress-{number}-{rounds}", random.randint(1, 1000) * 1000.0))
+            mine.append(loan["id"])
+            created_ids.append(loan["id"])
+        elif action < 0.75:
+            db.update_loan(random.choice(mine), make_loan(f"stress-{number}-{rounds}", random.randint(1, 1000) * 1000.0))
+        elif action < 0.9:
+            db.delete_loan(mine.pop(random.randrange(len(mine))))
+        else:
+            # Both loans of a pair are created and deleted together, so readers must see both or neither
+            name = f"pair-{number}-{rounds}"
+            results = db.apply_operations([
+                LoanOperation(op="create", loan=make_loan(f"{name}-a", 1000.0)),
+                LoanOperation(op="create", loan=make_loan(f"{name}-b", 1000.0)),
+            ])
+            created_ids.extend(loan["id"] for loan in results)
+            db.apply_operations([LoanOperation(op="delete", id=loan["id"]) for loan in results])
+        operations += 1
+    stats["writes"] += operations
+
+
+def check_final(db: BaseLoanDatabase, created_ids: list) -> List[str]:
+    """Cross-check the final catalog against its indexes and the ids handed to writers."""
+    violations = []
+    if len(created_ids) != len(set(created_ids)):
+        violations.append(f"{len(created_ids) - len(set(created_ids))} ids were assigned twice")
+
+    loans = db.get_all_loans()
+    violations.extend(check_snapshot(loans))
+    for loan in loans:
+        by_name = db.get_loan_by_name(loan["productName"])
+        if by_name is None or by_name["productName"] != loan["productName"] or by_name["id"] > loan["id"]:
+            violations.append(f"name index is stale for loan {loan['id']}")
+        if loan["id"] not in {match["id"] for match in db.get_loans_by_name(loan["productName"])}:
+            violations.append(f"search index is missing loan {loan['id']}")
+    return violations
+
+
+def run(db: BaseLoanDatabase, readers: int, writers: int, seconds: float) -> dict:
+    stop = threading.Event()
+    stats = Counter()
+    violations: list = []
+    created_ids: list = []
+
+    threads = [threading.Thread(target=reader, args=(db, stop, stats, violations)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(db, number, stop, stats, created_ids)) for number in range(writers)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    violations.extend(check_final(db, created_ids))
+    return {
+        "readers": readers,
+        "writers": writers,
+        "seconds": round(elapsed, 2),
+        "reads_per_s": round(stats["reads"] / elapsed),
+        "writes_per_s": round(stats["writes"] / elapsed),
+        "final_loans": len(db.get_all_loans()),
+        "final_version": db.get_version(),
+        "violations": len(violations),
+        "first_violations": violations[:10]
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    args = parser.parse_args()
+
+    if args.backend == "memory":
+        report = run(LoanDatabase(), args.readers, args.writers, args.seconds)
+    else:
+        from backend.sqlite_database import SQLiteLoanDatabase
+        with tempfile.TemporaryDirectory() as directory:
+            db = SQLiteLoanDatabase(f"sqlite:///{os.path.join(directory, 'stress.db')}")
+            report = run(db, args.readers, args.writers, args.seconds)
+
+    print(json.dumps({"backend": args.backend, **report}, indent=2))
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())